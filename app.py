@@ -1,58 +1,96 @@
 from dotenv import load_dotenv
-import os
 
 # 🔥 加载 .env 文件
 load_dotenv()
 
 from flask import Flask,request
-from utils.database import Database
-from config import DB_CONFIG
+from utils.extensions import db
 from routes.user import user_bp
 from utils.error_handler import register_error_handlers
-from routes.auth import auth_bp  # JWT鉴权
+from utils.instrumentation import init_instrumentation
+from utils.json_provider import FastJSONProvider
+from utils.compression import init_compression
+from utils.overload import init_overload
+from utils.response import get_request_id
+from utils.cli import register_commands
+from routes.auth import auth_bp, jwks_bp  # JWT鉴权
+from routes.metrics import metrics_bp  # 内部监控
+from routes.health import health_bp  # 健康检查
 from flask_cors import CORS 
 
-app = Flask(__name__)
-
-# CORS 配置
-CORS(app)
-
-# 创建数据库实例
-db = Database(**DB_CONFIG)
-db.connect()
-
-# 在所有响应后添加 CORS 头（最保险的方法）
-@app.after_request
-def after_request(response):
-    origin = request.headers.get('Origin')
-    if origin in ['http://localhost:5173', 'http://127.0.0.1:5173']:
-        response.headers['Access-Control-Allow-Origin'] = origin
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-CSRF-Token'
-        response.headers['Access-Control-Allow-Credentials'] = 'true'
-        response.headers['Access-Control-Max-Age'] = '3600'
-    return response
-
-# 处理 OPTIONS 预检请求
-@app.before_request
-def handle_preflight():
-    if request.method == "OPTIONS":
-        response = app.make_default_options_response()
+# 允许跨域的前端地址
+ALLOWED_ORIGINS = ['http://localhost:5173', 'http://127.0.0.1:5173']
+
+def create_app():
+    """
+    创建 Flask 应用（应用工厂）
+    
+    导入和创建应用都不会连接数据库，连接池在每个进程第一次查询时才创建，
+    gunicorn 可以在 master 中预加载应用后再 fork worker。
+    """
+    app = Flask(__name__)
+
+    # 高速 JSON 序列化（安装了 orjson 时使用 orjson）
+    app.json = FastJSONProvider(app)
+
+    # CORS 配置
+    CORS(app)
+
+    # 注册数据库（不会立即连接）
+    db.init_app(app)
+
+    # 响应压缩（br / gzip）
+    init_compression(app)
+
+    # 请求计时 / 采样 profile（INSTRUMENTATION_ENABLED=true 时生效）
+    init_instrumentation(app)
+
+    # 请求截止时间（数据库调用的超时不超过请求剩余时间）
+    init_overload(app)
+
+    # 在所有响应后添加请求 ID 和 CORS 头（最保险的方法）
+    @app.after_request
+    def after_request(response):
+        response.headers['X-Request-ID'] = get_request_id()
         origin = request.headers.get('Origin')
-        if origin in ['http://localhost:5173', 'http://127.0.0.1:5173']:
-            response.headers['Access-Control-Allow-Origin'] = origin
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-CSRF-Token'
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
-            response.headers['Access-Control-Max-Age'] = '3600'
+        if origin in ALLOWED_ORIGINS:
+            _add_cors_headers(response, origin)
         return response
 
-# 注册错误处理
-register_error_handlers(app)
+    # 处理 OPTIONS 预检请求
+    @app.before_request
+    def handle_preflight():
+        if request.method == "OPTIONS":
+            response = app.make_default_options_response()
+            origin = request.headers.get('Origin')
+            if origin in ALLOWED_ORIGINS:
+                _add_cors_headers(response, origin)
+            return response
+
+    # 注册错误处理
+    register_error_handlers(app)
+
+    # 注册蓝图
+    app.register_blueprint(user_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(jwks_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp)
+
+    # 注册命令行命令（flask check-search-plans 等）
+    register_commands(app)
+
+    return app
+
+def _add_cors_headers(response, origin):
+    """添加 CORS 响应头"""
+    response.headers['Access-Control-Allow-Origin'] = origin
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-CSRF-Token'
+    response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers['Access-Control-Max-Age'] = '3600'
 
-# 注册蓝图
-app.register_blueprint(user_bp)
-app.register_blueprint(auth_bp)
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000)
@@ -0,0 +1,59 @@
+import asyncio
+from dotenv import load_dotenv
+
+# 🔥 加载 .env 文件
+load_dotenv()
+
+from quart import Quart, jsonify
+from marshmallow import ValidationError
+from utils.async_database import async_db
+from utils.database import PoolTimeoutError
+from utils.response import get_request_id
+from utils.extensions import audit_log
+from routes.async_user import async_user_bp
+from routes.async_auth import async_auth_bp
+from config import WORKER_PROCESSES, REVOCATION_BACKEND
+from utils.revocation import check_revocation_backend
+
+def create_asgi_app():
+    """
+    创建 ASGI 应用（异步视图 + 异步连接池）
+    
+    /api/user/* 和 /api/auth/* 的接口与 app.py 一致，I/O 等待期间不占用 worker 线程。
+    导出、批量接口和内部监控只在同步部署中提供。
+    
+    用法（pip install -r requirements-async.txt）:
+        uvicorn asgi:app                                                   # 单进程，进程内吊销列表
+        WEB_CONCURRENCY=4 CACHE_BACKEND=redis REDIS_URL=redis://... uvicorn asgi:app
+    """
+    # 进程数通过 WEB_CONCURRENCY 传入（uvicorn 默认按它启动 worker），多进程时吊销列表必须共享
+    check_revocation_backend(WORKER_PROCESSES, REVOCATION_BACKEND)
+
+    app = Quart(__name__)
+
+    @app.after_serving
+    async def close_db():
+        await async_db.close()
+        await asyncio.to_thread(audit_log.close)  # 把审计日志队列中剩余的事件写完
+
+    @app.after_request
+    async def add_request_id(response):
+        """响应头带上请求 ID（与 app.py 一致，方便串联日志）"""
+        response.headers['X-Request-ID'] = get_request_id()
+        return response
+
+    @app.errorhandler(ValidationError)
+    async def validation_error(error):
+        """数据验证错误"""
+        return jsonify({'status': 'error', 'message': error.messages}), 400
+
+    @app.errorhandler(PoolTimeoutError)
+    async def pool_timeout(error):
+        """数据库连接池繁忙，快速失败"""
+        return jsonify({'status': 'error', 'message': '服务繁忙，请稍后重试'}), 503
+
+    app.register_blueprint(async_user_bp)
+    app.register_blueprint(async_auth_bp)
+    return app
+
+app = create_asgi_app()
@@ -0,0 +1,92 @@
+"""
+软删除用户归档测试：用替身数据库模拟 users 表中积压的软删除用户
+
+准备 --users 个用户，其中 --deleted-ratio 比例软删除（一半删除时间早于保留期，一半在保留期内），
+然后执行三轮归档:
+    interrupted: 只移动 --interrupt-after 行后停止（模拟中断）
+    resumed:     重新执行，从剩下的行继续
+    again:       再执行一次，应该没有可以移动的行
+每轮输出移动行数、批次数和每秒移动行数；最后检查 users / users_archive 的行数是否正确。
+用 --replica-lag 模拟从库延迟：resumed 轮开始后的前 2 秒从库延迟超过上限，归档暂停后继续。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_archive --users 20000 --chunk-size 500 --max-rows-per-second 0
+"""
+import argparse
+import json
+import threading
+from datetime import datetime, timedelta
+from benchmarks.fake_db import FakeDatabase
+from utils.archive import archive_deleted_users
+
+RETENTION_DAYS = 30
+
+def prepare(fake, users, deleted_ratio):
+    """
+    软删除一部分用户并改写 updated_at（偶数 id 删除时间早于保留期，奇数 id 在保留期内）
+
+    Returns:
+        int: 应该被归档的用户数
+    """
+    step = max(1, round(1 / deleted_ratio)) if deleted_ratio > 0 else users + 1
+    old = (datetime.now() - timedelta(days=RETENTION_DAYS + 1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    recent = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    deleted = [user_id for user_id in range(1, users + 1) if user_id % step == 0]
+    with fake._lock:
+        # 直接改写 updated_at 时触发器会把它改回当前时间，先删掉触发器
+        fake._conn.execute("DROP TRIGGER users_updated_at")
+        fake._conn.executemany("UPDATE users SET status = 7, updated_at = ? WHERE id = ?",
+                               [(old if i % 2 == 0 else recent, user_id) for i, user_id in enumerate(deleted)])
+    return sum(1 for i, _ in enumerate(deleted) if i % 2 == 0)
+
+def count(fake, sql):
+    return fake.query(sql)[0]['cnt']
+
+def main():
+    parser = argparse.ArgumentParser(description="软删除用户归档测试")
+    parser.add_argument('--users', type=int, default=20000, help="用户数")
+    parser.add_argument('--deleted-ratio', type=float, default=0.2, help="软删除用户的比例")
+    parser.add_argument('--chunk-size', type=int, default=500, help="每个事务移动的行数")
+    parser.add_argument('--max-rows-per-second', type=float, default=0, help="每秒最多移动的行数（0=不限制）")
+    parser.add_argument('--latency', type=float, default=0.001, help="每次数据库调用的延迟（秒）")
+    parser.add_argument('--interrupt-after', type=int, default=1000, help="第一轮移动多少行后停止")
+    parser.add_argument('--replica-lag', action='store_true', help="模拟从库延迟")
+    args = parser.parse_args()
+
+    fake = FakeDatabase(latency=0, seed_users=args.users)
+    expected = prepare(fake, args.users, args.deleted_ratio)
+    total = count(fake, "SELECT COUNT(*) AS cnt FROM users")
+    fake.latency = args.latency
+
+    options = dict(retention_days=RETENTION_DAYS, chunk_size=args.chunk_size,
+                   max_rows_per_second=args.max_rows_per_second, max_replica_lag=5)
+    results = {}
+
+    report = archive_deleted_users(fake, max_rows=args.interrupt_after, **options)
+    results['interrupted'] = report
+
+    if args.replica_lag:
+        fake.replica_lag = 10
+        threading.Timer(2.0, lambda: setattr(fake, 'replica_lag', 0)).start()
+    results['resumed'] = archive_deleted_users(fake, **options)
+    results['again'] = archive_deleted_users(fake, **options)
+
+    archived = count(fake, "SELECT COUNT(*) AS cnt FROM users_archive")
+    remaining = count(fake, "SELECT COUNT(*) AS cnt FROM users")
+    results['check'] = {
+        'expected_archived': expected,
+        'archived': archived,
+        'users_before': total,
+        'users_after': remaining,
+        'recent_deleted_kept': count(fake, "SELECT COUNT(*) AS cnt FROM users WHERE status = 7"),
+        'ok': archived == expected and remaining == total - expected
+    }
+    for name in ('interrupted', 'resumed', 'again'):
+        results[name]['rows_per_second'] = round(results[name]['rows_per_second'], 1)
+        results[name]['elapsed_seconds'] = round(results[name]['elapsed_seconds'], 3)
+        results[name]['throttled_seconds'] = round(results[name]['throttled_seconds'], 3)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+
+if __name__ == '__main__':
+    main()
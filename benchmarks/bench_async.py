@@ -0,0 +1,90 @@
+"""
+同步（Flask + 线程）与异步（Quart + asyncio）部署的吞吐量 / p99 对比
+
+两边使用同一个本地数据库替身（内存 SQLite + 注入延迟），
+同步部署的并发上限为 --sync-threads（相当于 gunicorn workers × threads），
+异步部署的并发为 --concurrency。
+
+用法（在项目根目录执行，需要先安装 requirements-async.txt）:
+    python -m benchmarks.bench_async --requests 2000 --concurrency 64 --sync-threads 8 --latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import summarize, install_fake_db
+from benchmarks.fake_db import FakeDatabase, AsyncFakeDatabase
+from utils.jwt_utils import generate_token
+
+PATH = '/api/user/list?limit=20'
+
+def run_sync(fake, headers, total, threads):
+    """用线程池驱动 Flask 测试客户端"""
+    from app import create_app
+
+    install_fake_db(fake)
+    app = create_app()
+    local = threading.local()
+
+    def one_request(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(PATH, headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - start
+    return summarize([r[0] for r in results], elapsed, sum(1 for r in results if r[1] != 200))
+
+async def run_async(fake, headers, total, concurrency):
+    """用 asyncio 并发驱动 Quart 测试客户端"""
+    import routes.async_user
+    import routes.async_auth
+    from asgi import create_asgi_app
+
+    async_fake = AsyncFakeDatabase(fake)
+    routes.async_user.db = async_fake
+    routes.async_auth.db = async_fake
+    app = create_asgi_app()
+    client = app.test_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(PATH, headers=headers)
+            return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return summarize([r[0] for r in results], elapsed, sum(1 for r in results if r[1] != 200))
+
+def main():
+    parser = argparse.ArgumentParser(description="同步 / 异步部署对比")
+    parser.add_argument('--requests', type=int, default=2000, help="每种部署的请求总数")
+    parser.add_argument('--concurrency', type=int, default=64, help="异步部署的并发数")
+    parser.add_argument('--sync-threads', type=int, default=8, help="同步部署的线程数（workers × threads）")
+    parser.add_argument('--latency', type=float, default=0.005, help="每次数据库调用注入的延迟（秒）")
+    parser.add_argument('--seed-users', type=int, default=1000, help="写入替身数据库的用户数")
+    args = parser.parse_args()
+
+    fake = FakeDatabase(latency=args.latency, seed_users=args.seed_users)
+    headers = {'Authorization': f'Bearer {generate_token(1, "user1")}'}
+
+    report = {
+        'path': PATH,
+        'db_latency_ms': args.latency * 1000,
+        'sync': run_sync(fake, headers, args.requests, args.sync_threads),
+        'async': asyncio.run(run_async(fake, headers, args.requests, args.concurrency))
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
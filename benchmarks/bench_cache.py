@@ -0,0 +1,123 @@
+"""
+缓存测试：进程内缓存和 Redis 缓存（Redis 用 benchmarks/fake_redis.py 替身）
+
+检查三件事:
+    roundtrip:  用户行（datetime / date / Decimal / bytes）和列表页 (etag, body) 经过 JSON 序列化后不变
+    stale_load: 加载线程读到旧数据后另一个 worker 更新并 delete，加载线程随后写回缓存——
+                带墓碑的 get_or_load 不写回（protected），直接 get + set 会写回旧数据（unprotected）
+    workers:    两个 worker 各自的进程内缓存，一个 worker 写入后另一个 worker 还能读到旧数据（Redis 共享则不会）
+最后输出两种后端 get_or_load 命中时的每秒次数。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_cache --iterations 20000 --redis-latency 0
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from benchmarks.fake_redis import FakeRedis
+from config import CACHE_TTL, WORKER_PROCESSES
+from utils.cache import MemoryCache, RedisCache
+
+def make_workers(backend, redis_client):
+    """两个 worker 的缓存实例（Redis 后端共用同一个替身）"""
+    if backend == 'redis':
+        return RedisCache('bench', client=redis_client), RedisCache('bench', client=redis_client)
+    return MemoryCache('bench'), MemoryCache('bench')
+
+def check_roundtrip(redis_client):
+    cache = RedisCache('roundtrip', client=redis_client)
+    user = {'id': 1, 'name': '张三', 'created': datetime(2024, 5, 1, 12, 30, 15, 123456),
+            'birthday': date(1990, 1, 2), 'balance': Decimal('12.50'), 'avatar': b'\x00\xff', 'status': 1}
+    page = ('"etag"', b'{"code":200}')
+    cache.set('user', user)
+    cache.set('page', page)
+    return {
+        'user_equal': cache.get('user') == user,
+        'page_equal': tuple(cache.get('page')) == page,
+        'stored_is_json': redis_client.get('cache:roundtrip:user').startswith(b'{')
+    }
+
+def check_stale_load(backend, redis_client, protected):
+    """
+    reader 在 worker A 上加载 key：读到旧数据后暂停，writer 在 worker B 上更新并 delete，然后 reader 写入缓存
+
+    Returns:
+        bool: 缓存中最后是否留下了旧数据
+    """
+    reader, writer = make_workers(backend, redis_client)
+    if backend == 'memory':
+        writer = reader  # 进程内缓存只有同一个 worker 的 delete 才有意义
+    key = f"stale-{protected}"
+    row = {'value': 'old'}
+    loaded, deleted = threading.Event(), threading.Event()
+
+    def loader():
+        value = dict(row)  # 从“数据库”读到旧数据
+        loaded.set()
+        deleted.wait(5)
+        return value
+
+    def load():
+        if protected:
+            reader.get_or_load(key, loader)
+        elif reader.get(key) is None:
+            reader.set(key, loader())
+
+    thread = threading.Thread(target=load)
+    thread.start()
+    loaded.wait(5)
+    row['value'] = 'new'  # 写入数据库并提交
+    writer.delete(key)
+    deleted.set()
+    thread.join()
+    return reader.get(key) == {'value': 'old'}
+
+def check_workers(backend, redis_client):
+    """
+    Returns:
+        bool: worker B 在 worker A 写入并 delete 后是否还读到旧数据
+    """
+    worker_a, worker_b = make_workers(backend, redis_client)
+    worker_a.set('user:1', {'name': 'old'})
+    worker_b.set('user:1', {'name': 'old'})
+    worker_a.delete('user:1')
+    return worker_b.get('user:1') is not None
+
+def run_hits(cache, iterations):
+    cache.get_or_load('hot', lambda: {'id': 1, 'name': 'user1'})
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cache.get_or_load('hot', lambda: None)
+    elapsed = time.perf_counter() - start
+    return round(iterations / elapsed, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存测试")
+    parser.add_argument('--iterations', type=int, default=20000, help="命中测试的次数")
+    parser.add_argument('--redis-latency', type=float, default=0.0, help="替身 Redis 每条命令的延迟（秒）")
+    args = parser.parse_args()
+
+    redis_client = FakeRedis()
+    results = {
+        'config': {'worker_processes': WORKER_PROCESSES, 'cache_ttl': CACHE_TTL},
+        'roundtrip': check_roundtrip(redis_client),
+        'stale_load': {backend: {'protected': check_stale_load(backend, redis_client, True),
+                                 'unprotected': check_stale_load(backend, redis_client, False)}
+                       for backend in ('memory', 'redis')},
+        'workers_stale': {backend: check_workers(backend, redis_client) for backend in ('memory', 'redis')},
+    }
+    redis_client.latency = args.redis_latency
+    results['hits_per_second'] = {
+        'memory': run_hits(MemoryCache('hits'), args.iterations),
+        'redis': run_hits(RedisCache('hits', client=redis_client), args.iterations),
+    }
+    results['ok'] = (all(results['roundtrip'].values())
+                     and not any(item['protected'] for item in results['stale_load'].values())
+                     and not results['workers_stale']['redis'])
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
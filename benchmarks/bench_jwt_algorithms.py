@@ -0,0 +1,81 @@
+"""
+JWT 签名算法基准测试：HS256 / RS256 / ES256 / EdDSA 的签名和验证吞吐量
+
+每种算法分别测试：
+    sign:          签发 token（使用已解析的私钥对象）
+    verify:        验证 token（使用已解析的公钥对象，即 KeySet 的做法）
+    verify(PEM):   每次验证都从 PEM 文本解析公钥（不缓存密钥对象时的代价）
+
+密钥在内存中临时生成，不需要准备密钥文件。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_jwt_algorithms --iterations 2000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+
+def make_keys():
+    """
+    Returns:
+        dict: 算法 -> (签名密钥, 验证密钥, 验证密钥的 PEM 文本)
+    """
+    secret = 'bench-secret-key-' + '0' * 32
+    keys = {'HS256': (secret, secret, None)}
+    for algorithm, private_key in (
+        ('RS256', rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+        ('ES256', ec.generate_private_key(ec.SECP256R1())),
+        ('EdDSA', ed25519.Ed25519PrivateKey.generate()),
+    ):
+        public_key = private_key.public_key()
+        pem = public_key.public_bytes(serialization.Encoding.PEM,
+                                      serialization.PublicFormat.SubjectPublicKeyInfo)
+        keys[algorithm] = (private_key, public_key, pem)
+    return keys
+
+def rate(func, iterations):
+    """
+    Returns:
+        tuple: (每秒次数, 每次耗时（微秒）)
+    """
+    func()  # 预热
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, elapsed / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="JWT 签名算法基准测试")
+    parser.add_argument('--iterations', type=int, default=2000, help="每项测试的次数")
+    args = parser.parse_args()
+
+    payload = {
+        'user_id': 1,
+        'username': 'bench',
+        'type': 'access',
+        'exp': datetime.utcnow() + timedelta(hours=1),
+        'iat': datetime.utcnow(),
+        'jti': '0' * 32,
+        'sid': '1' * 32
+    }
+
+    print(f"{'算法':<8}{'签名(次/秒)':>14}{'验证(次/秒)':>14}{'验证PEM(次/秒)':>16}{'token长度':>10}")
+    for algorithm, (signing_key, verify_key, pem) in make_keys().items():
+        token = jwt.encode(payload, signing_key, algorithm=algorithm, headers={'kid': 'bench'})
+        sign_rate, _ = rate(lambda: jwt.encode(payload, signing_key, algorithm=algorithm,
+                                               headers={'kid': 'bench'}), args.iterations)
+        verify_rate, _ = rate(lambda: jwt.decode(token, verify_key, algorithms=[algorithm]), args.iterations)
+        if pem is None:
+            pem_column = f"{'-':>16}"
+        else:
+            pem_rate, _ = rate(lambda: jwt.decode(token, serialization.load_pem_public_key(pem),
+                                                  algorithms=[algorithm]), args.iterations)
+            pem_column = f"{pem_rate:>16.0f}"
+        print(f"{algorithm:<8}{sign_rate:>14.0f}{verify_rate:>14.0f}{pem_column}{len(token):>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+过载保护测试：用注入延迟 / 故障的替身数据库模拟 MySQL 变慢和宕机
+
+阶段:
+    normal:   数据库正常（每次调用 --latency 秒）
+    slow:     数据库变慢（每次调用 --slow-latency 秒，超过目标耗时），并发上限下降，多余请求快速返回 503
+    down:     数据库连不上（每次调用抛出 OperationalError），连续失败后熔断，请求立即返回 503 + Retry-After
+    recovery: 数据库恢复，熔断到期后探测成功，恢复正常
+
+每个阶段输出状态码分布、延迟分位数和阶段结束时的并发上限 / 熔断器状态。
+用 --no-guard 关闭过载保护对比（请求在连接池排队，直到拿到连接或超过截止时间返回 504）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_overload --requests 400 --concurrency 16
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import pymysql
+from benchmarks.common import summarize, install_fake_db
+from benchmarks.fake_db import FakeDatabase
+from utils.database import DB_FAILURE_TYPES
+from utils.overload import LoadGuard, AdaptiveLimiter, CircuitBreaker
+from utils.jwt_utils import generate_token
+
+def run_phase(app, headers, path, requests, concurrency):
+    """
+    Returns:
+        dict: summarize 的结果 + 状态码分布
+    """
+    local = threading.local()
+
+    def one_request(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+    summary = summarize([r[0] for r in results], elapsed, sum(1 for r in results if r[1] >= 400))
+    summary['status'] = dict(sorted(Counter(r[1] for r in results).items()))
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="过载保护测试")
+    parser.add_argument('--requests', type=int, default=400, help="每个阶段的请求数")
+    parser.add_argument('--concurrency', type=int, default=16, help="并发线程数")
+    parser.add_argument('--latency', type=float, default=0.005, help="正常时每次数据库调用的延迟（秒）")
+    parser.add_argument('--slow-latency', type=float, default=0.3, help="变慢时每次数据库调用的延迟（秒）")
+    parser.add_argument('--deadline', type=float, default=1.0, help="请求截止时间（秒，通过 X-Request-Timeout 传入）")
+    parser.add_argument('--reset-timeout', type=float, default=2.0, help="熔断多少秒后放行探测请求")
+    parser.add_argument('--pool-size', type=int, default=10, help="模拟的连接池大小")
+    parser.add_argument('--no-guard', action='store_true', help="关闭过载保护")
+    args = parser.parse_args()
+
+    guard = LoadGuard(
+        limiter=AdaptiveLimiter(initial_limit=args.pool_size, min_limit=2, max_limit=args.pool_size,
+                                target_latency=0.2),
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=args.reset_timeout),
+        max_wait=0.1,
+        failure_types=DB_FAILURE_TYPES,
+        enabled=not args.no_guard
+    )
+    fake = FakeDatabase(latency=args.latency, seed_users=1000, guard=guard, max_connections=args.pool_size)
+    install_fake_db(fake)
+
+    from app import app
+    headers = {
+        'Authorization': f'Bearer {generate_token(1, "user1")}',
+        'X-Request-Timeout': str(args.deadline)
+    }
+    # 搜索接口没有缓存，每个请求都会查询数据库
+    path = '/api/user/search?name=user1&limit=20'
+
+    phases = [
+        ('normal', args.latency, None),
+        ('slow', args.slow_latency, None),
+        ('down', args.latency, pymysql.err.OperationalError(2003, "Can't connect to MySQL server")),
+        ('recovery', args.latency, None),
+    ]
+    results = {}
+    for name, latency, failure in phases:
+        if name == 'recovery':
+            time.sleep(args.reset_timeout)  # 等熔断到期
+        fake.latency = latency
+        fake.error = failure
+        results[name] = run_phase(app, headers, path, args.requests, args.concurrency)
+        results[name]['guard'] = guard.snapshot()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+响应序列化基准测试：10k 行的列表响应
+
+对比三种情况：
+    baseline: 标准库 json（Flask 默认 provider）+ uuid4 请求 ID + 每次 strftime
+    stdlib:   FastJSONProvider 回退到标准库 json + 新的请求 ID / 时间戳
+    fast:     FastJSONProvider + orjson（未安装 orjson 时跳过）
+每种情况同时检查 data 的序列化结果是否与 baseline 一致（输出格式不能变）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_response --rows 10000 --iterations 20
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from utils import json_provider
+from utils.json_provider import FastJSONProvider
+from utils.response import success
+
+def make_rows(count):
+    """模拟 DictCursor 返回的行（包含 datetime 和 Decimal）"""
+    now = datetime.now()
+    return [
+        {
+            'id': i,
+            'name': f'用户{i}',
+            'email': f'user{i}@example.com',
+            'mobile': f'1380000{i % 10000:04d}',
+            'balance': Decimal('1234.56'),
+            'created_at': now
+        }
+        for i in range(count)
+    ]
+
+def baseline_success(data, message="操作成功", code=200):
+    """优化前的 success 实现"""
+    response = {
+        "code": code,
+        "success": True,
+        "message": message,
+        "data": data,
+        "request_id": str(uuid.uuid4()),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    return jsonify(response), code
+
+def serialize_rows(app, rows):
+    """用 app 的 JSON provider 序列化前 10 行（比较输出格式）"""
+    with app.app_context():
+        return app.json.loads(app.json.dumps(rows[:10]))
+
+def measure(app, func, rows, iterations):
+    """返回每次调用的平均耗时（毫秒）"""
+    with app.test_request_context():
+        func(rows)  # 预热
+        start = time.perf_counter()
+        for _ in range(iterations):
+            response, _ = func(rows)
+            response.get_data()
+        return (time.perf_counter() - start) / iterations * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化基准测试")
+    parser.add_argument('--rows', type=int, default=10000, help="列表行数")
+    parser.add_argument('--iterations', type=int, default=20, help="每种情况的调用次数")
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    results = {}
+    same_format = {}
+    app = Flask(__name__)
+    app.json = DefaultJSONProvider(app)
+    results['baseline'] = measure(app, baseline_success, rows, args.iterations)
+    expected = serialize_rows(app, rows)
+
+    saved = json_provider.orjson
+    json_provider.orjson = None
+    try:
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        results['stdlib'] = measure(app, success, rows, args.iterations)
+        same_format['stdlib'] = serialize_rows(app, rows) == expected
+    finally:
+        json_provider.orjson = saved
+
+    if saved is not None:
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        results['fast'] = measure(app, success, rows, args.iterations)
+        same_format['fast'] = serialize_rows(app, rows) == expected
+
+    for name, elapsed in results.items():
+        print(f"{name:<10}{elapsed:>10.2f} ms/次{results['baseline'] / elapsed:>8.1f}x"
+              f"  格式一致: {same_format.get(name, True)}")
+
+if __name__ == '__main__':
+    main()
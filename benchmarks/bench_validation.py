@@ -0,0 +1,63 @@
+"""
+数据验证 + SQL 构建吞吐量基准测试（/api/user/add 和 /api/user/update 的热路径）
+
+对比：
+    before: 每个请求新建 schema，按请求数据动态拼接 SQL
+    after:  复用模块级 schema 实例，SQL 模板按字段组合缓存
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_validation --iterations 20000
+"""
+import argparse
+import time
+from utils.schemas import (UserSchema, UserUpdateSchema, user_schema, user_update_schema,
+                           USER_COLUMNS, USER_UPDATE_COLUMNS)
+from utils.sql import split_fields, insert_sql, update_sql
+
+ADD_PAYLOAD = {'name': 'bench', 'email': 'bench@example.com', 'mobile': '13800000000', 'userid': 'B1'}
+UPDATE_PAYLOAD = {'name': 'renamed', 'email': 'renamed@example.com'}
+
+def add_before(data):
+    validated = UserSchema().load(data)
+    fields = ', '.join(validated.keys())
+    placeholders = ', '.join(['%s'] * len(validated))
+    return f"INSERT INTO users ({fields}) VALUES ({placeholders})", tuple(validated.values())
+
+def add_after(data):
+    fields, values = split_fields(user_schema.load(data), USER_COLUMNS)
+    return insert_sql('users', fields), values
+
+def update_before(data):
+    validated = UserUpdateSchema().load(data)
+    sets = ', '.join(f"{key}=%s" for key in validated)
+    return f"UPDATE users SET {sets} WHERE id=%s", tuple(validated.values()) + (1,)
+
+def update_after(data):
+    fields, values = split_fields(user_update_schema.load(data), USER_UPDATE_COLUMNS)
+    return update_sql('users', fields), values + (1,)
+
+def measure(func, payload, iterations):
+    """返回每秒处理的次数"""
+    func(payload)  # 预热
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(payload)
+    return iterations / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="数据验证吞吐量基准测试")
+    parser.add_argument('--iterations', type=int, default=20000, help="每种情况的调用次数")
+    args = parser.parse_args()
+
+    cases = [
+        ('add', add_before, add_after, ADD_PAYLOAD),
+        ('update', update_before, update_after, UPDATE_PAYLOAD),
+    ]
+    print(f"{'接口':<10}{'before(次/秒)':>16}{'after(次/秒)':>16}{'提升':>8}")
+    for name, before, after, payload in cases:
+        slow = measure(before, payload, args.iterations)
+        fast = measure(after, payload, args.iterations)
+        print(f"{name:<10}{slow:>16,.0f}{fast:>16,.0f}{fast / slow:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
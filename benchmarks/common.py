@@ -0,0 +1,56 @@
+"""基准测试公共工具"""
+import math
+
+def percentile(sorted_values, p):
+    """
+    计算百分位数（最近秩法）
+
+    Args:
+        sorted_values: 已排序的数值列表
+        p: 百分位（0-100）
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    汇总一组请求的延迟
+
+    Args:
+        latencies: 每个请求的耗时（秒）
+        elapsed: 整轮测试的总耗时（秒）
+        errors: 失败请求数
+
+    Returns:
+        dict: 请求数、吞吐量（请求/秒）和 p50/p95/p99 延迟（毫秒）
+    """
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0
+    }
+
+def install_fake_db(fake):
+    """
+    把路由模块使用的数据库实例替换成替身
+
+    Args:
+        fake: FakeDatabase 实例
+    """
+    import routes.user
+    import routes.auth
+    import routes.metrics
+    import routes.health
+
+    from utils.extensions import audit_log
+
+    for module in (routes.user, routes.auth, routes.metrics, routes.health):
+        module.db = fake
+    audit_log.db = fake
@@ -0,0 +1,309 @@
+"""
+本地数据库替身：用内存 SQLite 模拟 Database / AsyncDatabase
+
+接口与真实类一致（query / run / execute / execute_many / execute_batches / stream / transaction），
+SQL 中的 %s 占位符会转换成 SQLite 的 ?。每次调用前可以注入固定延迟，
+模拟网络往返和 MySQL 执行时间；传入 guard 时每次调用与真实类一样经过过载保护，
+延迟超过请求剩余时间时抛出 DeadlineExceeded（模拟查询超时），设置 error 后每次调用抛出该异常（模拟数据库故障）。
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+from utils.database import QueryRegistry
+from utils.overload import DeadlineExceeded, remaining_time
+from utils.queries import register_queries
+
+SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT,
+    mobile TEXT,
+    userid TEXT,
+    password TEXT,
+    status INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE TRIGGER users_updated_at AFTER UPDATE ON users
+BEGIN
+    UPDATE users SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+CREATE INDEX idx_users_status_id ON users (status, id);
+CREATE INDEX idx_users_name ON users (name);
+CREATE TABLE audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TIMESTAMP NOT NULL,
+    actor_id INTEGER,
+    actor_name TEXT,
+    action TEXT NOT NULL,
+    target_type TEXT NOT NULL,
+    target_id INTEGER,
+    changes TEXT,
+    request_id TEXT,
+    ip TEXT
+);
+CREATE TABLE users_archive (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    mobile TEXT,
+    userid TEXT,
+    status INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP NOT NULL
+);
+"""
+
+def _to_sqlite(sql):
+    """把 MySQL 风格的 SQL 转换成 SQLite 可执行的 SQL（SQLite 写事务本身是串行的，FOR UPDATE 直接去掉）"""
+    return sql.replace('%s', '?').replace('INSERT IGNORE', 'INSERT OR IGNORE').replace(' FOR UPDATE', '')
+
+def _dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class _FakeCursor:
+    """模拟 pymysql DictCursor（只实现路由用到的方法）"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self._lastrowid = None
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(_to_sqlite(sql), tuple(params or ()))
+        self._lastrowid = self._cursor.lastrowid
+        return self._cursor.rowcount
+
+    def executemany(self, sql, params_list):
+        self._cursor.executemany(_to_sqlite(sql), [tuple(p) for p in params_list])
+        # 与 pymysql 的多行 INSERT 一致：lastrowid 为这一批第一行的 id
+        self._lastrowid = None
+        if sql.lstrip().upper().startswith('INSERT') and self._cursor.rowcount > 0:
+            last_id = self._conn.execute("SELECT last_insert_rowid() AS id").fetchone()['id']
+            self._lastrowid = last_id - self._cursor.rowcount + 1
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+class _FakeConnection:
+    """模拟事务中使用的连接"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args):
+        return _FakeCursor(self._conn)
+
+class FakeDatabase:
+    """同步数据库替身（线程安全，延迟在加锁之前注入，多个请求的等待可以重叠）"""
+
+    def __init__(self, latency=0.0, seed_users=0, guard=None, max_connections=0):
+        """
+        Args:
+            latency: 每次数据库调用注入的延迟（秒）
+            seed_users: 初始化时写入的用户数量
+            guard: 过载保护（utils.overload.LoadGuard），None 表示不保护
+            max_connections: 模拟连接池大小（同时进行的调用数，等待时不超过请求剩余时间；0 表示不限制）
+        """
+        self.latency = latency
+        self.guard = guard
+        self._slots = threading.BoundedSemaphore(max_connections) if max_connections > 0 else None
+        self.error = None  # 设置为异常实例后，每次调用都抛出该异常
+        self.replica_lag = 0  # get_replica_lag 返回的从库延迟（秒，None 表示复制停止）
+        # PARSE_DECLTYPES：TIMESTAMP 列返回 datetime，与 pymysql 一致
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.row_factory = _dict_factory
+        self._lock = threading.RLock()
+        self._conn.executescript(SCHEMA)
+        # MySQL 命名锁（单进程内总是拿到锁）
+        self._conn.create_function('GET_LOCK', 2, lambda name, timeout: 1)
+        self._conn.create_function('RELEASE_LOCK', 1, lambda name: 1)
+        self.queries = QueryRegistry()
+        register_queries(self.queries)
+        if seed_users:
+            self.seed(seed_users)
+
+    def seed(self, count, password='password'):
+        """
+        写入测试用户（name 为 user1、user2 ...，密码相同）
+        """
+        rows = [(f"user{i}", f"user{i}@example.com", f"1380000{i:04d}", f"U{i}", password)
+                for i in range(1, count + 1)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO users (name, email, mobile, userid, password) VALUES (?, ?, ?, ?, ?)", rows)
+
+    @contextmanager
+    def _connection(self):
+        """一次调用：经过过载保护，再占用一个模拟连接"""
+        with self.guard.call() if self.guard is not None else nullcontext():
+            if self._slots is None:
+                yield
+                return
+            remaining = remaining_time()
+            if not self._slots.acquire(timeout=remaining if remaining is not None else None):
+                raise DeadlineExceeded("等待数据库连接超过请求截止时间")
+            try:
+                yield
+            finally:
+                self._slots.release()
+
+    def _sleep(self):
+        if self.error is not None:
+            raise self.error
+        if self.latency <= 0:
+            return
+        remaining = remaining_time()
+        if remaining is not None and remaining < self.latency:
+            time.sleep(max(remaining, 0))
+            raise DeadlineExceeded("数据库查询超过请求截止时间")
+        time.sleep(self.latency)
+
+    def query(self, sql, params=None, primary=False):
+        with self._connection():
+            self._sleep()
+            with self._lock:
+                return self._conn.execute(_to_sqlite(sql), tuple(params or ())).fetchall()
+
+    def execute(self, sql, params=None):
+        with self._connection():
+            self._sleep()
+            with self._lock:
+                cursor = self._conn.execute(_to_sqlite(sql), tuple(params or ()))
+                return {"affected_rows": cursor.rowcount, "last_id": cursor.lastrowid}
+
+    def run(self, name, *params, primary=False):
+        query = self.queries.get(name)
+        if len(params) != query.param_count:
+            raise TypeError(f"查询 {name} 需要 {query.param_count} 个参数，实际传入 {len(params)} 个")
+        start = time.perf_counter()
+        if query.kind == 'read':
+            rows = self.query(query.sql, params)
+            result = (rows[0] if rows else None) if query.fetch == 'one' else rows
+            count = len(rows)
+        else:
+            result = self.execute(query.sql, params)
+            count = result["affected_rows"]
+        query.observe(time.perf_counter() - start, count)
+        return result
+
+    def execute_many(self, sql, params_list):
+        with self._connection():
+            self._sleep()
+            with self._lock:
+                cursor = self._conn.executemany(_to_sqlite(sql), [tuple(p) for p in params_list])
+                return {"affected_rows": cursor.rowcount, "success": True}
+
+    def execute_batches(self, statements, batch_size=500):
+        affected_rows = 0
+        batches = 0
+        insert_ids = []
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            for sql, params_list in statements:
+                statement_ids = []
+                for start in range(0, len(params_list), batch_size):
+                    self._sleep()
+                    batch = params_list[start:start + batch_size]
+                    cursor.executemany(sql, batch)
+                    affected_rows += cursor.rowcount
+                    batches += 1
+                    if cursor.lastrowid and cursor.rowcount == len(batch):
+                        statement_ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(batch)))
+                insert_ids.append(statement_ids if len(statement_ids) == len(params_list) else [])
+        return {"affected_rows": affected_rows, "batches": batches, "insert_ids": insert_ids}
+
+    def stream(self, sql, params=None, chunk_size=1000, primary=False):
+        rows = self.query(sql, params)
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    @contextmanager
+    def transaction(self):
+        with self._connection(), self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield _FakeConnection(self._conn)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def get_connection(self, readonly=False, sample=True):
+        with self._connection():
+            yield _FakeConnection(self._conn)
+
+    def get_replica_lag(self):
+        return self.replica_lag
+
+    def get_pool_status(self):
+        return {"pool_exists": True, "message": "FakeDatabase"}
+
+    def get_query_stats(self):
+        return self.queries.catalog()
+
+class AsyncFakeDatabase:
+    """异步数据库替身（与同步替身共用同一份数据，延迟用 asyncio.sleep 注入）"""
+
+    def __init__(self, fake):
+        """
+        Args:
+            fake: FakeDatabase 实例（数据来源，其 latency 作为异步延迟）
+        """
+        self._fake = fake
+
+    async def _sleep(self):
+        if self._fake.latency > 0:
+            await asyncio.sleep(self._fake.latency)
+
+    async def query(self, sql, params=None):
+        await self._sleep()
+        with self._fake._lock:
+            return self._fake._conn.execute(_to_sqlite(sql), tuple(params or ())).fetchall()
+
+    async def execute(self, sql, params=None):
+        await self._sleep()
+        with self._fake._lock:
+            cursor = self._fake._conn.execute(_to_sqlite(sql), tuple(params or ()))
+            return {"affected_rows": cursor.rowcount, "last_id": cursor.lastrowid}
+
+    async def run(self, name, *params):
+        await self._sleep()
+        return self._fake.run(name, *params)
+
+    async def execute_many(self, sql, params_list):
+        await self._sleep()
+        with self._fake._lock:
+            cursor = self._fake._conn.executemany(_to_sqlite(sql), [tuple(p) for p in params_list])
+            return {"affected_rows": cursor.rowcount, "success": True}
+
+    @asynccontextmanager
+    async def transaction(self):
+        await self._sleep()
+        with self._fake.transaction() as conn:
+            yield conn
+
+    async def close(self):
+        pass
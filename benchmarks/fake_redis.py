@@ -0,0 +1,82 @@
+"""
+本地 Redis 替身：用字典模拟 redis.Redis 中 RedisCache / RedisRevocationStore 用到的命令
+
+支持 get / mget / set（ex、nx）/ delete / exists / incr / scan_iter，过期按调用时的时间惰性判断。
+值和真实客户端一样以 bytes 返回；设置 latency 后每条命令前等待固定时间，模拟网络往返。
+多个 RedisCache 共用同一个 FakeRedis 即可模拟多个 worker 共享一个 Redis。
+"""
+import fnmatch
+import threading
+import time
+
+class FakeRedis:
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency: 每条命令的延迟（秒）
+        """
+        self.latency = latency
+        self.commands = 0
+        self._data = {}  # key -> (值, 过期时间或 None)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        self.commands += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _encode(self, value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def get(self, key):
+        self._call()
+        with self._lock:
+            return self._lookup(key)
+
+    def mget(self, keys):
+        self._call()
+        with self._lock:
+            return [self._lookup(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        self._call()
+        with self._lock:
+            if nx and self._lookup(key) is not None:
+                return None
+            self._data[key] = (self._encode(value), time.monotonic() + ex if ex else None)
+            return True
+
+    def delete(self, *keys):
+        self._call()
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def exists(self, *keys):
+        self._call()
+        with self._lock:
+            return sum(1 for key in keys if self._lookup(key) is not None)
+
+    def incr(self, key):
+        self._call()
+        with self._lock:
+            value = int(self._lookup(key) or 0) + 1
+            expires_at = self._data[key][1] if key in self._data else None
+            self._data[key] = (self._encode(value), expires_at)
+            return value
+
+    def scan_iter(self, match='*'):
+        self._call()
+        with self._lock:
+            keys = [key for key in list(self._data) if self._lookup(key) is not None]
+        return iter([key for key in keys if fnmatch.fnmatchcase(key, match)])
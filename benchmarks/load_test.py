@@ -0,0 +1,182 @@
+"""
+接口压测：吞吐量和 p50/p95/p99 延迟
+
+在进程内启动应用（数据库替换为 benchmarks/fake_db.py 的替身），
+按指定并发依次压测 login、refresh、list、get、add、update、delete，
+结果以 JSON 输出，便于保存下来和之后的结果对比。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.load_test --requests 1000 --concurrency 16 --output result.json
+    python -m benchmarks.load_test --endpoints list,get --latency 0.002
+
+回放录制的流量（JSONL，每行一个请求，格式同 requests.jsonl 一行一个 JSON 对象）:
+    {"name": "list", "method": "GET", "path": "/api/user/list?limit=50"}
+    {"name": "add", "method": "POST", "path": "/api/user/add", "json": {"name": "a", ...}}
+    python -m benchmarks.load_test --replay traffic.jsonl
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import summarize, install_fake_db
+from benchmarks.fake_db import FakeDatabase
+from utils.jwt_utils import generate_token, generate_refresh_token
+
+ENDPOINTS = ('login', 'refresh', 'list', 'get', 'batch_get', 'add', 'update', 'delete')
+
+class Scenario:
+    """生成每个接口的请求参数（method, path, json）"""
+
+    def __init__(self, seed_users):
+        self.seed_users = seed_users
+        self._counter = itertools.count(1)
+
+    def _random_id(self):
+        return random.randint(1, self.seed_users)
+
+    def login(self):
+        user_id = self._random_id()
+        return 'POST', '/api/auth/login', {'username': f'user{user_id}', 'password': 'password'}
+
+    def refresh(self):
+        # refresh token 只能使用一次（轮换），每个请求使用新签发的 token
+        return 'POST', '/api/auth/refresh', {'refresh_token': generate_refresh_token(1, 'user1')}
+
+    def list(self):
+        return 'GET', '/api/user/list?limit=20&fields=id,name,email', None
+
+    def get(self):
+        return 'GET', f'/api/user/{self._random_id()}', None
+
+    def batch_get(self):
+        # 一个页面需要的 20 个用户，一次请求获取
+        ids = ','.join(str(self._random_id()) for _ in range(20))
+        return 'GET', f'/api/user/batch/get?ids={ids}', None
+
+    def add(self):
+        n = next(self._counter)
+        return 'POST', '/api/user/add', {
+            'name': f'bench{n}', 'email': f'bench{n}@example.com', 'mobile': '13800000000', 'userid': f'B{n}'
+        }
+
+    def update(self):
+        n = next(self._counter)
+        # 不修改 name，避免影响 login 场景
+        return 'PUT', f'/api/user/update/{self._random_id()}', {'email': f'renamed{n}@example.com', 'mobile': f'139{n:08d}'}
+
+    def delete(self):
+        return 'DELETE', f'/api/user/delete/{self._random_id()}', None
+
+def run_phase(app, headers, requests, concurrency):
+    """
+    以固定并发执行一组请求
+
+    Args:
+        requests: [(method, path, json), ...]
+
+    Returns:
+        dict: summarize 的结果
+    """
+    local = threading.local()
+
+    def one_request(item):
+        method, path, body = item
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, requests))
+    elapsed = time.perf_counter() - start
+    return summarize([r[0] for r in results], elapsed, sum(1 for r in results if r[1] >= 400))
+
+def load_replay(path):
+    """
+    读取回放文件，按 name（没有时用 METHOD path）分组
+
+    Returns:
+        dict: name -> [(method, path, json), ...]
+    """
+    groups = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            method = item.get('method', 'GET').upper()
+            name = item.get('name') or f"{method} {item['path']}"
+            groups.setdefault(name, []).append((method, item['path'], item.get('json')))
+    return groups
+
+def git_revision():
+    """当前代码版本（不在 git 仓库中时返回 None）"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="接口压测")
+    parser.add_argument('--requests', type=int, default=1000, help="每个接口的请求数")
+    parser.add_argument('--concurrency', type=int, default=16, help="并发线程数")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="要压测的接口，逗号分隔")
+    parser.add_argument('--latency', type=float, default=0.0, help="每次数据库调用注入的延迟（秒）")
+    parser.add_argument('--seed-users', type=int, default=10000, help="写入替身数据库的用户数")
+    parser.add_argument('--replay', help="回放的 JSONL 流量文件（指定后忽略 --endpoints）")
+    parser.add_argument('--output', help="结果写入的 JSON 文件，不指定时输出到标准输出")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    fake = FakeDatabase(latency=args.latency, seed_users=args.seed_users)
+    install_fake_db(fake)
+    app = create_app()
+    # 压测请求都来自同一个地址，关闭登录限流，测的是接口本身的吞吐
+    import routes.auth
+    routes.auth.login_ip_limiter.enabled = routes.auth.login_user_limiter.enabled = False
+    headers = {'Authorization': f'Bearer {generate_token(1, "user1")}'}
+
+    if args.replay:
+        phases = load_replay(args.replay)
+    else:
+        scenario = Scenario(args.seed_users)
+        names = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            parser.error(f"未知接口: {', '.join(sorted(unknown))}")
+        phases = {name: [getattr(scenario, name)() for _ in range(args.requests)] for name in names}
+
+    results = {name: run_phase(app, headers, requests, args.concurrency) for name, requests in phases.items()}
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {
+            'concurrency': args.concurrency,
+            'db_latency_ms': args.latency * 1000,
+            'seed_users': args.seed_users,
+            'replay': args.replay
+        },
+        'endpoints': results
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
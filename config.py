@@ -9,10 +9,125 @@ DB_CONFIG = {
     'database': os.getenv('DB_DATABASE','mydb'),  # 数据库名
     'port': int(os.getenv('DB_PORT','3306')),              # 端口号
     'max_connections': int(os.getenv('DB_MAX_CONNECTIONS','10')),  # 池最大连接数
-    'min_connections': int(os.getenv('DB_MIN_CONNECTIONS','2'))    # 池最小连接数
+    'min_connections': int(os.getenv('DB_MIN_CONNECTIONS','2')),   # 池最小连接数
+    'max_cached': int(os.getenv('DB_MAX_CACHED','5')),              # 池最多保留的空闲连接数
+    'max_usage': int(os.getenv('DB_MAX_USAGE','0')),                # 单个连接最多复用次数（0=不限制）
+    'ping': int(os.getenv('DB_PING','1')),                          # 连接检查模式（0=不检查，1=借出时，2=创建游标时，4=执行时，7=总是）
+    'checkout_timeout': float(os.getenv('DB_CHECKOUT_TIMEOUT','5')), # 连接池满时最多等待的秒数（<=0 表示一直等待）
+    # 读写分离：从库地址（逗号分隔的 host 或 host:port，账号与主库相同），不配置时全部走主库
+    'replicas': [host.strip() for host in os.getenv('DB_REPLICAS','').split(',') if host.strip()],
+    'read_routing': os.getenv('DB_READ_ROUTING','round_robin'),                 # 从库选择策略（round_robin / least_outstanding）
+    'health_check_interval': float(os.getenv('DB_HEALTH_CHECK_INTERVAL','5')),  # 从库不可用后的重试间隔 / 主动健康检查间隔（秒）
+    'max_replica_lag': float(os.getenv('DB_MAX_REPLICA_LAG','0')),              # 复制延迟超过该秒数的从库不参与读（0=不检查延迟，只检查连通性）
+    'pin_seconds': int(os.getenv('DB_READ_YOUR_WRITES_SECONDS','5'))            # 写入后该客户端的读请求走主库的秒数（0=关闭）
 }
 
 # JWT配置
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY','dev-secret-key') # JWT密钥
+JWT_KEY_DIR = os.getenv('JWT_KEY_DIR','') # 非对称签名密钥目录（<kid>.pem 私钥 / <kid>.pub.pem 公钥），为空时使用 HS256
+JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID','') # 签名使用的 kid（为空时使用字典序最大的私钥）
+JWT_KEY_RELOAD_INTERVAL = int(os.getenv('JWT_KEY_RELOAD_INTERVAL','30')) # 检查密钥目录变化的间隔（秒，0=不自动重新加载）
+JWT_ACCEPT_HS256 = os.getenv('JWT_ACCEPT_HS256','false').lower() == 'true' # 切换到非对称签名期间是否仍接受旧的 HS256 token
 JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS','24')) # token过期时间
-REFRESH_TOKEN_EXPIRATION_DAYS = 7 # refresh_token过期时间
\ No newline at end of file
+REFRESH_TOKEN_EXPIRATION_DAYS = 7 # refresh_token过期时间
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE','10000')) # 验证结果缓存最多保存的 token 数量（0 表示关闭缓存）
+TOKEN_NEGATIVE_CACHE_TTL = int(os.getenv('TOKEN_NEGATIVE_CACHE_TTL','60')) # 无效 token 的缓存时间（秒，0 表示不缓存）
+TOKEN_NEGATIVE_CACHE_SIZE = int(os.getenv('TOKEN_NEGATIVE_CACHE_SIZE','1000')) # 无效 token 单独缓存的最大数量（与有效 token 分开，互不挤占）
+REVOCATION_BLOOM_CAPACITY = int(os.getenv('REVOCATION_BLOOM_CAPACITY','100000')) # 内存吊销列表布隆过滤器的预计容量
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv('REVOCATION_BLOOM_ERROR_RATE','0.001')) # 布隆过滤器预计误判率
+
+# 分页配置
+PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT','20')) # 默认每页条数
+PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT','100')) # 每页条数上限
+USER_SEARCH_FULLTEXT = os.getenv('USER_SEARCH_FULLTEXT','false').lower() == 'true' # 是否开启用户名全文检索（需要先执行 migrations/005）
+USER_SEARCH_STATUSES = [int(s) for s in os.getenv('USER_SEARCH_STATUSES','1').split(',') if s.strip()] # 搜索接口允许查询的用户状态（默认只有正常用户，不能搜索已删除的 7）
+
+# 导出配置
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE','1000')) # 每批从数据库读取的行数
+EXPORT_MAX_CHUNK_SIZE = int(os.getenv('EXPORT_MAX_CHUNK_SIZE','10000')) # 每批行数上限
+
+# 批量接口配置
+BATCH_SIZE = int(os.getenv('BATCH_SIZE','500')) # 每批写入数据库的行数
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS','5000')) # 单次请求最多提交的条数
+MULTI_GET_MAX_IDS = int(os.getenv('MULTI_GET_MAX_IDS','100')) # 批量获取用户时单次最多的 id 数量
+
+# 缓存配置
+WORKER_PROCESSES = int(os.getenv('WEB_CONCURRENCY','1')) # 部署的 worker 进程数（gunicorn.conf.py 会按 workers 设置）
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS','4')) # 每个 worker 的线程数（与 gunicorn.conf.py 一致）
+CACHE_BACKEND = os.getenv('CACHE_BACKEND','memory') # 缓存类型：memory（进程内）/ redis（共享）
+CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE','10000')) # 进程内缓存最多保存的 key 数量
+# 多 worker 的进程内缓存：写入只能清掉处理写入的那个 worker 的缓存，其它 worker 最多返回 TTL 秒的旧数据
+CACHE_TTL = int(os.getenv('CACHE_TTL','300' if CACHE_BACKEND == 'redis' or WORKER_PROCESSES <= 1 else '5')) # 默认过期时间（秒）
+CACHE_TOMBSTONE_TTL = int(os.getenv('CACHE_TOMBSTONE_TTL','10')) # 删除缓存后阻止旧数据写回的秒数（不小于一次加载的最长耗时）
+REDIS_URL = os.getenv('REDIS_URL','redis://localhost:6379/0') # Redis 地址
+LIST_CACHE_TTL = int(os.getenv('LIST_CACHE_TTL','10')) # 用户列表响应缓存时间（秒，0=关闭；写入后立即失效，TTL 只限制其它 worker 的过期延迟）
+REVOCATION_BACKEND = os.getenv('REVOCATION_BACKEND',CACHE_BACKEND) # token 吊销列表：memory（每个 worker 独立）/ redis（共享）
+
+# 密码哈希配置（scrypt）
+PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N','16384')) # CPU/内存代价（2 的幂，调整后用户下次登录时自动重新哈希）
+PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R','8')) # 块大小
+PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P','1')) # 并行度
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS','4')) # 计算哈希的线程数（同时占用的 CPU 上限）
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING','64')) # 最多排队的哈希任务，超出返回 503
+
+# 登录限流配置（令牌桶，rate <= 0 表示关闭）
+LOGIN_RATE_LIMIT_BACKEND = os.getenv('LOGIN_RATE_LIMIT_BACKEND',CACHE_BACKEND) # memory（每个 worker 独立）/ redis（共享）
+LOGIN_IP_RATE = float(os.getenv('LOGIN_IP_RATE','1')) # 每个 IP 每秒补充的登录次数
+LOGIN_IP_BURST = int(os.getenv('LOGIN_IP_BURST','20')) # 每个 IP 允许的突发登录次数
+LOGIN_USER_RATE = float(os.getenv('LOGIN_USER_RATE','0.2')) # 每个用户名每秒补充的登录次数
+LOGIN_USER_BURST = int(os.getenv('LOGIN_USER_BURST','5')) # 每个用户名允许的突发登录次数
+
+# 响应序列化配置
+JSON_DATETIME_FORMAT = os.getenv('JSON_DATETIME_FORMAT','http') # 日期时间格式：http（RFC 1123，与 Flask 默认一致）/ iso（ISO 8601，客户端需要同时升级）
+
+# 响应压缩配置
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE','1024')) # 超过该字节数才压缩
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL','6')) # 压缩级别（gzip 1-9，brotli 0-11）
+
+# 请求计时 / 性能分析配置
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED','false').lower() == 'true' # 是否开启请求计时（Server-Timing 头）
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS','1000')) # 慢请求阈值（毫秒）
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS','200')) # 慢查询阈值（毫秒）
+PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE','0')) # 每 N 个请求采样 profile 一次（0=关闭）
+PROFILE_DIR = os.getenv('PROFILE_DIR','profiles') # profile 结果保存目录
+
+# 内部监控接口只允许这些地址访问
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS','127.0.0.1,::1').split(',') if ip.strip()]
+
+# 过载保护配置（数据库自适应并发限制 + 熔断 + 请求截止时间）
+OVERLOAD_PROTECTION = os.getenv('OVERLOAD_PROTECTION','true').lower() == 'true' # 是否开启数据库过载保护
+DB_LIMIT_INITIAL = int(os.getenv('DB_LIMIT_INITIAL',str(DB_CONFIG['max_connections'] or 100))) # 初始并发上限（默认与连接池大小相同）
+DB_LIMIT_MIN = int(os.getenv('DB_LIMIT_MIN','2')) # 并发上限最小值
+DB_LIMIT_MAX = int(os.getenv('DB_LIMIT_MAX',str(DB_CONFIG['max_connections'] or 100))) # 并发上限最大值（超过连接池大小只会在池中排队）
+DB_LIMIT_TARGET_LATENCY = float(os.getenv('DB_LIMIT_TARGET_LATENCY','0.2')) # 单次数据库调用的目标耗时（秒），超过时降低并发上限
+DB_LIMIT_MAX_WAIT = float(os.getenv('DB_LIMIT_MAX_WAIT','0.1')) # 并发名额用完时最多排队的秒数，超过返回 503
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES','5')) # 连续失败多少次后熔断
+DB_BREAKER_RESET_SECONDS = float(os.getenv('DB_BREAKER_RESET_SECONDS','10')) # 熔断多少秒后放行探测请求
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS','10')) # 每个请求的截止时间（秒，0=不限制；客户端可用 X-Request-Timeout 缩短）
+REQUEST_DEADLINE_MIN_SECONDS = float(os.getenv('REQUEST_DEADLINE_MIN_SECONDS','0.1')) # X-Request-Timeout 允许的最小值（秒），更小的值返回 400
+
+# 审计日志配置（写后：请求只入队，后台线程批量写入 audit_log 表）
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED','true').lower() == 'true' # 是否记录用户修改的审计日志
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE','10000')) # 队列最多保存的事件数
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE','200')) # 每批写入的事件数
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL','1')) # 最长多久写入一次（秒）
+AUDIT_OVERFLOW = os.getenv('AUDIT_OVERFLOW','block') # 队列满时：block（短暂等待）/ drop_newest / drop_oldest / spill（写入本地文件）
+AUDIT_BLOCK_TIMEOUT = float(os.getenv('AUDIT_BLOCK_TIMEOUT','0.05')) # block 策略最多等待的秒数
+AUDIT_FILE_PATH = os.getenv('AUDIT_FILE_PATH','') or None # 本地审计文件（数据库不可用时写入，为空表示不使用）
+
+# 用户变更推送配置（SSE：GET /api/user/events）
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND','memory') # memory（每个 worker 独立，多 worker 时不支持断线续传）/ redis（通过 pub/sub 跨 worker 转发）
+EVENTS_HISTORY = int(os.getenv('EVENTS_HISTORY','1000')) # 保存最近多少条事件用于断线续传（Last-Event-ID）
+EVENTS_SUBSCRIBER_QUEUE = int(os.getenv('EVENTS_SUBSCRIBER_QUEUE','100')) # 每个连接最多积压的事件数，超过时断开让客户端续传
+# 每个 worker 最多同时连接数：每个连接占用一个 worker 线程，最多 WORKER_THREADS - 1，至少留一个线程处理普通请求
+EVENTS_MAX_SUBSCRIBERS = min(int(os.getenv('EVENTS_MAX_SUBSCRIBERS', str(WORKER_THREADS - 1))), max(0, WORKER_THREADS - 1))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS','15')) # 没有事件时多久发送一次心跳注释
+SSE_MAX_SECONDS = float(os.getenv('SSE_MAX_SECONDS','300')) # 单个连接最长保持时间，到期后客户端自动重连（释放线程、重新负载均衡）
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS','3000')) # 客户端断线后的重连间隔（毫秒）
+
+# 软删除用户归档配置（status = 7 的用户移到 users_archive 表）
+ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS','30')) # 删除多少天后归档（按 updated_at）
+ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE','500')) # 每个事务移动的行数
+ARCHIVE_MAX_ROWS_PER_SECOND = float(os.getenv('ARCHIVE_MAX_ROWS_PER_SECOND','1000')) # 每秒最多移动的行数（0=不限制）
+ARCHIVE_MAX_REPLICA_LAG = float(os.getenv('ARCHIVE_MAX_REPLICA_LAG','5')) # 从库复制延迟超过该秒数时暂停归档
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS','0')) # 在 worker 中定时归档的间隔（秒，0=关闭，用 cron 调用 flask archive-users）
@@ -0,0 +1,48 @@
+# gunicorn 配置
+# 用法: gunicorn -c gunicorn.conf.py app:app
+#
+# 环境变量（也可以写在 .env 中）:
+#   GUNICORN_WORKERS / WEB_CONCURRENCY  worker 进程数
+#       默认：REVOCATION_BACKEND=redis 时 4 个，使用进程内吊销列表（memory，默认）时 1 个
+#   GUNICORN_THREADS   每个 worker 的线程数（默认 4，SSE 连接最多占用 threads - 1 个）
+#   EVENTS_BACKEND     用户变更事件：memory / redis（多个 worker 时需要 redis 才能断线续传）
+#   CACHE_BACKEND      缓存 / 限流 / 吊销列表的默认后端：memory / redis（需要安装 redis 包）
+#   REVOCATION_BACKEND 吊销列表后端（默认同 CACHE_BACKEND），多个 worker 时必须是 redis
+#   REDIS_URL          Redis 地址（默认 redis://localhost:6379/0）
+# 多 worker 部署: CACHE_BACKEND=redis GUNICORN_WORKERS=4 gunicorn -c gunicorn.conf.py app:app
+import os
+from dotenv import load_dotenv
+
+# 配置文件在导入应用之前执行，先加载 .env，下面的默认值与应用看到的配置一致
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+# 进程内吊销列表只在单个 worker 中有效，没有配置 Redis 时默认只启动 1 个 worker（显式配置多个仍会在启动时报错）
+_revocation_backend = os.getenv('REVOCATION_BACKEND', os.getenv('CACHE_BACKEND', 'memory'))
+workers = int(os.getenv('GUNICORN_WORKERS', os.getenv('WEB_CONCURRENCY', '4' if _revocation_backend != 'memory' else '1')))
+# 配置文件在导入应用之前执行：让 config.WORKER_PROCESSES 知道进程数（进程内缓存据此缩短默认 TTL）
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+os.environ['GUNICORN_THREADS'] = str(threads)  # config.WORKER_THREADS：SSE 连接数上限按线程数计算
+
+# 在 master 中只导入一次应用，worker 直接 fork，启动更快
+# （导入应用不会连接数据库，不会有 socket 被多个进程共用）
+preload_app = True
+
+def on_starting(server):
+    """master 启动时：检查多 worker 部署的配置（吊销列表必须是多进程共享的）"""
+    from config import WORKER_PROCESSES, REVOCATION_BACKEND
+    from utils.revocation import check_revocation_backend
+    check_revocation_backend(WORKER_PROCESSES, REVOCATION_BACKEND)
+
+def post_fork(server, worker):
+    """worker fork 之后：丢弃可能从 master 继承的连接池，第一次查询时在 worker 中重新创建；启动定时归档"""
+    from utils.extensions import db, archive_scheduler
+    db.reset_after_fork()
+    archive_scheduler.start()  # ARCHIVE_INTERVAL_SECONDS = 0 时不启动
+
+def worker_exit(server, worker):
+    """worker 退出前：停止定时归档（当前批次提交后结束），把审计日志队列中剩余的事件写完"""
+    from utils.extensions import audit_log, archive_scheduler
+    archive_scheduler.stop()
+    audit_log.close()
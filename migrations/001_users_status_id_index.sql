@@ -0,0 +1,8 @@
+-- 用户列表 keyset 分页索引
+--
+-- GET /api/user/list 每一页执行的 SQL：
+--   SELECT <fields> FROM users WHERE status = 1 AND id > ? ORDER BY id LIMIT ?
+--
+-- (status, id) 复合索引让每一页都是一次索引范围扫描（EXPLAIN type = range），
+-- 不再需要全表扫描 + 排序，翻页成本与页码无关。
+ALTER TABLE users ADD INDEX idx_users_status_id (status, id);
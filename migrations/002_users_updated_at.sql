@@ -0,0 +1,16 @@
+-- 用户行版本：updated_at 列 + 覆盖索引
+--
+-- updated_at 在每次 INSERT / UPDATE（包括软删除 status = 7）时自动更新，
+-- 作为 /api/user/<id> 的 Last-Modified 和 ETag 依据。
+--
+-- GET /api/user/list 带 If-None-Match 时，先执行版本查询：
+--   SELECT COUNT(*), MAX(id), MAX(updated_at)
+--   FROM (SELECT id, updated_at FROM users WHERE status = 1 AND id > ? ORDER BY id LIMIT ?) AS page
+-- (status, id, updated_at) 索引覆盖这条查询（EXPLAIN Extra = Using index），不需要回表读取整行，
+-- 版本没变时直接返回 304。这个索引同样满足 001 中列表分页的范围扫描，所以替换掉原来的索引。
+ALTER TABLE users
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+ALTER TABLE users
+    DROP INDEX idx_users_status_id,
+    ADD INDEX idx_users_status_id_updated (status, id, updated_at);
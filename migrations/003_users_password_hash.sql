@@ -0,0 +1,7 @@
+-- 密码哈希存储
+--
+-- 登录时把 users.password 中旧的明文密码透明升级为 scrypt 哈希：
+--   scrypt$N$r$p$<base64 盐>$<base64 哈希>（约 90 个字符）
+-- 原来的列宽放不下哈希，扩大到 255（为以后调整算法参数留出余量）。
+-- 迁移期间明文和哈希可以共存，用户下次登录成功后自动升级，不需要停机批量处理。
+ALTER TABLE users MODIFY COLUMN password VARCHAR(255) NOT NULL;
@@ -0,0 +1,14 @@
+-- 用户搜索索引
+--
+-- GET /api/user/search 生成的 SQL（条件按参数组合拼接，值全部参数化）：
+--   SELECT <fields> FROM users WHERE status = ? [AND name LIKE 'abc%'] [AND email = ?] [AND mobile = ?]
+--     AND id > ? ORDER BY id LIMIT ?
+--
+-- InnoDB 二级索引末尾隐含主键 id：
+-- - (status, email) / (status, mobile)：等值条件后数据已按 id 有序，id > ? 继续范围扫描，不需要排序
+-- - (status, name)：name 前缀匹配为范围扫描，只对命中的行按 id 排序
+-- 用 flask check-search-plans 检查每个条件的执行计划（没有使用上面对应的索引时返回非 0）。
+ALTER TABLE users
+    ADD INDEX idx_users_status_name (status, name),
+    ADD INDEX idx_users_status_email (status, email),
+    ADD INDEX idx_users_status_mobile (status, mobile);
@@ -0,0 +1,9 @@
+-- 用户名全文检索（可选）
+--
+-- 执行后设置 USER_SEARCH_FULLTEXT=true，GET /api/user/search 才接受 q 参数：
+--   SELECT <fields> FROM users WHERE status = ? AND MATCH (name) AGAINST ('"关键词"' IN BOOLEAN MODE)
+--     AND id > ? ORDER BY id LIMIT ?
+--
+-- ngram 分词器把中文按 ngram_token_size（默认 2）切分，可以搜索名字中间的任意片段，
+-- name 前缀搜索（LIKE 'abc%'）不需要这个索引。大表上建全文索引耗时较长，建议在低峰期执行。
+ALTER TABLE users ADD FULLTEXT INDEX ft_users_name (name) WITH PARSER ngram;
@@ -0,0 +1,20 @@
+-- 审计日志
+--
+-- 记录谁（actor）在什么时候对哪个用户（target）做了什么修改（changes 为修改的字段，密码只记录 ***）。
+-- 由 utils/audit.py 的后台线程批量写入（多行 INSERT），请求本身不等待写入。
+-- 只追加不修改，按目标 / 操作人 + 时间查询；数据量大时可以按 created_at 分区或定期归档。
+CREATE TABLE IF NOT EXISTS audit_log (
+    id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    created_at DATETIME(6) NOT NULL,
+    actor_id INT NULL,
+    actor_name VARCHAR(50) NULL,
+    action VARCHAR(32) NOT NULL,
+    target_type VARCHAR(32) NOT NULL,
+    target_id BIGINT NULL,
+    changes JSON NULL,
+    request_id VARCHAR(64) NULL,
+    ip VARCHAR(45) NULL,
+    PRIMARY KEY (id),
+    KEY idx_audit_log_target (target_type, target_id, created_at),
+    KEY idx_audit_log_actor (actor_id, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,23 @@
+-- 软删除用户归档表
+--
+-- delete_user 只把 status 改成 7，这些行一直留在 users 中，表和索引越来越大，
+-- 拖慢 /api/user/list 和登录时按 name 查找。flask archive-users（或 ARCHIVE_INTERVAL_SECONDS 定时任务）
+-- 把删除超过 ARCHIVE_RETENTION_DAYS 天的行按 id 分批移到这里：每批一个事务，
+--   SELECT ... FOR UPDATE（重新检查 status = 7 且 updated_at 早于截止时间）
+--   INSERT IGNORE INTO users_archive ... SELECT ... FROM users WHERE id IN (...)
+--   DELETE FROM users WHERE id IN (...)
+-- 列与 utils/archive.py 的 ARCHIVE_COLUMNS 一致；密码哈希不归档。
+-- 只保留主键：name / email 在 users 中可以被新用户重新使用，归档表中不能有唯一约束，
+-- 否则 INSERT IGNORE 会静默跳过重名的行，随后的 DELETE 会把它删掉。
+CREATE TABLE IF NOT EXISTS users_archive (
+    id INT NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    email VARCHAR(255) NULL,
+    mobile VARCHAR(32) NULL,
+    userid VARCHAR(50) NULL,
+    status TINYINT NOT NULL,
+    updated_at TIMESTAMP(6) NOT NULL,
+    archived_at DATETIME(6) NOT NULL,
+    PRIMARY KEY (id),
+    KEY idx_users_archive_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
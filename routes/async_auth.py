@@ -0,0 +1,105 @@
+import asyncio
+from quart import Blueprint, request, g
+from marshmallow import ValidationError
+from utils.async_database import async_db as db
+from utils.extensions import user_cache
+from utils.schemas import login_schema
+from utils.async_response import success, error
+from utils.passwords import submit_check, PasswordHasherBusy
+from utils.rate_limit import retry_after_header
+from utils.async_decorators import token_required
+from utils.jwt_utils import (generate_token, generate_refresh_token, verify_token, revocations,
+                             refresh_token_id, revoke_session, new_session_id)
+from routes.auth import login_ip_limiter, login_user_limiter
+
+# 鉴权蓝图（异步版本，接口与 routes/auth.py 一致）
+async_auth_bp = Blueprint('async_auth', __name__, url_prefix='/api/auth')
+
+def _too_many_requests(retry_after):
+    """429 响应，带 Retry-After 头"""
+    response, code = error(message="登录尝试过于频繁，请稍后再试", code=429)
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response, code
+
+def _issue_tokens(user_id, username, session_id):
+    """签发 access + refresh token（非对称签名是 CPU 密集操作，在线程中调用）"""
+    return {
+        'access_token': generate_token(user_id, username, session_id),
+        'refresh_token': generate_refresh_token(user_id, username, session_id),
+        'user_id': user_id,
+        'username': username
+    }
+
+@async_auth_bp.route('/login', methods=['POST'])
+async def login():
+    """用户登录（限流规则与同步版本相同；Redis 限流、吊销列表和签名都在线程中执行，不阻塞事件循环）"""
+    allowed, retry_after = await asyncio.to_thread(login_ip_limiter.hit, request.remote_addr)
+    if not allowed:
+        return _too_many_requests(retry_after)
+    
+    data = await request.get_json()
+    
+    # 验证数据
+    try:
+        validated_data = login_schema.load(data)
+    except ValidationError as err:
+        return error(message=err.messages)
+    
+    username = validated_data['username']
+    password = validated_data['password']
+    
+    allowed, retry_after = await asyncio.to_thread(login_user_limiter.hit, username.lower())
+    if not allowed:
+        return _too_many_requests(retry_after)
+    
+    # 查询用户
+    user = await db.run('user_by_name', username)
+    
+    # 密码在哈希线程池中校验，不阻塞事件循环
+    try:
+        ok, new_hash = await asyncio.wrap_future(submit_check(password, user['password'] if user else None))
+    except PasswordHasherBusy:
+        response, code = error(message="服务繁忙，请稍后再试", code=503)
+        response.headers['Retry-After'] = retry_after_header(1)
+        return response, code
+    
+    if not ok:
+        return error(message="用户名或密码错误", code=401)
+    
+    if new_hash:
+        await db.run('user_set_password', new_hash, user['id'])
+        # 密码已改写，用户缓存中的整行失效
+        await asyncio.to_thread(user_cache.delete, user['id'])
+    
+    data = await asyncio.to_thread(_issue_tokens, user['id'], user['name'], new_session_id())
+    return success(data=data, message="登录成功")
+
+@async_auth_bp.route('/refresh', methods=['POST'])
+async def refresh():
+    """刷新 Access Token（refresh token 轮换，规则与同步版本相同）"""
+    data = await request.get_json()
+    
+    if not data or 'refresh_token' not in data:
+        return error(message="缺少 refresh_token", code=400)
+    
+    # 验证 refresh token（同时检查是否已被吊销）
+    payload = await asyncio.to_thread(verify_token, data['refresh_token'], token_type='refresh')
+    
+    if not payload:
+        return error(message="无效或过期的 refresh token", code=401)
+    
+    token_id = refresh_token_id(data['refresh_token'], payload)
+    if not await asyncio.to_thread(revocations.consume, token_id, payload['exp']):
+        await asyncio.to_thread(revoke_session, payload)
+        return error(message="refresh token 已被使用，请重新登录", code=401)
+    
+    session_id = payload.get('sid') or new_session_id()
+    data = await asyncio.to_thread(_issue_tokens, payload['user_id'], payload['username'], session_id)
+    return success(data=data, message="Token 刷新成功")
+
+@async_auth_bp.route('/logout', methods=['POST'])
+@token_required # 需要token才能访问
+async def logout():
+    """退出登录：吊销当前会话签发的所有 token"""
+    await asyncio.to_thread(revoke_session, g.current_user)
+    return success(message="退出登录成功")
@@ -0,0 +1,193 @@
+import asyncio
+import pymysql
+from quart import Blueprint, request, g
+from marshmallow import ValidationError
+from config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, LIST_CACHE_TTL
+from utils.async_database import async_db as db
+from utils.extensions import user_cache, list_cache, audit_log, change_hub
+from utils.audit import diff_changes
+from utils.schemas import user_schema, user_update_schema, USER_COLUMNS, USER_UPDATE_COLUMNS
+from utils.sql import split_fields, insert_sql, update_sql
+from utils.queries import is_missing_updated_at
+from utils.async_response import success, error
+from utils.async_decorators import token_required
+from utils.pagination import encode_cursor, decode_cursor, parse_limit, parse_fields
+from routes.user import USER_LIST_FIELDS, USER_LIST_DEFAULT_FIELDS
+
+# 用户蓝图（异步版本，接口与 routes/user.py 一致）
+async_user_bp = Blueprint('async_user', __name__, url_prefix='/api/user')
+
+@async_user_bp.route('/list', methods=['GET'])
+@token_required # 需要token才能访问
+async def get_users():
+    """获取用户列表（按 id 做 keyset 分页，参数同同步版本）"""
+    current_user = g.current_user  # ✅ 从 g 对象获取
+    
+    try:
+        last_id = decode_cursor(request.args.get('cursor'))
+        limit = parse_limit(request.args.get('limit'), PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT)
+        columns = parse_fields(request.args.get('fields'), USER_LIST_FIELDS, USER_LIST_DEFAULT_FIELDS)
+    except ValueError as err:
+        return error(message=str(err))
+    
+    # 多取一条，用来判断是否还有下一页
+    sql = f"SELECT {', '.join(columns)} FROM users WHERE status = 1 AND id > %s ORDER BY id LIMIT %s"
+    users = list(await db.query(sql, (last_id, limit + 1)))
+    
+    has_more = len(users) > limit
+    users = users[:limit]
+    next_cursor = encode_cursor(users[-1]['id']) if has_more else None
+
+    return success(
+        data={
+            'list': users,
+            'next_cursor': next_cursor,  # 为 None 表示已经是最后一页
+            'has_more': has_more
+        },
+        message="获取用户列表成功"
+    )
+
+def _cache_lookup(user_id):
+    """
+    查缓存，未命中时同时记下墓碑（查询期间用户被修改时不写回旧数据）
+
+    Returns:
+        tuple: (缓存的用户或 None, begin_load 的标记)
+    """
+    user = user_cache.get(user_id)
+    return user, (user_cache.begin_load(user_id) if user is None else None)
+
+async def _load_user(user_id):
+    """
+    读取单个用户（先查缓存，未命中再查数据库）
+    
+    缓存可能是 Redis，读写都放到线程中执行，不阻塞事件循环。
+    
+    Returns:
+        dict: 用户信息，不存在返回 None
+    """
+    user, token = await asyncio.to_thread(_cache_lookup, user_id)
+    if user is not None:
+        return user
+    
+    # 字段与同步版本相同（不含密码），两种部署共用缓存时行的内容一致
+    try:
+        user = await db.run('user_by_id', user_id)
+    except pymysql.err.OperationalError as err:
+        if not is_missing_updated_at(err):
+            raise
+        user = await db.run('user_by_id_legacy', user_id)
+    if user is None:
+        return None
+    await asyncio.to_thread(user_cache.set_loaded, user_id, user, token)
+    return user
+
+async def _invalidate_list():
+    """
+    用户数据被新增/修改/删除后，使同步部署中所有列表页缓存失效（同 routes/user.py 的 _invalidate_list）
+
+    两种部署共用 Redis 时，不失效的话同步的 /list 会一直返回写入前的页面直到 TTL 过期。
+    """
+    if LIST_CACHE_TTL > 0:
+        await asyncio.to_thread(list_cache.bump_generation, 'users')
+
+async def _notify_user_change(action, user_id, changes=None):
+    """
+    用户数据写入成功后调用：记录审计日志，并推送变更事件（与同步版本 routes/user.py 的同名函数一致）
+
+    配置了 Redis 转发时发布事件需要网络往返，放到线程中执行，不阻塞事件循环。
+    """
+    audit_log.record(action, user_id, changes)
+    await asyncio.to_thread(change_hub.publish, action,
+                            {'id': user_id, 'fields': sorted(changes) if changes else []})
+
+@async_user_bp.route('/<int:user_id>', methods=['GET'])
+@token_required # 需要token才能访问
+async def get_user(user_id):
+    """获取单个用户"""
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    user = await _load_user(user_id)
+    if user:
+        return success(data=user,message="获取用户成功")
+    return error(message="用户不存在")
+
+@async_user_bp.route('/add', methods=['POST'])
+@token_required # 需要token才能访问
+async def add_user():
+    """添加用户"""
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    data = await request.get_json()
+    if not data:
+        return error(message="没有提供数据")
+    
+    # 验证数据
+    try:
+        validated_data = user_schema.load(data)  # 验证并返回合法数据
+    except ValidationError as err:
+        return error(message=err.messages)
+    
+    fields, values = split_fields(validated_data, USER_COLUMNS)
+    result = await db.execute(insert_sql('users', fields), values)
+    await _invalidate_list()
+
+    if result['affected_rows'] > 0:
+        await _notify_user_change('user.add', result['last_id'], validated_data)
+        return success(
+            data={"id": result['last_id']}, 
+            message="用户添加成功"
+        )
+    return error(message="用户添加失败", code=500)
+
+@async_user_bp.route('/update/<int:user_id>', methods=['PUT'])
+@token_required # 需要token才能访问
+async def update_user(user_id):
+    """更新用户"""
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    data = await request.get_json()
+    if not data:
+        return error(message="没有提供数据")
+    
+    # 验证数据
+    try:
+        validated_data = user_update_schema.load(data)  # 验证并返回合法数据
+    except ValidationError as err:
+        return error(message=err.messages)
+    
+    # 查询数据是否存在
+    user = await _load_user(user_id)
+    if not user:
+        return error(message="用户不存在")
+    
+    fields, values = split_fields(validated_data, USER_UPDATE_COLUMNS)
+    result = await db.execute(update_sql('users', fields), values + (user_id,))
+    await asyncio.to_thread(user_cache.delete, user_id)
+    await _invalidate_list()
+
+    if result['affected_rows'] > 0:
+        await _notify_user_change('user.update', user_id, diff_changes(user, validated_data))
+        return success(message="用户更新成功")
+    return error(message="用户更新失败", code=500)
+
+@async_user_bp.route('/delete/<int:user_id>', methods=['DELETE'])
+@token_required # 需要token才能访问
+async def delete_user(user_id):
+    """删除用户"""
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    # 查询数据是否存在
+    user = await _load_user(user_id)
+    if not user:
+        return error(message="用户不存在")
+    
+    sql = "UPDATE users SET status = 7 WHERE id=%s"
+    result = await db.execute(sql, (user_id,))
+    await asyncio.to_thread(user_cache.delete, user_id)
+    await _invalidate_list()
+
+    if result['affected_rows'] > 0:
+        await _notify_user_change('user.delete', user_id, {'status': [user.get('status'), 7]})
+        return success(message="用户删除成功")
+    return error(message="用户删除失败", code=500)
@@ -1,47 +1,80 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, g, jsonify
 from marshmallow import ValidationError
-from utils.database import Database
-from utils.schemas import LoginSchema
+from config import (LOGIN_RATE_LIMIT_BACKEND, LOGIN_IP_RATE, LOGIN_IP_BURST,
+                    LOGIN_USER_RATE, LOGIN_USER_BURST)
+from utils.extensions import db, user_cache
+from utils.schemas import login_schema
 from utils.response import success, error
-from utils.jwt_utils import generate_token,generate_refresh_token,verify_token
-from config import DB_CONFIG
+from utils.instrumentation import phase
+from utils.passwords import check_password, PasswordHasherBusy
+from utils.rate_limit import create_rate_limiter, retry_after_header
+from utils.decorators import token_required
+from utils.conditional import make_etag, is_not_modified, not_modified
+from utils.jwt_utils import (generate_token, generate_refresh_token, verify_token, revocations,
+                             refresh_token_id, revoke_session, new_session_id, keyset)
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
-db = Database(**DB_CONFIG)
-db.connect()
+# 公钥发布（JWKS 标准路径，不在 /api/auth 下）
+jwks_bp = Blueprint('jwks', __name__)
+
+# 登录限流：按 IP 和按用户名各一个令牌桶，撞库时在计算密码哈希之前就拒绝
+login_ip_limiter = create_rate_limiter('login_ip', LOGIN_IP_RATE, LOGIN_IP_BURST, backend=LOGIN_RATE_LIMIT_BACKEND)
+login_user_limiter = create_rate_limiter('login_user', LOGIN_USER_RATE, LOGIN_USER_BURST, backend=LOGIN_RATE_LIMIT_BACKEND)
+
+def _too_many_requests(message, retry_after):
+    """429 响应，带 Retry-After 头"""
+    response, code = error(message=message, code=429)
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response, code
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """用户登录"""
+    allowed, retry_after = login_ip_limiter.hit(request.remote_addr)
+    if not allowed:
+        return _too_many_requests("登录尝试过于频繁，请稍后再试", retry_after)
+    
     data = request.get_json()
     
     # 验证数据
-    schema = LoginSchema()
     try:
-        validated_data = schema.load(data)
+        with phase('validate'):
+            validated_data = login_schema.load(data)
     except ValidationError as err:
         return error(message=err.messages)
     
     username = validated_data['username']
     password = validated_data['password']
     
-    # 查询用户
-    sql = "SELECT id, name,password FROM users WHERE name = %s"
-    users = db.query(sql, (username,))
+    allowed, retry_after = login_user_limiter.hit(username.lower())
+    if not allowed:
+        return _too_many_requests("登录尝试过于频繁，请稍后再试", retry_after)
     
-    if not users:
-       return error(message="用户名或密码错误", code=401)
+    # 查询用户
+    user = db.run('user_by_name', username)
     
-    user = users[0]
+    # 验证密码（scrypt 在哈希线程池中计算；用户不存在时同样计算一次，避免通过耗时判断用户名是否存在）
+    try:
+        with phase('password'):
+            ok, new_hash = check_password(password, user['password'] if user else None)
+    except PasswordHasherBusy:
+        response, code = error(message="服务繁忙，请稍后再试", code=503)
+        response.headers['Retry-After'] = retry_after_header(1)
+        return response, code
     
-    # 验证密码（这里简单比对，实际应该用加密）
-    if user['password'] != password:
+    if not ok:
        return error(message="用户名或密码错误", code=401)
     
-    # ✅ 生成两种 token
-    access_token = generate_token(user['id'], user['name'])
-    refresh_token = generate_refresh_token(user['id'], user['name'])
+    # 旧的明文密码（或哈希参数已调整）：登录成功后写回新的哈希
+    if new_hash:
+        db.run('user_set_password', new_hash, user['id'])
+        user_cache.delete(user['id'])  # 密码已改写，用户缓存中的整行失效
+    
+    # ✅ 生成两种 token（同一个会话 id，退出登录时一起吊销）
+    session_id = new_session_id()
+    access_token = generate_token(user['id'], user['name'], session_id)
+    refresh_token = generate_refresh_token(user['id'], user['name'], session_id)
     
     return success(
         data={
@@ -55,7 +88,12 @@ def login():
 
 @auth_bp.route('/refresh', methods=['POST'])
 def refresh():
-    """✅ 刷新 Access Token"""
+    """
+    ✅ 刷新 Access Token（refresh token 轮换）
+    
+    每个 refresh token 只能使用一次，刷新成功后返回新的 access token 和 refresh token。
+    已经使用过的 refresh token 再次出现说明可能被盗用，吊销整个会话，需要重新登录。
+    """
     data = request.get_json()
     
     if not data or 'refresh_token' not in data:
@@ -63,20 +101,56 @@ def refresh():
     
     refresh_token = data['refresh_token']
     
-    # 验证 refresh token
+    # 验证 refresh token（同时检查是否已被吊销）
     payload = verify_token(refresh_token, token_type='refresh')
     
     if not payload:
         return error(message="无效或过期的 refresh token", code=401)
     
-    # 生成新的 access token
-    new_access_token = generate_token(payload['user_id'], payload['username'])
+    # 原子地标记为已使用，并发重放时只有一个请求能通过（没有 jti 的旧 token 按摘要标记）
+    if not revocations.consume(refresh_token_id(refresh_token, payload), payload['exp']):
+        revoke_session(payload)
+        return error(message="refresh token 已被使用，请重新登录", code=401)
+    
+    # 生成新的 access token 和 refresh token（沿用会话 id）
+    session_id = payload.get('sid') or new_session_id()
+    new_access_token = generate_token(payload['user_id'], payload['username'], session_id)
+    new_refresh_token = generate_refresh_token(payload['user_id'], payload['username'], session_id)
     
     return success(
         data={
             'access_token': new_access_token,
+            'refresh_token': new_refresh_token,
             'user_id': payload['user_id'],
             'username': payload['username']
         },
         message="Token 刷新成功"
-    )
\ No newline at end of file
+    )
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required # 需要token才能访问
+def logout():
+    """退出登录：吊销当前会话签发的所有 access token 和 refresh token"""
+    revoke_session(g.current_user)
+    return success(message="退出登录成功")
+
+@jwks_bp.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """
+    JWT 公钥集合（JWKS），其它服务按 token 头部的 kid 选择公钥验证
+    
+    按 JWKS 标准格式返回 {"keys": [...]}，不使用统一响应格式。
+    轮换期间新旧公钥同时发布，验证方缓存过期（max-age）后即可获取新公钥。
+    """
+    if keyset is None:
+        return error(message="未启用非对称签名", code=404)
+    
+    data = keyset.jwks()
+    etag = make_etag('jwks', *(key['kid'] for key in data['keys']))
+    if is_not_modified(etag):
+        response = not_modified(etag)
+    else:
+        response = jsonify(data)
+        response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
@@ -0,0 +1,24 @@
+from flask import Blueprint
+from utils.extensions import db, db_guard
+from utils.overload import overload_exempt
+from utils.response import success, error
+
+# 健康检查蓝图（不受过载保护：不限流、不熔断、没有截止时间，数据库过载时也如实返回状态）
+health_bp = Blueprint('health', __name__, url_prefix='/health')
+
+@health_bp.route('', methods=['GET'])
+@overload_exempt
+def liveness():
+    """存活检查（不访问数据库，数据库故障时进程不应被重启）"""
+    return success(data={'status': 'ok'}, message="服务运行中")
+
+@health_bp.route('/ready', methods=['GET'])
+@overload_exempt
+def readiness():
+    """就绪检查：直接查询主库，同时返回熔断器状态"""
+    try:
+        db.query("SELECT 1", primary=True)
+    except Exception as e:
+        data = {'database': f"不可用: {e}", 'overload': db_guard.snapshot()}
+        return error(message="数据库不可用", code=503, data=data)
+    return success(data={'database': 'ok', 'overload': db_guard.snapshot()}, message="服务就绪")
@@ -0,0 +1,68 @@
+from flask import Blueprint, request
+from utils.cache import get_cache_stats
+from utils.rate_limit import get_rate_limit_stats
+from utils.jwt_utils import revocations
+from utils.extensions import db, db_guard, audit_log, change_hub
+from utils.response import success, error
+from config import METRICS_ALLOWED_IPS
+
+# 内部监控蓝图（只允许 METRICS_ALLOWED_IPS 中的地址访问）
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/api/metrics')
+
+@metrics_bp.before_request
+def restrict_to_internal():
+    """非内部地址直接返回 404，不暴露接口存在"""
+    if request.remote_addr not in METRICS_ALLOWED_IPS:
+        return error(message="资源不存在", code=404)
+
+@metrics_bp.route('/cache', methods=['GET'])
+def cache_metrics():
+    """缓存命中/未命中/淘汰统计"""
+    return success(data=get_cache_stats(), message="获取缓存统计成功")
+
+@metrics_bp.route('/pool', methods=['GET'])
+def pool_metrics():
+    """数据库连接池统计"""
+    return success(data=db.get_pool_status(), message="获取连接池统计成功")
+
+@metrics_bp.route('/queries', methods=['GET'])
+def query_metrics():
+    """命名查询统计（按调用次数排序）"""
+    return success(data=db.get_query_stats(), message="获取查询统计成功")
+
+@metrics_bp.route('/rate-limit', methods=['GET'])
+def rate_limit_metrics():
+    """限流放行/拒绝统计"""
+    return success(data=get_rate_limit_stats(), message="获取限流统计成功")
+
+@metrics_bp.route('/overload', methods=['GET'])
+def overload_metrics():
+    """数据库并发上限和熔断器状态"""
+    return success(data=db_guard.snapshot(), message="获取过载保护统计成功")
+
+@metrics_bp.route('/audit', methods=['GET'])
+def audit_metrics():
+    """审计日志队列和写入统计"""
+    return success(data=audit_log.stats(), message="获取审计日志统计成功")
+
+@metrics_bp.route('/events', methods=['GET'])
+def event_metrics():
+    """变更推送的订阅数和事件统计（当前 worker）"""
+    return success(data=change_hub.stats(), message="获取变更推送统计成功")
+
+@metrics_bp.route('', methods=['GET'])
+def all_metrics():
+    """全部内部统计"""
+    return success(
+        data={
+            'pool': db.get_pool_status(),
+            'cache': get_cache_stats(),
+            'queries': db.get_query_stats(),
+            'rate_limit': get_rate_limit_stats(),
+            'revocation': revocations.stats(),
+            'overload': db_guard.snapshot(),
+            'audit': audit_log.stats(),
+            'events': change_hub.stats()
+        },
+        message="获取统计成功"
+    )
@@ -1,40 +1,469 @@
-from flask import Blueprint, jsonify, request,g
-from utils.database import Database
-from config import DB_CONFIG
+from flask import Blueprint, Response, current_app, request,g
+import csv
+import hashlib
+import io
+import json
+import logging
+import time
+import pymysql
+from utils.extensions import db, user_cache, list_cache, audit_log, change_hub
+from utils.audit import diff_changes
+from utils.events import SubscriberLimitError, format_sse
+from utils.rate_limit import retry_after_header
+from config import (PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, EXPORT_CHUNK_SIZE, EXPORT_MAX_CHUNK_SIZE,
+                    BATCH_SIZE, BATCH_MAX_ITEMS, MULTI_GET_MAX_IDS, LIST_CACHE_TTL,
+                    SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS, SSE_RETRY_MS)
 from marshmallow import ValidationError
-from utils.schemas import UserSchema,UserUpdateSchema
-from utils.response import success, error
+from utils.schemas import (user_schema, user_update_schema, users_schema, users_update_schema,
+                           USER_COLUMNS, USER_UPDATE_COLUMNS)
+from utils.sql import split_fields, insert_sql, update_sql, select_in_sql
+from utils.queries import USER_DETAIL_COLUMNS, USER_DETAIL_COLUMNS_LEGACY, is_missing_updated_at
+from utils.loader import BatchLoader, get_loader
+from utils.response import success, success_raw, error
 from utils.decorators import token_required
+from utils.instrumentation import phase
+from utils.pagination import encode_cursor, decode_cursor, parse_limit, parse_fields
+from utils.search import parse_search_filters, search_sql
+from utils.conditional import make_etag, to_http_date, is_not_modified, not_modified, with_validators
+
+logger = logging.getLogger(__name__)
 
 # 创建用户蓝图
 user_bp = Blueprint('user', __name__, url_prefix='/api/user')
 
-# 创建数据库实例
-db = Database(**DB_CONFIG)
-db.connect()
+# 列表接口允许返回的字段（白名单），id 用于生成游标，始终返回
+USER_LIST_FIELDS = ('id', 'name', 'email', 'mobile', 'userid')
+USER_LIST_DEFAULT_FIELDS = ('id', 'name')
+
+# 列表页的版本查询：只读 (status, id, updated_at) 覆盖索引，用于判断是否可以返回 304
+LIST_VERSION_SQL = (
+    "SELECT COUNT(*) AS cnt, MAX(id) AS max_id, MAX(updated_at) AS last_modified "
+    "FROM (SELECT id, updated_at FROM users WHERE status = 1 AND id > %s ORDER BY id LIMIT %s) AS page"
+)
+
+# users 表是否有 updated_at 列（migrations/002 执行前没有）：第一次查询报错后置为 False，
+# 之后列表页和用户详情不再读取 updated_at，ETag 按内容计算
+_has_updated_at = True
+
+def _missing_updated_at(err):
+    """
+    判断查询失败是否因为没有 updated_at 列（是则记下，之后不再查询该列）
+
+    Returns:
+        bool: True 表示应该不带 updated_at 重新查询
+    """
+    global _has_updated_at
+    if is_missing_updated_at(err):
+        if _has_updated_at:
+            logger.warning("users 表没有 updated_at 列（未执行 migrations/002），ETag 按内容计算")
+        _has_updated_at = False
+        return True
+    return False
+
+# 导出支持的格式：format 参数 -> MIME 类型
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
 
 @user_bp.route('/list', methods=['GET'])
 @token_required # 需要token才能访问
 def get_users():
-    """获取用户列表"""
+    """
+    获取用户列表（按 id 做 keyset 分页）
+    
+    Query 参数:
+        cursor: 上一页返回的 next_cursor，第一页不传
+        limit: 每页条数（默认 PAGE_DEFAULT_LIMIT，最大 PAGE_MAX_LIMIT）
+        fields: 逗号分隔的返回字段，只能是 USER_LIST_FIELDS 中的字段
+    
+    依赖 (status, id) 复合索引（见 migrations/001_users_status_id_index.sql），
+    每一页都是一次索引范围扫描；并发插入的新记录 id 更大，只会出现在后面的页，
+    已翻过的页不会重复或漏掉数据。
+    
+    支持 If-None-Match：ETag 由这一页的行数、最大 id 和最大 updated_at 决定。
+    
+    响应缓存（LIST_CACHE_TTL > 0）：缓存每一页序列化好的 data 和 ETag，key 包含列表代数，
+    新增/修改/删除用户后代数加一，旧缓存全部失效；同一页同时未命中时只有一个请求查询数据库。
+    响应头 X-Cache 为 HIT / MISS / BYPASS（未开启缓存）。
+    未开启缓存时，带了 If-None-Match 的请求先执行 LIST_VERSION_SQL（只读索引），没有变化时直接返回 304。
+    没有 updated_at 列（未执行 migrations/002）时 ETag 按这一页的内容计算，不使用 LIST_VERSION_SQL。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+    
+    try:
+        last_id = decode_cursor(request.args.get('cursor'))
+        limit = parse_limit(request.args.get('limit'), PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT)
+        columns = parse_fields(request.args.get('fields'), USER_LIST_FIELDS, USER_LIST_DEFAULT_FIELDS)
+    except ValueError as err:
+        return error(message=str(err))
+    
+    if LIST_CACHE_TTL > 0:
+        key = ('list', list_cache.get_generation('users'), last_id, limit, columns)
+        misses = []
+        
+        def loader():
+            misses.append(key)
+            return _load_list_page(last_id, limit, columns)
+        
+        etag, body = list_cache.get_or_load(key, loader)
+        cache_status = 'MISS' if misses else 'HIT'
+    else:
+        # 客户端带了 If-None-Match：先查版本，没有变化时不再读取整页数据
+        if request.if_none_match and _has_updated_at:
+            try:
+                version = db.query(LIST_VERSION_SQL, (last_id, limit + 1))[0]
+            except pymysql.err.OperationalError as err:
+                if not _missing_updated_at(err):
+                    raise
+            else:
+                etag = make_etag('list', last_id, limit, columns, version['cnt'], version['max_id'],
+                                 version['last_modified'])
+                if is_not_modified(etag):
+                    return not_modified(etag)
+        etag, body = _load_list_page(last_id, limit, columns)
+        cache_status = 'BYPASS'
+    
+    if is_not_modified(etag):
+        response = not_modified(etag)
+    else:
+        response = with_validators(success_raw(body, message="获取用户列表成功"), etag)
+    target = response[0] if isinstance(response, tuple) else response
+    target.headers['X-Cache'] = cache_status
+    return response
+
+def _load_list_page(last_id, limit, columns):
+    """
+    查询一页用户并序列化
+    
+    Returns:
+        tuple: (ETag, 序列化后的 data)
+    """
+    # 多取一条，用来判断是否还有下一页；updated_at 用于计算 ETag
+    users = None
+    if _has_updated_at:
+        select_columns = columns if 'updated_at' in columns else columns + ('updated_at',)
+        try:
+            users = list(db.query(_list_page_sql(select_columns), (last_id, limit + 1)))
+        except pymysql.err.OperationalError as err:
+            if not _missing_updated_at(err):
+                raise
+    if users is None:
+        select_columns = columns
+        users = list(db.query(_list_page_sql(columns), (last_id, limit + 1)))
+        etag = None  # 序列化后按内容计算
+    else:
+        etag = make_etag('list', last_id, limit, columns, len(users),
+                         users[-1]['id'] if users else None,
+                         max((user['updated_at'] for user in users), default=None))
+    
+    has_more = len(users) > limit
+    users = users[:limit]
+    next_cursor = encode_cursor(users[-1]['id']) if has_more else None
+    if select_columns is not columns:
+        users = [{column: user[column] for column in columns} for user in users]
+    
+    with phase('serialize'):
+        body = current_app.json.dumps_bytes({
+            'list': users,
+            'next_cursor': next_cursor,  # 为 None 表示已经是最后一页
+            'has_more': has_more
+        })
+    if etag is None:
+        etag = make_etag('list', last_id, limit, columns, hashlib.blake2b(body, digest_size=16).hexdigest())
+    return etag, body
+
+def _list_page_sql(columns):
+    """列表页 SQL（columns 只能是白名单中的字段）"""
+    return f"SELECT {', '.join(columns)} FROM users WHERE status = 1 AND id > %s ORDER BY id LIMIT %s"
+
+def _invalidate_list():
+    """用户数据被新增/修改/删除后，使所有列表页缓存失效"""
+    if LIST_CACHE_TTL > 0:
+        list_cache.bump_generation('users')
+
+@user_bp.route('/search', methods=['GET'])
+@token_required # 需要token才能访问
+def search_users():
+    """
+    搜索用户（按 id 做 keyset 分页）
+    
+    Query 参数:
+        name: 用户名前缀
+        q: 用户名全文检索（ngram，需要 USER_SEARCH_FULLTEXT=true）
+        email: 邮箱（精确匹配）
+        mobile: 手机号（精确匹配）
+        status: 状态（默认 1，只能是 USER_SEARCH_STATUSES 中的状态）
+        cursor / limit / fields: 同 /list
+    
+    只接受 SEARCH_FILTERS 白名单中的条件，SQL 全部参数化；
+    依赖 migrations/004_users_search_indexes.sql 中的索引，
+    可以用 flask check-search-plans 检查每个条件的执行计划是否走索引。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+    
+    try:
+        filters = parse_search_filters(request.args)
+        last_id = decode_cursor(request.args.get('cursor'))
+        limit = parse_limit(request.args.get('limit'), PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT)
+        columns = parse_fields(request.args.get('fields'), USER_LIST_FIELDS, USER_LIST_DEFAULT_FIELDS)
+    except ValueError as err:
+        return error(message=str(err))
+    
+    # 多取一条，用来判断是否还有下一页
+    sql = search_sql(tuple(filters), columns)
+    users = db.query(sql, tuple(filters.values()) + (last_id, limit + 1))
+    
+    has_more = len(users) > limit
+    users = users[:limit]
+    
+    return success(
+        data={
+            'list': users,
+            'next_cursor': encode_cursor(users[-1]['id']) if has_more else None,
+            'has_more': has_more
+        },
+        message="搜索用户成功"
+    )
+
+@user_bp.route('/events', methods=['GET'])
+@token_required # 需要token才能访问
+def user_events():
+    """
+    订阅用户变更（Server-Sent Events）
+    
+    事件类型为 user.add / user.update / user.delete，data 为 {"id": 用户id, "fields": [修改的字段]}；
+    断线重连时浏览器自动带上 Last-Event-ID 头（也可以用 last_event_id 参数），补发之后的事件。
+    收到 reset 事件表示断线期间的事件已经无法补齐，需要重新拉取列表
+    （多个 worker 且 EVENTS_BACKEND=memory 时不支持续传，重连总是收到 reset）。
+    
+    每个连接占用一个 worker 线程，连接数受 EVENTS_MAX_SUBSCRIBERS 限制（最多 GUNICORN_THREADS - 1，超过返回 503），
+    连接保持 SSE_MAX_SECONDS 秒后由服务端关闭，客户端按 retry 间隔自动重连。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            return error(message="Last-Event-ID 必须是整数")
+        last_event_id = int(last_event_id)
+    
+    try:
+        subscription = change_hub.subscribe(last_event_id)
+    except SubscriberLimitError as err:
+        response, code = error(message=str(err), code=503)
+        response.headers['Retry-After'] = retry_after_header(SSE_RETRY_MS / 1000)
+        return response, code
+    
+    # 流式响应：不缓冲，也不经过压缩（见 init_compression）
+    return Response(
+        _generate_events(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _generate_events(subscription):
+    """
+    逐条输出事件，没有事件时每 SSE_HEARTBEAT_SECONDS 秒发送一次心跳注释
+    （心跳保持代理连接不被断开，客户端断开时写入失败，生成器被关闭并取消订阅）
+    
+    订阅因积压过多被关闭或到达 SSE_MAX_SECONDS 时结束响应，客户端带 Last-Event-ID 重连补齐。
+    """
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while not subscription.closed and time.monotonic() < deadline:
+            event = subscription.get(SSE_HEARTBEAT_SECONDS)
+            yield format_sse(event) if event is not None else ": ping\n\n"
+    finally:
+        change_hub.unsubscribe(subscription)
+
+@user_bp.route('/export', methods=['GET'])
+@token_required # 需要token才能访问
+def export_users():
+    """
+    流式导出全部有效用户（NDJSON 或 CSV）
+    
+    Query 参数:
+        format: ndjson / csv，不传时根据 Accept 头选择（默认 ndjson）
+        fields: 逗号分隔的导出字段，默认导出 USER_LIST_FIELDS 全部字段
+        chunk_size: 每批从数据库读取的行数（默认 EXPORT_CHUNK_SIZE，最大 EXPORT_MAX_CHUNK_SIZE）
+    
+    使用服务端游标分批读取、边读边写，worker 内存占用与表大小无关。
+    """
     current_user = g.current_user  # ✅ 从 g 对象获取
+
+    fmt = request.args.get('format')
+    if fmt is None:
+        mimetype = request.accept_mimetypes.best_match(list(EXPORT_FORMATS.values()))
+        fmt = next((k for k, v in EXPORT_FORMATS.items() if v == mimetype), None)
+        if fmt is None:
+            return error(message="不支持的导出格式", code=406)
+    elif fmt not in EXPORT_FORMATS:
+        return error(message=f"format 只能是: {', '.join(EXPORT_FORMATS)}")
+    
+    try:
+        columns = parse_fields(request.args.get('fields'), USER_LIST_FIELDS, USER_LIST_FIELDS)
+        chunk_size = parse_limit(request.args.get('chunk_size'), EXPORT_CHUNK_SIZE, EXPORT_MAX_CHUNK_SIZE)
+    except ValueError as err:
+        return error(message=str(err))
+    
+    sql = f"SELECT {', '.join(columns)} FROM users WHERE status = 1 ORDER BY id"
+    chunks = db.stream(sql, chunk_size=chunk_size)
+    
+    if fmt == 'csv':
+        body = _generate_csv(chunks, columns)
+    else:
+        body = _generate_ndjson(chunks)
+    
+    return Response(
+        body,
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=users.{fmt}'}
+    )
+
+def _generate_ndjson(chunks):
+    """每批数据拼成一段 NDJSON 输出"""
+    for rows in chunks:
+        yield ''.join(json.dumps(row, ensure_ascii=False, default=str) + '\n' for row in rows)
+
+def _generate_csv(chunks, columns):
+    """先输出表头，然后每批数据输出一段 CSV"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+    
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def _fetch_users(user_ids):
+    """
+    按 id 批量查询用户（分批 WHERE id IN (...)，每批 BATCH_SIZE 个）
+    
+    只返回 USER_DETAIL_COLUMNS（不含密码），单个和批量查询的字段相同，缓存中的行一致。
+    
+    Returns:
+        dict: 用户 id -> 用户信息（不存在的 id 不在结果中）
+    """
+    if _has_updated_at:
+        try:
+            return _select_users(user_ids, 'user_by_id', USER_DETAIL_COLUMNS)
+        except pymysql.err.OperationalError as err:
+            if not _missing_updated_at(err):
+                raise
+    return _select_users(user_ids, 'user_by_id_legacy', USER_DETAIL_COLUMNS_LEGACY)
+
+def _select_users(user_ids, query_name, columns):
+    """按 id 查询用户：单个 id 用命名查询 query_name，多个 id 分批 IN 查询 columns"""
+    if len(user_ids) == 1:
+        # 单个 id（/<id>、update、delete）使用命名查询，保留原来的查询统计
+        user = db.run(query_name, user_ids[0])
+        return {user_ids[0]: user} if user else {}
+    
+    users = {}
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        for row in db.query(select_in_sql('users', len(chunk), columns=', '.join(columns)), tuple(chunk)):
+            users[row['id']] = row
+    return users
+
+def _user_loader():
+    """当前请求的用户加载器（请求内去重，先查 user_cache，未命中的 id 合并成一次查询）"""
+    return get_loader('user', lambda: BatchLoader(_fetch_users, cache=user_cache))
+
+def _load_user(user_id):
+    """
+    读取单个用户（读穿缓存：先查缓存，未命中再查数据库）
     
-    sql = "SELECT id,name FROM users where status = 1"
-    users = db.query(sql)
+    Returns:
+        dict: 用户信息，不存在返回 None
+    """
+    return _user_loader().load(user_id)
+
+def _invalidate_user(user_id):
+    """用户数据被修改后，删除对应的缓存"""
+    user_cache.delete(user_id)
+    _user_loader().clear(user_id)
 
-    return success(data=users,message="获取用户列表成功")
+def _notify_user_change(action, user_id, changes=None):
+    """
+    用户数据写入成功后调用：记录审计日志，并推送变更事件给 /events 的订阅者
+    
+    事件只包含 id 和修改的字段名（不包含值），订阅者需要时用 /batch/get 读取最新数据，
+    不会把其他用户的数据推送给没有权限读取的连接。
+    """
+    audit_log.record(action, user_id, changes)
+    change_hub.publish(action, {'id': user_id, 'fields': sorted(changes) if changes else []})
+
+@user_bp.route('/batch/get', methods=['GET'])
+@token_required # 需要token才能访问
+def batch_get_users():
+    """
+    批量获取用户（代替循环调用 /<id>）
+    
+    Query 参数:
+        ids: 逗号分隔的用户 id，如 ids=3,1,2（最多 MULTI_GET_MAX_IDS 个，可以重复）
+    
+    结果与 ids 顺序一致，不存在的用户返回 {"id": x, "found": false}；
+    重复的 id 只查询一次，先查缓存，未命中的 id 合并成 WHERE id IN (...) 查询。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    raw = request.args.get('ids', '')
+    parts = [part.strip() for part in raw.split(',') if part.strip()]
+    if not parts:
+        return error(message="请提供 ids 参数")
+    if len(parts) > MULTI_GET_MAX_IDS:
+        return error(message=f"单次最多获取 {MULTI_GET_MAX_IDS} 个用户")
+    if not all(part.isdigit() and int(part) > 0 for part in parts):
+        return error(message="ids 必须是逗号分隔的正整数")
+    
+    user_ids = [int(part) for part in parts]
+    users = _user_loader().load_many(user_ids)
+    
+    results = []
+    for user_id, user in zip(user_ids, users):
+        if user is None:
+            results.append({'id': user_id, 'found': False})
+        else:
+            results.append({'id': user_id, 'found': True, 'user': user})
+    
+    return success(
+        data={
+            'list': results,
+            'total': len(results),
+            'found': sum(1 for user in users if user is not None)
+        },
+        message="批量获取用户成功"
+    )
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
 @token_required # 需要token才能访问
 def get_user(user_id):
-    """获取单个用户"""
+    """
+    获取单个用户
+    
+    支持 If-None-Match / If-Modified-Since，ETag 和 Last-Modified 由 updated_at 决定，
+    用户数据来自缓存时不需要查询数据库就能返回 304。
+    """
     current_user = g.current_user  # ✅ 从 g 对象获取
 
-    sql = "SELECT * FROM users WHERE id = %s"
-    user = db.query(sql, (user_id,))
-    if user:
-        return success(data=user[0],message="获取用户成功")
-    return error(message="用户不存在")
+    user = _load_user(user_id)
+    if not user:
+        return error(message="用户不存在")
+    
+    updated_at = user.get('updated_at')
+    last_modified = to_http_date(updated_at)
+    # 没有 updated_at 列时退化为按内容计算
+    etag = make_etag('user', user_id, updated_at if updated_at is not None else sorted(user.items()))
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    return with_validators(success(data=user,message="获取用户成功"), etag, last_modified)
 
 @user_bp.route('/add', methods=['POST'])
 @token_required # 需要token才能访问
@@ -47,22 +476,20 @@ def add_user():
         return error(message="没有提供数据")
     
     # 验证数据
-    schema = UserSchema()
     try:
-        validated_data = schema.load(data)  # 验证并返回合法数据
+        with phase('validate'):
+            validated_data = user_schema.load(data)  # 验证并返回合法数据
     except ValidationError as err:
         return error(message=err.messages)
     
-    # 动态构建SQL
-    fields = ', '.join(data.keys())
-    placeholders = ', '.join(['%s'] * len(data))
-    values = tuple(data.values())
-    
-    sql = f"INSERT INTO users ({fields}) VALUES ({placeholders})"
-    result = db.execute(sql, values)
+    # 只使用验证后的字段，SQL 模板按字段组合缓存
+    fields, values = split_fields(validated_data, USER_COLUMNS)
+    result = db.execute(insert_sql('users', fields), values)
+    _invalidate_list()
 
     # 验证是否插入成功
     if result['affected_rows'] > 0:
+        _notify_user_change('user.add', result['last_id'], validated_data)
         # 获取新增的id
         return success(
             data={"id": result['last_id']}, 
@@ -82,32 +509,25 @@ def update_user(user_id):
         return error(message="没有提供数据")
     
     # 验证数据
-    schema = UserUpdateSchema()
     try:
-        validated_data = schema.load(data)  # 验证并返回合法数据
+        with phase('validate'):
+            validated_data = user_update_schema.load(data)  # 验证并返回合法数据
     except ValidationError as err:
         return error(message=err.messages)
     
     # 查询数据是否存在
-    sql = "SELECT * FROM users WHERE id = %s"
-    user = db.query(sql, (user_id,))
+    user = _load_user(user_id)
     if not user:
         return error(message="用户不存在")
     
-    # 动态构建SQL
-    fields = []
-    values = []
-    for key, value in data.items():
-        fields.append(f"{key}=%s")
-        values.append(value)
-    
-    # 添加user_id到参数列表
-    values.append(user_id)
-    
-    sql = f"UPDATE users SET {', '.join(fields)} WHERE id=%s"
-    result = db.execute(sql, tuple(values))
+    # 只使用验证后的字段，SQL 模板按字段组合缓存
+    fields, values = split_fields(validated_data, USER_UPDATE_COLUMNS)
+    result = db.execute(update_sql('users', fields), values + (user_id,))
+    _invalidate_user(user_id)
+    _invalidate_list()
 
     if result['affected_rows'] > 0:
+        _notify_user_change('user.update', user_id, diff_changes(user, validated_data))
         return success(message="用户更新成功")
     else:
         return error(message="用户更新失败", code=500)
@@ -119,15 +539,216 @@ def delete_user(user_id):
     current_user = g.current_user  # ✅ 从 g 对象获取
 
     # 查询数据是否存在
-    sql = "SELECT * FROM users WHERE id = %s"
-    user = db.query(sql, (user_id,))
+    user = _load_user(user_id)
     if not user:
         return error(message="用户不存在")
     
     sql = "UPDATE users SET status = 7 WHERE id=%s"
     result = db.execute(sql, (user_id,))
+    _invalidate_user(user_id)
+    _invalidate_list()
 
     if result['affected_rows'] > 0:
+        _notify_user_change('user.delete', user_id, {'status': [user.get('status'), 7]})
         return success(message="用户删除成功")
     else:
-        return error(message="用户删除失败", code=500)
\ No newline at end of file
+        return error(message="用户删除失败", code=500)
+
+@user_bp.route('/batch/add', methods=['POST'])
+@token_required # 需要token才能访问
+def batch_add_users():
+    """
+    批量添加用户
+    
+    请求体为用户数组，每一项格式同 /add。校验失败的项不会写入，
+    校验通过的项在同一个事务中按 BATCH_SIZE 分批写入（多行 INSERT）。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    data = request.get_json()
+    items_error = _check_batch_items(data)
+    if items_error:
+        return items_error
+    
+    # 验证数据
+    errors, loaded = _load_many(users_schema, data)
+    
+    # 字段相同的行合并成一条 INSERT 批量执行（记下每一行对应的下标，用于回填新增的 id）
+    groups = {}
+    for index, item in enumerate(loaded):
+        if index in errors:
+            continue
+        fields, values = split_fields(item, USER_COLUMNS)
+        group = groups.setdefault(fields, ([], []))
+        group[0].append(values)
+        group[1].append(index)
+    
+    statements = [(insert_sql('users', fields), rows) for fields, (rows, indexes) in groups.items()]
+    if statements:
+        result = db.execute_batches(statements, batch_size=BATCH_SIZE)
+        _invalidate_list()
+        for (_, indexes), new_ids in zip(groups.values(), result['insert_ids']):
+            for position, index in enumerate(indexes):
+                # insert_ids 为空时（拿不到连续的 id）审计中的 target_id 留空
+                _notify_user_change('user.add', new_ids[position] if new_ids else None, loaded[index])
+    
+    return _batch_response(len(data), errors, "批量添加用户")
+
+@user_bp.route('/batch/update', methods=['PUT'])
+@token_required # 需要token才能访问
+def batch_update_users():
+    """
+    批量更新用户
+    
+    请求体为数组，每一项包含 id 和要更新的字段（字段规则同 /update/<id>），
+    所有更新在同一个事务中按 BATCH_SIZE 分批执行。
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    data = request.get_json()
+    items_error = _check_batch_items(data)
+    if items_error:
+        return items_error
+    
+    # 先取出 id，剩下的字段交给 schema 验证
+    ids = [item.get('id') if isinstance(item, dict) else None for item in data]
+    payloads = [{k: v for k, v in item.items() if k != 'id'} if isinstance(item, dict) else item for item in data]
+    errors, loaded = _load_many(users_update_schema, payloads)
+    
+    for index, user_id in enumerate(ids):
+        if not _is_valid_id(user_id):
+            errors.setdefault(index, {})['id'] = ["缺少有效的用户 id"]
+    
+    existing = _existing_users([user_id for index, user_id in enumerate(ids) if index not in errors],
+                               USER_UPDATE_COLUMNS)
+    for index, user_id in enumerate(ids):
+        if index not in errors and user_id not in existing:
+            errors[index] = {'id': ["用户不存在"]}
+    
+    # 更新字段相同的行合并成一条 UPDATE 批量执行
+    groups = {}
+    for index, item in enumerate(loaded):
+        if index in errors:
+            continue
+        fields, values = split_fields(item, USER_UPDATE_COLUMNS)
+        groups.setdefault(fields, []).append(values + (ids[index],))
+    
+    statements = [(update_sql('users', fields), rows) for fields, rows in groups.items()]
+    if statements:
+        db.execute_batches(statements, batch_size=BATCH_SIZE)
+        for index, user_id in enumerate(ids):
+            if index not in errors:
+                _invalidate_user(user_id)
+                _notify_user_change('user.update', user_id, diff_changes(existing[user_id], loaded[index]))
+        _invalidate_list()
+    
+    return _batch_response(len(data), errors, "批量更新用户")
+
+@user_bp.route('/batch/delete', methods=['DELETE'])
+@token_required # 需要token才能访问
+def batch_delete_users():
+    """
+    批量删除用户（软删除，status = 7）
+    
+    请求体: {"ids": [1, 2, 3]}
+    """
+    current_user = g.current_user  # ✅ 从 g 对象获取
+
+    data = request.get_json()
+    ids = data.get('ids') if isinstance(data, dict) else None
+    items_error = _check_batch_items(ids)
+    if items_error:
+        return items_error
+    
+    errors = {}
+    for index, user_id in enumerate(ids):
+        if not _is_valid_id(user_id):
+            errors[index] = {'id': ["无效的用户 id"]}
+    
+    existing = _existing_users([user_id for index, user_id in enumerate(ids) if index not in errors],
+                               ('status',))
+    for index, user_id in enumerate(ids):
+        if index not in errors and user_id not in existing:
+            errors[index] = {'id': ["用户不存在"]}
+    
+    rows = [(user_id,) for index, user_id in enumerate(ids) if index not in errors]
+    if rows:
+        db.execute_batches([("UPDATE users SET status = 7 WHERE id=%s", rows)], batch_size=BATCH_SIZE)
+        for (user_id,) in rows:
+            _invalidate_user(user_id)
+            _notify_user_change('user.delete', user_id, {'status': [existing[user_id].get('status'), 7]})
+        _invalidate_list()
+    
+    return _batch_response(len(ids), errors, "批量删除用户")
+
+def _check_batch_items(items):
+    """
+    检查批量请求的数组本身（类型、数量）
+    
+    Returns:
+        不合法时返回错误响应，合法返回 None
+    """
+    if not isinstance(items, list) or not items:
+        return error(message="请提供非空数组")
+    if len(items) > BATCH_MAX_ITEMS:
+        return error(message=f"单次最多提交 {BATCH_MAX_ITEMS} 条")
+    return None
+
+def _load_many(schema, items):
+    """
+    用 many=True 的 schema 验证整个数组
+    
+    Returns:
+        tuple: (错误信息 {下标: 错误}, 每一项验证后的数据列表)
+    """
+    try:
+        with phase('validate'):
+            return {}, schema.load(items)
+    except ValidationError as err:
+        return dict(err.messages), err.valid_data
+
+def _is_valid_id(user_id):
+    """用户 id 必须是正整数"""
+    return isinstance(user_id, int) and not isinstance(user_id, bool) and user_id > 0
+
+def _existing_users(user_ids, columns):
+    """
+    分批查询存在的用户（每批一条 WHERE id IN (...)），同时取出修改前的字段用于审计
+    
+    Args:
+        user_ids: 用户 id 列表
+        columns: 需要取出的字段（写入前的旧值）
+    
+    Returns:
+        dict: 用户 id -> 行数据（不存在的 id 不在其中）
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    existing = {}
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        sql = f"SELECT {', '.join(('id',) + tuple(columns))} FROM users WHERE id IN ({', '.join(['%s'] * len(chunk))})"
+        existing.update((row['id'], row) for row in db.query(sql, tuple(chunk)))
+    return existing
+
+def _batch_response(total, errors, action):
+    """
+    生成批量操作的逐条结果
+    
+    全部失败时返回 400，否则返回 200，具体每一条的结果见 data.results
+    """
+    results = []
+    for index in range(total):
+        if index in errors:
+            results.append({'index': index, 'success': False, 'errors': errors[index]})
+        else:
+            results.append({'index': index, 'success': True})
+    
+    data = {
+        'total': total,
+        'succeeded': total - len(errors),
+        'failed': len(errors),
+        'results': results
+    }
+    if len(errors) == total:
+        return error(message=f"{action}失败", data=data)
+    return success(data=data, message=f"{action}完成")
@@ -0,0 +1,264 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from config import (ARCHIVE_RETENTION_DAYS, ARCHIVE_CHUNK_SIZE, ARCHIVE_MAX_ROWS_PER_SECOND,
+                    ARCHIVE_MAX_REPLICA_LAG, ARCHIVE_INTERVAL_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+# 归档保存的列（与 migrations/007_users_archive.sql 一致；密码哈希不归档，随删除一起清除）
+ARCHIVE_COLUMNS = ('id', 'name', 'email', 'mobile', 'userid', 'status', 'updated_at')
+
+# MySQL 命名锁：多个 worker / 多台机器 / cron 同时触发时只有一个在归档
+LOCK_NAME = 'users_archive'
+
+# 从库延迟超过上限时最多暂停的秒数，仍然没有恢复则结束本次归档（下次再继续）
+MAX_LAG_PAUSE = 60
+
+# 候选行：(status, id, updated_at) 覆盖索引上的范围扫描（见 migrations/002_users_updated_at.sql），不回表
+CANDIDATES_SQL = ("SELECT id FROM users WHERE status = 7 AND id > %s AND updated_at < %s "
+                  "ORDER BY id LIMIT %s")
+COUNT_SQL = "SELECT COUNT(*) AS cnt FROM users WHERE status = 7 AND updated_at < %s"
+
+@lru_cache(maxsize=32)
+def _chunk_sql(count):
+    """
+    一批的三条 SQL（按 id 个数缓存，除最后一批外长度都相同）
+
+    Returns:
+        tuple: (加锁重新检查条件, 复制到归档表, 从 users 删除)
+    """
+    placeholders = ', '.join(['%s'] * count)
+    columns = ', '.join(ARCHIVE_COLUMNS)
+    return (
+        f"SELECT id FROM users WHERE id IN ({placeholders}) AND status = 7 AND updated_at < %s FOR UPDATE",
+        f"INSERT IGNORE INTO users_archive ({columns}, archived_at) "
+        f"SELECT {columns}, %s FROM users WHERE id IN ({placeholders})",
+        f"DELETE FROM users WHERE id IN ({placeholders})"
+    )
+
+@contextmanager
+def _run_lock(db):
+    """
+    获取归档的命名锁（不等待），整个归档期间占用一个连接（GET_LOCK 属于连接会话）
+
+    Yields:
+        bool: 是否拿到锁，没拿到说明其它进程正在归档
+    """
+    with db.get_connection(sample=False) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (LOCK_NAME,))
+            locked = bool(cursor.fetchone()['locked'])
+            try:
+                yield locked
+            finally:
+                if locked:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        finally:
+            cursor.close()
+
+def _move_chunk(db, ids, cutoff, archived_at):
+    """
+    在一个事务中把一批用户复制到 users_archive 并从 users 删除
+
+    先对候选行加锁并重新检查条件：选出候选之后被恢复或修改过的用户不会被移动。
+    INSERT IGNORE 让重复执行（如上次复制成功但连接在提交时断开）不会失败。
+
+    Returns:
+        list: 实际移动的用户 id
+    """
+    lock_sql, _, _ = _chunk_sql(len(ids))
+    with db.transaction() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(lock_sql, (*ids, cutoff))
+            moved = [row['id'] for row in cursor.fetchall()]
+            if moved:
+                _, copy_sql, delete_sql = _chunk_sql(len(moved))
+                cursor.execute(copy_sql, (archived_at, *moved))
+                cursor.execute(delete_sql, tuple(moved))
+        finally:
+            cursor.close()
+    return moved
+
+def count_archivable(db, retention_days=ARCHIVE_RETENTION_DAYS):
+    """
+    Returns:
+        int: 当前可以归档的用户数
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    return db.query(COUNT_SQL, (cutoff,), primary=True)[0]['cnt']
+
+def archive_deleted_users(db, cache=None, retention_days=ARCHIVE_RETENTION_DAYS, chunk_size=ARCHIVE_CHUNK_SIZE,
+                          max_rows_per_second=ARCHIVE_MAX_ROWS_PER_SECOND, max_replica_lag=ARCHIVE_MAX_REPLICA_LAG,
+                          start_id=0, max_rows=0, stop=None, on_chunk=None):
+    """
+    把删除（status = 7）超过 retention_days 天的用户移到 users_archive 表
+
+    按 id 做 keyset 分批，每批 chunk_size 行一个短事务（锁只持有一批的时间）。
+    每批之后按 max_rows_per_second 限速，并在从库延迟超过 max_replica_lag 时暂停，
+    避免大量删除产生的 binlog 让从库越落越远。
+
+    可以随时中断：已提交的批次已经不在 users 中，未提交的批次整体回滚，
+    重新执行会从剩下的行继续（也可以用 start_id 跳过已经扫描过的范围）。
+
+    Args:
+        db: Database 实例
+        cache: 用户缓存（移动后删除对应 id 的缓存，None 表示不处理）
+        retention_days: 删除多少天后归档（按 updated_at）
+        chunk_size: 每批行数
+        max_rows_per_second: 每秒最多移动的行数（0 表示不限制）
+        max_replica_lag: 从库延迟上限（秒，0 表示不检查）
+        start_id: 从大于该 id 的行开始
+        max_rows: 最多移动的行数（0 表示不限制）
+        stop: threading.Event，设置后在当前批次结束时停止
+        on_chunk: 每批结束后调用 on_chunk(report)，用于输出进度
+
+    Returns:
+        dict: {
+            'moved': 移动的行数,
+            'chunks': 批次数,
+            'last_id': 已经处理到的 id（中断后可以作为 start_id）,
+            'rows_per_second': 平均每秒移动的行数（包含限速等待）,
+            'throttled_seconds': 限速和等待从库的总秒数,
+            'elapsed_seconds': 总耗时,
+            'status': completed / stopped / max_rows / replica_lag / locked
+        }
+    """
+    stop = stop or threading.Event()
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    report = {
+        'cutoff': cutoff,
+        'moved': 0,
+        'chunks': 0,
+        'last_id': start_id,
+        'rows_per_second': 0.0,
+        'throttled_seconds': 0.0,
+        'elapsed_seconds': 0.0,
+        'status': 'completed'
+    }
+    start = time.perf_counter()
+
+    with _run_lock(db) as locked:
+        if not locked:
+            report['status'] = 'locked'
+            return report
+
+        while True:
+            if stop.is_set():
+                report['status'] = 'stopped'
+                break
+            limit = chunk_size if max_rows <= 0 else min(chunk_size, max_rows - report['moved'])
+            if limit <= 0:
+                report['status'] = 'max_rows'
+                break
+            ids = [row['id'] for row in db.query(CANDIDATES_SQL, (report['last_id'], cutoff, limit), primary=True)]
+            if not ids:
+                break
+
+            chunk_start = time.perf_counter()
+            moved = _move_chunk(db, ids, cutoff, datetime.now())
+            chunk_elapsed = time.perf_counter() - chunk_start
+            if cache is not None:
+                for user_id in moved:
+                    cache.delete(user_id)
+
+            report['moved'] += len(moved)
+            report['chunks'] += 1
+            report['last_id'] = ids[-1]
+
+            # 限速：这一批至少要用 len(moved) / max_rows_per_second 秒
+            wait = len(moved) / max_rows_per_second - chunk_elapsed if max_rows_per_second > 0 else 0
+            if wait > 0:
+                stop.wait(wait)
+                report['throttled_seconds'] += wait
+            if max_replica_lag > 0 and not _wait_for_replicas(db, max_replica_lag, stop, report):
+                report['status'] = 'replica_lag'
+                break
+
+            report['elapsed_seconds'] = time.perf_counter() - start
+            report['rows_per_second'] = report['moved'] / report['elapsed_seconds']
+            if on_chunk is not None:
+                on_chunk(report)
+
+    report['elapsed_seconds'] = time.perf_counter() - start
+    report['rows_per_second'] = report['moved'] / report['elapsed_seconds'] if report['elapsed_seconds'] > 0 else 0.0
+    return report
+
+def _wait_for_replicas(db, max_replica_lag, stop, report):
+    """
+    从库延迟超过上限时每秒检查一次，最多等待 MAX_LAG_PAUSE 秒
+
+    Returns:
+        bool: 延迟是否已经恢复（复制停止或从库连不上也视为没有恢复）
+    """
+    waited = 0
+    while True:
+        lag = db.get_replica_lag()
+        if lag is not None and lag <= max_replica_lag:
+            return True
+        if waited >= MAX_LAG_PAUSE or stop.is_set():
+            logger.error("从库延迟 %s 秒，超过 %s 秒，停止归档（已处理到 id %s）", lag, max_replica_lag, report['last_id'])
+            return False
+        if waited == 0:
+            logger.warning("从库延迟 %s 秒，超过 %s 秒，暂停归档", lag, max_replica_lag)
+        stop.wait(1)
+        waited += 1
+        report['throttled_seconds'] += 1
+
+class ArchiveScheduler:
+    """
+    定时归档（每个进程一个后台线程，每隔 interval 秒执行一次 archive_deleted_users）
+
+    在 gunicorn 的 post_fork 中 start，worker_exit 中 stop；每个 worker 都会启动，
+    命名锁保证同一时间只有一个在归档，其它的本轮直接跳过。
+    不想在 web 进程中执行时保持 interval = 0，用 cron 调用 flask archive-users。
+    """
+
+    def __init__(self, db, cache=None, interval=ARCHIVE_INTERVAL_SECONDS, **options):
+        """
+        Args:
+            db: Database 实例
+            cache: 用户缓存
+            interval: 执行间隔（秒，<= 0 表示不启动）
+            **options: 传给 archive_deleted_users 的参数
+        """
+        self.db = db
+        self.cache = cache
+        self.interval = interval
+        self.options = options
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台线程（interval <= 0 或已经启动时不做任何事）"""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='user-archiver', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """停止：正在执行的归档在当前批次提交后结束"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                report = archive_deleted_users(self.db, self.cache, stop=self._stop, **self.options)
+            except Exception as e:
+                logger.error("归档软删除用户失败: %s", e)
+                continue
+            self.last_report = report
+            if report['status'] != 'locked':
+                logger.info("归档软删除用户 %d 行（%.1f 行/秒，%s）", report['moved'],
+                            report['rows_per_second'], report['status'])
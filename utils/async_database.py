@@ -0,0 +1,212 @@
+import asyncio
+import time
+import aiomysql
+from contextlib import asynccontextmanager
+from config import DB_CONFIG
+from utils.database import PoolTimeoutError, QueryRegistry
+from utils.queries import register_queries
+
+class AsyncDatabase:
+    """
+    异步数据库连接池管理类（ASGI 部署使用）
+
+    接口与 Database 一致：query / execute / execute_many / run / transaction，
+    区别是都需要 await。连接池在当前事件循环第一次使用时创建。
+    """
+
+    def __init__(self, host, user, password, database, port=3306,
+                 max_connections=10, min_connections=2, checkout_timeout=5, **kwargs):
+        """
+        保存连接池配置（不会立即连接数据库）
+
+        Args:
+            host: 数据库地址
+            user: 用户名
+            password: 密码
+            database: 数据库名
+            port: 端口
+            max_connections: 最大连接数（默认10）
+            min_connections: 最小连接数（默认2）
+            checkout_timeout: 连接池满时最多等待的秒数（默认5，<= 0 表示一直等待）
+            **kwargs: Database 专用的其它参数（max_cached、ping 等），这里忽略
+        """
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.port = port
+        self.max_connections = max_connections
+        self.min_connections = min_connections
+        self.checkout_timeout = checkout_timeout if checkout_timeout > 0 else None
+        self._pool = None
+        self._pool_lock = None
+        self.queries = QueryRegistry()  # 命名查询（与同步部署相同，见 utils/queries.py）
+        register_queries(self.queries)
+
+    async def _get_pool(self):
+        """获取连接池，不存在时创建"""
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await aiomysql.create_pool(
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    db=self.database,
+                    port=self.port,
+                    minsize=self.min_connections,
+                    maxsize=self.max_connections,
+                    charset='utf8mb4',
+                    cursorclass=aiomysql.DictCursor,
+                    autocommit=True,
+                    pool_recycle=3600     # 超过1小时的连接重建，避免被服务端断开
+                )
+                print(f"✅ 异步数据库连接池已创建 (最小: {self.min_connections}, 最大: {self.max_connections})")
+        return self._pool
+
+    @asynccontextmanager
+    async def get_connection(self):
+        """
+        异步上下文管理器：自动获取和释放连接
+
+        用法:
+            async with db.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql)
+
+        Raises:
+            PoolTimeoutError: 等待超过 checkout_timeout 仍没有空闲连接
+        """
+        pool = await self._get_pool()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=self.checkout_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(f"等待数据库连接超时（{self.checkout_timeout}秒）")
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    async def query(self, sql, params=None):
+        """
+        查询数据（SELECT）
+
+        Returns:
+            list: 查询结果（字典列表）
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchall()
+
+    async def execute(self, sql, params=None):
+        """
+        执行 SQL（INSERT, UPDATE, DELETE）
+
+        Returns:
+            dict: {
+                'affected_rows': int,  # 受影响的行数
+                'last_id': int         # 最后插入的ID
+            }
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute(sql, params)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+                return {
+                    "affected_rows": cursor.rowcount,
+                    "last_id": cursor.lastrowid
+                }
+
+    async def execute_many(self, sql, params_list):
+        """
+        批量执行 SQL
+
+        Returns:
+            dict: {
+                'affected_rows': int,
+                'success': bool
+            }
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.executemany(sql, params_list)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+                return {
+                    "affected_rows": cursor.rowcount,
+                    "success": True
+                }
+
+    async def run(self, name, *params):
+        """
+        执行注册过的命名查询（返回值同 Database.run）
+
+        用法:
+            user = await db.run('user_by_id', user_id)
+
+        Raises:
+            UnknownQueryError: 查询没有注册
+            TypeError: 参数个数与模板不一致
+        """
+        query = self.queries.get(name)
+        if len(params) != query.param_count:
+            raise TypeError(f"查询 {name} 需要 {query.param_count} 个参数，实际传入 {len(params)} 个")
+        start = time.perf_counter()
+        rows = 0
+        failed = True
+        try:
+            if query.kind == 'read':
+                result = await self.query(query.sql, params)
+                rows = len(result)
+                if query.fetch == 'one':
+                    result = result[0] if result else None
+            else:
+                result = await self.execute(query.sql, params)
+                rows = result["affected_rows"]
+            failed = False
+            return result
+        finally:
+            query.observe(time.perf_counter() - start, rows, failed)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        事务上下文管理器
+
+        用法:
+            async with db.transaction() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql1)
+                    await cursor.execute(sql2)
+                # 自动 commit，出错自动 rollback
+        """
+        async with self.get_connection() as conn:
+            await conn.begin()
+            try:
+                yield conn
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    async def close(self):
+        """关闭连接池"""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+            print("❌ 异步数据库连接池已关闭")
+
+# 全局共享的异步数据库实例
+async_db = AsyncDatabase(**DB_CONFIG)
@@ -0,0 +1,32 @@
+import asyncio
+from functools import wraps
+from quart import request,g
+from utils.async_response import error
+from utils.jwt_utils import verify_token
+
+def token_required(f):
+    """JWT认证装饰器（异步视图）"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        # 从请求头获取token
+        token = request.headers.get('Authorization')
+        
+        if not token:
+            return error(message="缺少token，请先登录", code=401)
+        
+        # 去掉 "Bearer " 前缀（如果有）
+        if token.startswith('Bearer '):
+            token = token[7:]
+        
+        # 验证token（签名校验和 Redis 吊销检查放到线程中执行，不阻塞事件循环）
+        payload = await asyncio.to_thread(verify_token, token, token_type='access')
+        
+        if not payload:
+            return error(message="token无效或已过期，请重新登录", code=401)
+        
+        # 将用户信息存储到 Quart 的 g 对象
+        g.current_user = payload
+        
+        return await f(*args, **kwargs)
+    
+    return decorated_function
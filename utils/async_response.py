@@ -0,0 +1,10 @@
+from quart import jsonify
+from utils.response import build_response
+
+def success(data=None, message="操作成功", code=200):
+    """成功响应（Quart）"""
+    return jsonify(build_response(True, message, code, data)), code
+
+def error(message="操作失败", code=400, data=None):
+    """错误响应（Quart）"""
+    return jsonify(build_response(False, message, code, data)), code
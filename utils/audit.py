@@ -0,0 +1,303 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from utils.request_context import current_request
+from utils.response import get_request_id
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest', 'spill')
+
+# 审计日志中不保存的字段（只记录"修改了"，不记录值）
+SENSITIVE_FIELDS = ('password',)
+
+INSERT_SQL = ("INSERT INTO audit_log (created_at, actor_id, actor_name, action, target_type, target_id, "
+              "changes, request_id, ip) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)")
+
+def _to_row(event):
+    """事件 -> INSERT_SQL 的参数"""
+    changes = json.dumps(event['changes'], ensure_ascii=False, default=str) if event['changes'] else None
+    return (event['created_at'], event['actor_id'], event['actor_name'], event['action'],
+            event['target_type'], event['target_id'], changes, event['request_id'], event['ip'])
+
+def mask_changes(changes):
+    """敏感字段的值替换为 ***"""
+    if not changes:
+        return changes
+    return {key: '***' if key in SENSITIVE_FIELDS else value for key, value in changes.items()}
+
+def diff_changes(before, after):
+    """
+    对比修改前后的字段
+
+    Args:
+        before: 修改前的数据（如缓存中的用户）
+        after: 本次写入的字段
+
+    Returns:
+        dict: 字段 -> [旧值, 新值]（只包含值有变化的字段）
+    """
+    return {key: [before.get(key), value] for key, value in after.items() if before.get(key) != value}
+
+class FileSink:
+    """
+    本地追加写入的审计文件（每行一个 JSON）
+
+    数据库不可用或队列满（spill 策略）时写入，之后可以用 flask audit-replay 导入数据库。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, events):
+        """追加写入并 flush 到操作系统（进程崩溃不丢，机器断电可能丢最后几行）"""
+        lines = ''.join(json.dumps(event, ensure_ascii=False, default=str) + '\n' for event in events)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+
+class AuditLog:
+    """
+    写后（write-behind）审计日志
+
+    请求线程只把事件放进进程内的有界队列（不访问数据库），后台线程攒够 batch_size 条
+    或每隔 flush_interval 秒用一次 execute_many 批量写入 audit_log 表。
+
+    队列满时按 overflow 处理:
+        block:       请求线程最多等待 block_timeout 秒（背压），仍然满则按 spill / 丢弃处理
+        drop_newest: 丢弃新事件
+        drop_oldest: 丢弃最早的事件
+        spill:       直接写入本地文件（需要 file_path）
+
+    写入数据库失败时整批写入本地文件；没有配置文件时放回队列稍后重试。
+    后台线程在每个进程第一次记录事件时启动（gunicorn fork 后在 worker 中重新启动），
+    进程退出时（atexit / gunicorn worker_exit）把队列中剩余的事件写完。
+    """
+
+    def __init__(self, db, max_queue=10000, batch_size=200, flush_interval=1.0, overflow='block',
+                 block_timeout=0.05, file_path=None, enabled=True):
+        """
+        Args:
+            db: Database 实例（使用 execute_many 写入）
+            max_queue: 队列最多保存的事件数
+            batch_size: 每批写入的事件数
+            flush_interval: 最长多久写入一次（秒）
+            overflow: 队列满时的策略（见 OVERFLOW_POLICIES）
+            block_timeout: block 策略最多等待的秒数
+            file_path: 本地审计文件路径（None 表示不使用）
+            enabled: 是否开启
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的审计日志溢出策略: {overflow}")
+        if overflow == 'spill' and not file_path:
+            raise ValueError("spill 策略需要配置审计文件路径")
+        self.db = db
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.sink = FileSink(file_path) if file_path else None
+        self.enabled = enabled
+        self._stats = {"recorded": 0, "written": 0, "batches": 0, "dropped": 0,
+                       "spilled": 0, "blocked": 0, "write_errors": 0}
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        """创建当前进程的队列和后台线程状态（fork 后子进程重新创建）"""
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._flush_now = False
+        self._writing = 0  # 后台线程正在写入的事件数
+        self._pid = os.getpid()
+
+    def record(self, action, target_id=None, changes=None, target_type='user'):
+        """
+        记录一个审计事件（不访问数据库，立即返回）
+
+        操作人、请求 ID 和 IP 从当前请求中获取（Flask 和 Quart 都支持）。
+
+        Args:
+            action: 操作，如 user.add / user.update / user.delete
+            target_id: 被操作的对象 id
+            changes: 修改内容（敏感字段会被替换为 ***）
+            target_type: 被操作的对象类型
+        """
+        if not self.enabled:
+            return
+        g, request = current_request()
+        actor = g.get('current_user') if g is not None else None
+        event = {
+            'created_at': datetime.now(),
+            'actor_id': actor.get('user_id') if actor else None,
+            'actor_name': actor.get('username') if actor else None,
+            'action': action,
+            'target_type': target_type,
+            'target_id': target_id,
+            'changes': mask_changes(changes),
+            'request_id': get_request_id() if g is not None else None,
+            'ip': request.remote_addr if request is not None else None
+        }
+        self._enqueue(event)
+
+    def _enqueue(self, event):
+        if self._pid != os.getpid():
+            self._reset()
+        spill = False
+        with self._cond:
+            self._stats["recorded"] += 1
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == 'block':
+                    self._stats["blocked"] += 1
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_queue, self.block_timeout)
+                if len(self._queue) >= self.max_queue:
+                    if self.overflow == 'drop_oldest':
+                        self._queue.popleft()
+                        self._stats["dropped"] += 1
+                    elif self.sink is not None:
+                        self._stats["spilled"] += 1
+                        spill = True
+                    else:
+                        self._stats["dropped"] += 1
+                        return
+            if not spill:
+                self._queue.append(event)
+                if len(self._queue) >= self.batch_size:
+                    self._cond.notify_all()
+            if self._thread is None:
+                self._start()
+        if spill:
+            self.sink.write([event])
+
+    def _start(self):
+        """启动后台写入线程（调用方已持有锁）"""
+        self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing or self._flush_now or len(self._queue) >= self.batch_size,
+                                    self.flush_interval)
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not self._queue:
+                    self._flush_now = False
+                self._writing = len(batch)
+                closing = self._closing
+                self._cond.notify_all()  # 唤醒 block 策略下等待的请求线程
+            ok = self._write(batch) if batch else True
+            with self._cond:
+                self._writing = 0
+                self._cond.notify_all()  # 唤醒 flush 等待者
+                # 关闭时写完队列就退出；写入失败且没有本地文件时不再重试，剩余事件由 close 处理
+                if closing and (not self._queue or not ok):
+                    return
+
+    def _write(self, batch):
+        """
+        写入一批事件（数据库失败时写入本地文件或放回队列）
+
+        Returns:
+            bool: 是否写入成功（写入本地文件也算成功）
+        """
+        try:
+            self.db.execute_many(INSERT_SQL, [_to_row(event) for event in batch])
+        except Exception as e:
+            with self._cond:
+                self._stats["write_errors"] += 1
+            if self.sink is not None:
+                logger.error("写入审计日志失败，%d 条写入本地文件 %s: %s", len(batch), self.sink.path, e)
+                self.sink.write(batch)
+                with self._cond:
+                    self._stats["spilled"] += len(batch)
+                return True
+            logger.error("写入审计日志失败，%d 条放回队列稍后重试: %s", len(batch), e)
+            with self._cond:
+                room = self.max_queue - len(self._queue)
+                self._queue.extendleft(reversed(batch[:room]))
+                self._stats["dropped"] += len(batch) - min(room, len(batch))
+                closing = self._closing
+            if not closing:
+                time.sleep(self.flush_interval)  # 数据库故障期间不要连续重试
+            return False
+        with self._cond:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        return True
+
+    def flush(self, timeout=5.0):
+        """
+        等待队列中的事件写完
+
+        Returns:
+            bool: 是否在 timeout 秒内写完
+        """
+        with self._cond:
+            if self._thread is None:
+                return not self._queue
+            self._flush_now = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def close(self, timeout=5.0):
+        """
+        关闭：停止接收新的写入请求，等待后台线程把队列写完（写入失败的事件写入本地文件）
+
+        超时后仍未写完的事件写入本地文件，没有配置文件时记录丢失数量。
+        """
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            remaining = list(self._queue)
+            self._queue.clear()
+        if remaining:
+            if self.sink is not None:
+                self.sink.write(remaining)
+            else:
+                logger.error("关闭时还有 %d 条审计日志没有写入，已丢弃", len(remaining))
+            with self._cond:
+                self._stats["spilled" if self.sink is not None else "dropped"] += len(remaining)
+        self._thread = None
+        self._closing = False
+
+    def stats(self):
+        """
+        Returns:
+            dict: 记录/写入/丢弃/写入文件次数和当前队列长度
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._queue)
+        stats["overflow"] = self.overflow
+        stats["file_sink"] = self.sink.path if self.sink is not None else None
+        return stats
+
+def replay_file(db, path, batch_size=500):
+    """
+    把本地审计文件导入数据库（导入成功后文件重命名为 <path>.replayed-<时间>）
+
+    Returns:
+        int: 导入的事件数
+    """
+    with open(path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    for start in range(0, len(events), batch_size):
+        db.execute_many(INSERT_SQL, [_to_row(event) for event in events[start:start + batch_size]])
+    os.rename(path, f"{path}.replayed-{datetime.now():%Y%m%d%H%M%S}")
+    return len(events)
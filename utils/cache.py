@@ -0,0 +1,410 @@
+import base64
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from config import CACHE_BACKEND, CACHE_MAX_SIZE, CACHE_TTL, CACHE_TOMBSTONE_TTL, REDIS_URL
+
+try:
+    import redis  # 可选依赖，只有 CACHE_BACKEND=redis 时才需要
+except ImportError:
+    redis = None
+
+# 所有已创建的缓存实例（namespace -> cache），用于统一导出统计信息
+_caches = {}
+
+def _encode_value(value):
+    """JSON 不支持的类型 -> 带类型标记的对象（命中和未命中时返回的数据类型一致）"""
+    if isinstance(value, datetime):
+        return {'__type__': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {'__type__': 'date', 'value': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'__type__': 'decimal', 'value': str(value)}
+    if isinstance(value, bytes):
+        return {'__type__': 'bytes', 'value': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"缓存值不支持的类型: {type(value).__name__}")
+
+_DECODERS = {
+    'datetime': datetime.fromisoformat,
+    'date': date.fromisoformat,
+    'decimal': Decimal,
+    'bytes': base64.b64decode,
+}
+
+def _decode_value(obj):
+    decoder = _DECODERS.get(obj.get('__type__')) if len(obj) == 2 else None
+    return decoder(obj['value']) if decoder is not None else obj
+
+def dumps_value(value):
+    """
+    序列化缓存值（Redis 后端使用）
+
+    用 JSON 而不是 pickle：共享 Redis 中的数据被篡改时 pickle.loads 可以执行任意代码。
+    datetime / date / Decimal / bytes 带类型标记，读回来的类型不变；tuple 读回来是 list。
+    """
+    return json.dumps(value, default=_encode_value, ensure_ascii=False, separators=(',', ':')).encode()
+
+def loads_value(raw):
+    """反序列化 dumps_value 的结果"""
+    return json.loads(raw, object_hook=_decode_value)
+
+class BaseCache:
+    """
+    缓存基类
+
+    子类只需实现 _get / _set / _delete / _clear 和墓碑的读写，
+    命中/未命中统计和防击穿的按 key 加锁都在这里完成。
+
+    读穿缓存的竞争：加载线程读到旧数据后，写入线程更新数据库并 delete，加载线程随后 set
+    会把旧数据写回缓存。delete 时给 key 写入一个短期墓碑（每次的值都不同），
+    加载前记下墓碑（begin_load），加载后墓碑变了就不写入（set_loaded）。
+    """
+
+    def __init__(self, namespace, ttl=CACHE_TTL, tombstone_ttl=CACHE_TOMBSTONE_TTL):
+        """
+        Args:
+            namespace: 命名空间（不同业务的 key 互不冲突）
+            ttl: 默认过期时间（秒），<= 0 表示不过期
+            tombstone_ttl: delete 后墓碑保留的秒数（应不小于一次加载的最长耗时）
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "stale_skips": 0}
+        self._stats_lock = threading.Lock()
+        self._key_locks = {}  # key -> [锁, 等待者数量]
+        self._key_locks_guard = threading.Lock()
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Returns:
+            缓存的值，未命中返回 None
+        """
+        value = self._get(key)
+        self._incr("hits" if value is not None else "misses")
+        return value
+
+    def get_many(self, keys):
+        """
+        批量读取缓存（Redis 后端一次 MGET）
+
+        Returns:
+            dict: 命中的 key -> 值（未命中的 key 不在结果中）
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {key: value for key, value in zip(keys, self._get_many(keys)) if value is not None}
+        self._incr("hits", len(found))
+        self._incr("misses", len(keys) - len(found))
+        return found
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存
+
+        Args:
+            key: 键
+            value: 值（不能是 None）
+            ttl: 过期时间（秒），不传使用默认值
+        """
+        self._set(key, value, self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        """删除缓存（数据写入提交后调用，使缓存失效；正在进行的加载不会再写回旧数据）"""
+        self._set_tombstone(key)
+        self._delete(key)
+
+    def begin_load(self, key):
+        """
+        开始从数据源加载 key 之前调用
+
+        Returns:
+            当前的墓碑标记，交给 set_loaded
+        """
+        return self._get_tombstone(key)
+
+    def set_loaded(self, key, value, token, ttl=None):
+        """
+        写入加载到的值：从 begin_load 到现在 key 被 delete 过（数据可能已经更新）时不写入
+
+        Returns:
+            bool: 是否写入
+        """
+        if self._get_tombstone(key) != token:
+            self._incr("stale_skips")
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def clear(self):
+        """清空当前命名空间下的所有缓存"""
+        self._clear()
+
+    def get_generation(self, name):
+        """
+        读取代数计数器（初始为 0）
+
+        把代数作为 key 的一部分，写入数据后 bump_generation，
+        旧代数下的所有 key 一次性失效（不需要逐个删除，旧 key 等 TTL 或 LRU 淘汰）。
+        """
+        return self._get_generation(name)
+
+    def bump_generation(self, name):
+        """代数加一，返回新的代数"""
+        return self._bump_generation(name)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        读穿缓存：未命中时调用 loader 加载并写入缓存
+
+        同一个 key 同时只有一个线程执行 loader，其它线程等待后直接读缓存，
+        避免热点 key 失效瞬间大量请求同时打到数据库（缓存击穿）。
+        loader 返回 None 时不写入缓存。
+
+        Args:
+            key: 键
+            loader: 无参函数，返回要缓存的值
+            ttl: 过期时间（秒），不传使用默认值
+        """
+        value = self._get(key)
+        if value is not None:
+            self._incr("hits")
+            return value
+
+        with self._key_lock(key):
+            # 双重检查：等锁期间可能已经被其它线程加载
+            value = self._get(key)
+            if value is not None:
+                self._incr("hits")
+                return value
+
+            self._incr("misses")
+            token = self.begin_load(key)
+            value = loader()
+            if value is not None:
+                self.set_loaded(key, value, token, ttl)
+            return value
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中/淘汰/过期次数和命中率
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        stats["backend"] = type(self).__name__
+        return stats
+
+    def _incr(self, name, count=1):
+        with self._stats_lock:
+            self._stats[name] += count
+
+    @contextmanager
+    def _key_lock(self, key):
+        """按 key 加锁，没有等待者时自动清理锁对象"""
+        with self._key_locks_guard:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._key_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _get_many(self, keys):
+        """默认逐个读取，子类可以覆盖为批量读取"""
+        return [self._get(key) for key in keys]
+
+    def _set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _get_generation(self, name):
+        raise NotImplementedError
+
+    def _bump_generation(self, name):
+        raise NotImplementedError
+
+    def _get_tombstone(self, key):
+        raise NotImplementedError
+
+    def _set_tombstone(self, key):
+        raise NotImplementedError
+
+class MemoryCache(BaseCache):
+    """进程内 LRU + TTL 缓存（容量有上限，超出时淘汰最久未使用的 key）"""
+
+    def __init__(self, namespace, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL, tombstone_ttl=CACHE_TOMBSTONE_TTL):
+        super().__init__(namespace, ttl, tombstone_ttl)
+        self.max_size = max_size
+        self._data = OrderedDict()  # key -> (过期时间, 值)
+        self._generations = {}  # 代数计数器（不参与 LRU 淘汰和过期）
+        self._tombstones = {}  # key -> (墓碑序号, 过期时间)
+        self._tombstone_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._incr("expirations")
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._incr("evictions", evicted)
+
+    def _delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _get_generation(self, name):
+        return self._generations.get(name, 0)
+
+    def _bump_generation(self, name):
+        with self._lock:
+            generation = self._generations[name] = self._generations.get(name, 0) + 1
+            return generation
+
+    def _get_tombstone(self, key):
+        entry = self._tombstones.get(key)
+        return entry[0] if entry is not None and entry[1] > time.monotonic() else None
+
+    def _set_tombstone(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._tombstones) >= self.max_size:
+                self._tombstones = {k: v for k, v in self._tombstones.items() if v[1] > now}
+            self._tombstones[key] = (next(self._tombstone_ids), now + self.tombstone_ttl)
+
+    def stats(self):
+        stats = super().stats()
+        stats["size"] = len(self._data)
+        stats["max_size"] = self.max_size
+        return stats
+
+class RedisCache(BaseCache):
+    """
+    Redis 协议缓存（多个 worker 共享，写入后所有进程同时失效）
+
+    client 可以是 redis.Redis 或任何实现了 get/mget/set/delete/incr/scan_iter 的对象，
+    本地测试时可以传入假的客户端（benchmarks/fake_redis.py）。淘汰由 Redis 服务端完成，evictions 不统计。
+    值用 JSON 序列化（dumps_value），不使用 pickle。
+    """
+
+    def __init__(self, namespace, client=None, url=REDIS_URL, ttl=CACHE_TTL, tombstone_ttl=CACHE_TOMBSTONE_TTL):
+        super().__init__(namespace, ttl, tombstone_ttl)
+        if client is None:
+            if redis is None:
+                raise RuntimeError("使用 Redis 缓存需要先安装 redis 包")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._prefix = f"cache:{namespace}:"
+
+    def _get(self, key):
+        raw = self.client.get(self._prefix + str(key))
+        return loads_value(raw) if raw is not None else None
+
+    def _get_many(self, keys):
+        raws = self.client.mget([self._prefix + str(key) for key in keys])
+        return [loads_value(raw) if raw is not None else None for raw in raws]
+
+    def _set(self, key, value, ttl):
+        self.client.set(self._prefix + str(key), dumps_value(value), ex=ttl if ttl > 0 else None)
+
+    def _delete(self, key):
+        self.client.delete(self._prefix + str(key))
+
+    def _clear(self):
+        for key in self.client.scan_iter(match=self._prefix + '*'):
+            self.client.delete(key)
+
+    def _get_generation(self, name):
+        raw = self.client.get(f"{self._prefix}gen:{name}")
+        return int(raw) if raw is not None else 0
+
+    def _bump_generation(self, name):
+        # INCR 是原子操作，所有 worker 看到同一个代数
+        return self.client.incr(f"{self._prefix}gen:{name}")
+
+    def _get_tombstone(self, key):
+        return self.client.get(f"{self._prefix}tomb:{key}")
+
+    def _set_tombstone(self, key):
+        # 每次写入不同的值：加载前后读到的墓碑不同，说明期间有 worker 删除过这个 key
+        self.client.set(f"{self._prefix}tomb:{key}", uuid.uuid4().hex, ex=max(1, int(self.tombstone_ttl)))
+
+def create_cache(namespace, backend=CACHE_BACKEND, **kwargs):
+    """
+    按配置创建缓存实例
+
+    Args:
+        namespace: 命名空间
+        backend: memory / redis（默认读取 CACHE_BACKEND 配置）
+        **kwargs: 传给具体缓存类的参数（max_size、ttl、client 等）
+
+    Returns:
+        BaseCache: 缓存实例
+    """
+    if backend == 'redis':
+        cache = RedisCache(namespace, **kwargs)
+    elif backend == 'memory':
+        cache = MemoryCache(namespace, **kwargs)
+    else:
+        raise ValueError(f"不支持的缓存类型: {backend}")
+
+    _caches[namespace] = cache
+    return cache
+
+def get_cache_stats():
+    """
+    获取所有缓存的统计信息
+
+    Returns:
+        dict: namespace -> 统计信息
+    """
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
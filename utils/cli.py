@@ -0,0 +1,110 @@
+import click
+from flask.cli import with_appcontext
+from config import (USER_SEARCH_FULLTEXT, ARCHIVE_RETENTION_DAYS, ARCHIVE_CHUNK_SIZE,
+                    ARCHIVE_MAX_ROWS_PER_SECOND)
+from utils.extensions import db, user_cache
+from utils.database import DB_FAILURE_TYPES
+from utils.archive import archive_deleted_users, count_archivable
+from utils.audit import replay_file
+from utils.search import SEARCH_FILTERS, SEARCH_INDEXES, search_sql
+
+# EXPLAIN 使用的示例参数（只看执行计划，不关心是否有结果）
+_SAMPLE_VALUES = {
+    'status': 1,
+    'name': 'a%',
+    'q': '"ab"',
+    'email': 'a@example.com',
+    'mobile': '13800000000'
+}
+
+def register_commands(app):
+    """注册 flask 命令行命令"""
+    app.cli.add_command(check_search_plans)
+    app.cli.add_command(audit_replay)
+    app.cli.add_command(archive_users)
+
+@click.command('check-search-plans')
+@click.option('--max-rows', type=int, default=0, help="EXPLAIN 估算扫描行数的上限（0=不检查）")
+@click.option('--skip-unavailable', is_flag=True, help="连不上数据库时跳过检查（返回 0）")
+@with_appcontext
+def check_search_plans(max_rows, skip_unavailable):
+    """
+    检查 /api/user/search 每个搜索条件的执行计划
+
+    对每个条件（status + 单个条件）执行 EXPLAIN，没有使用 SEARCH_INDEXES 中对应的索引
+    （全表扫描、主键范围扫描或其它索引）或估算行数超过 --max-rows 时返回非 0。
+    执行迁移后或部署流水线中运行（没有 MySQL 的环境加 --skip-unavailable）:
+        flask --app app check-search-plans --max-rows 1000 --skip-unavailable
+    """
+    failed = False
+    columns = ('id', 'name')
+    for name in SEARCH_FILTERS:
+        if name == 'status' or (name == 'q' and not USER_SEARCH_FULLTEXT):
+            continue
+        sql = search_sql(('status', name), columns)
+        try:
+            rows = db.query("EXPLAIN " + sql, (_SAMPLE_VALUES['status'], _SAMPLE_VALUES[name], 0, 21), primary=True)
+        except DB_FAILURE_TYPES as e:
+            if not skip_unavailable:
+                raise
+            click.echo(f"⚠️ 数据库不可用，跳过执行计划检查: {e}")
+            return
+        for row in rows:
+            ok = (row.get('type') != 'ALL' and row.get('key') == SEARCH_INDEXES[name]
+                  and (max_rows <= 0 or (row.get('rows') or 0) <= max_rows))
+            failed = failed or not ok
+            click.echo(f"{'✅' if ok else '❌'} {name:<8} type={row.get('type')} key={row.get('key')} "
+                       f"rows={row.get('rows')} extra={row.get('Extra')}")
+    if failed:
+        raise SystemExit(1)
+
+@click.command('audit-replay')
+@click.argument('path')
+@with_appcontext
+def audit_replay(path):
+    """
+    把本地审计文件（AUDIT_FILE_PATH，数据库不可用时写入）导入 audit_log 表
+
+    导入成功后文件被重命名，不会重复导入:
+        flask --app app audit-replay logs/audit.jsonl
+    """
+    count = replay_file(db, path)
+    click.echo(f"✅ 已导入 {count} 条审计日志")
+
+@click.command('archive-users')
+@click.option('--retention-days', type=int, default=ARCHIVE_RETENTION_DAYS, show_default=True,
+              help="删除多少天后归档")
+@click.option('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, show_default=True, help="每个事务移动的行数")
+@click.option('--max-rows-per-second', type=float, default=ARCHIVE_MAX_ROWS_PER_SECOND, show_default=True,
+              help="每秒最多移动的行数（0=不限制）")
+@click.option('--start-id', type=int, default=0, help="从大于该 id 的行开始（中断后继续）")
+@click.option('--max-rows', type=int, default=0, help="最多移动的行数（0=不限制）")
+@click.option('--dry-run', is_flag=True, help="只统计可以归档的行数")
+@with_appcontext
+def archive_users(retention_days, chunk_size, max_rows_per_second, start_id, max_rows, dry_run):
+    """
+    把软删除（status = 7）超过保留天数的用户移到 users_archive 表
+
+    可以随时 Ctrl+C 中断，重新执行会从剩下的行继续，适合放到 cron 中:
+        flask --app app archive-users --retention-days 30
+    """
+    if dry_run:
+        click.echo(f"可以归档 {count_archivable(db, retention_days)} 个用户")
+        return
+
+    def progress(report):
+        click.echo(f"  已移动 {report['moved']} 行，处理到 id {report['last_id']}，"
+                   f"{report['rows_per_second']:.1f} 行/秒")
+
+    report = archive_deleted_users(db, user_cache, retention_days=retention_days, chunk_size=chunk_size,
+                                   max_rows_per_second=max_rows_per_second, start_id=start_id,
+                                   max_rows=max_rows, on_chunk=progress)
+    if report['status'] == 'locked':
+        click.echo("❌ 其它进程正在归档")
+        raise SystemExit(1)
+    click.echo(f"{'✅' if report['status'] in ('completed', 'max_rows') else '❌'} 归档 {report['moved']} 行"
+               f"（{report['chunks']} 批，{report['elapsed_seconds']:.1f} 秒，{report['rows_per_second']:.1f} 行/秒，"
+               f"限速等待 {report['throttled_seconds']:.1f} 秒），状态: {report['status']}，"
+               f"处理到 id {report['last_id']}")
+    if report['status'] == 'replica_lag':
+        raise SystemExit(1)
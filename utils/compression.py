@@ -0,0 +1,38 @@
+import gzip
+from flask import request
+from config import COMPRESS_MIN_SIZE, COMPRESS_LEVEL
+
+try:
+    import brotli  # 可选依赖，安装后客户端支持时优先使用 br
+except ImportError:
+    brotli = None
+
+# 需要压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+def init_compression(app):
+    """
+    注册响应压缩：超过 COMPRESS_MIN_SIZE 字节的响应按 Accept-Encoding 使用 br / gzip 压缩
+
+    流式响应（导出接口）不压缩。
+    """
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+
+        accept = request.accept_encodings
+        if brotli is not None and accept['br']:
+            response.set_data(brotli.compress(body, quality=min(COMPRESS_LEVEL, 11)))
+            response.headers['Content-Encoding'] = 'br'
+        elif accept['gzip']:
+            response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
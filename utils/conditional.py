@@ -0,0 +1,57 @@
+import hashlib
+from datetime import timezone
+from flask import request, make_response
+
+def make_etag(*parts):
+    """
+    根据版本信息生成 ETag（只需要版本号、更新时间等少量字段，不需要完整数据）
+
+    Returns:
+        str: 不带引号的 ETag 值
+    """
+    raw = '|'.join(str(part) for part in parts).encode()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def to_http_date(value):
+    """
+    把数据库返回的 datetime 转换成带时区的 UTC 时间（Last-Modified 使用）
+
+    数据库返回的 TIMESTAMP 不带时区，按应用服务器所在时区解释（与数据库时区一致）。
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """
+    判断客户端缓存是否仍然有效
+
+    有 If-None-Match 时只比较 ETag（弱比较），否则比较 If-Modified-Since。
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+def not_modified(etag, last_modified=None):
+    """返回 304 响应（没有响应体）"""
+    response = make_response('', 304)
+    return with_validators(response, etag, last_modified)
+
+def with_validators(response, etag, last_modified=None):
+    """
+    给响应加上 ETag / Last-Modified
+
+    Args:
+        response: Response 对象或 (Response, 状态码) 元组
+    """
+    target = response[0] if isinstance(response, tuple) else response
+    target.set_etag(etag, weak=True)
+    if last_modified is not None:
+        target.last_modified = last_modified
+    # 客户端每次都要带上验证头重新验证
+    target.headers['Cache-Control'] = 'private, no-cache'
+    return response
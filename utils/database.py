@@ -1,16 +1,363 @@
+import itertools
+import logging
+import os
 import pymysql
+from pymysql.constants import ER
+import threading
+import time
 from dbutils.pooled_db import PooledDB
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from flask import g, has_request_context, request
+from utils.cache import MemoryCache
+from utils.metrics import Histogram
+from utils.instrumentation import record_query
+from utils.overload import DeadlineExceeded, remaining_time
+
+logger = logging.getLogger(__name__)
+
+READ_ROUTINGS = ('round_robin', 'least_outstanding')
+
+class PoolTimeoutError(Exception):
+    """等待连接超过 checkout_timeout 仍未拿到连接"""
+
+# 计为数据库故障的异常（触发熔断、降低并发上限），唯一键冲突等业务错误不计入。
+# DeadlineExceeded 不计入：截止时间可以被客户端缩短，超时不能说明数据库有问题（见 LoadGuard.call）
+DB_FAILURE_TYPES = (PoolTimeoutError, pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+class PoolMetrics:
+    """连接池统计（借出/空闲数量、等待时间、占用时间、连接创建/关闭、ping 失败）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "checkouts": 0,           # 成功借出次数
+            "checkout_timeouts": 0,   # 等待超时次数
+            "checkout_errors": 0,     # 借出时出错次数（如数据库连不上）
+            "connections_created": 0, # 新建物理连接次数
+            "connections_closed": 0,  # 关闭物理连接次数
+            "ping_failures": 0        # ping 检查失败次数
+        }
+        self.in_use = 0
+        self.wait_time = Histogram()  # 等待借出的时间（秒）
+        self.hold_time = Histogram()  # 借出后占用的时间（秒）
+    
+    def incr(self, name, count=1):
+        with self._lock:
+            self.counters[name] += count
+    
+    def checked_out(self, waited):
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.in_use += 1
+        self.wait_time.observe(waited)
+    
+    def checked_in(self, held):
+        with self._lock:
+            self.in_use -= 1
+        self.hold_time.observe(held)
+    
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["in_use"] = self.in_use
+        # 打开的物理连接和空闲连接按自己的计数推算，不读取 DBUtils 的私有属性
+        data["open"] = max(0, data["connections_created"] - data["connections_closed"])
+        data["idle"] = max(0, data["open"] - data["in_use"])
+        data["wait_time"] = self.wait_time.snapshot()
+        data["hold_time"] = self.hold_time.snapshot()
+        return data
+
+class _InstrumentedConnection(pymysql.connections.Connection):
+    """会向 PoolMetrics 上报关闭/ping 失败、并按请求截止时间设置读写超时的 pymysql 连接"""
+    
+    metrics = None  # 由 _make_creator 创建连接后设置
+    pid = None  # 创建连接的进程
+    _close_counted = False  # 同一个连接只计一次关闭（DBUtils 会对已经断开的连接再调用 close）
+    
+    def query(self, sql, unbuffered=False):
+        """
+        请求有截止时间时，把剩余时间设为本次查询的 socket 读写超时
+        
+        超时后 pymysql 关闭连接并抛出 OperationalError，这里转换成 DeadlineExceeded：
+        DBUtils 不会对它做重连重试（重试会再等一个完整的超时），连接下次借出时由 ping 重建。
+        只限制客户端等待的时间，服务端的查询会继续执行到结束。
+        """
+        remaining = remaining_time()
+        if remaining is None:
+            return super().query(sql, unbuffered)
+        if remaining <= 0:
+            raise DeadlineExceeded("请求已超过截止时间")
+        timeouts = self._read_timeout, self._write_timeout
+        self._read_timeout = self._write_timeout = remaining
+        try:
+            return super().query(sql, unbuffered)
+        except pymysql.err.OperationalError as e:
+            if remaining_time() <= 0:
+                raise DeadlineExceeded(f"数据库查询超过请求截止时间: {e}") from e
+            raise
+        finally:
+            self._read_timeout, self._write_timeout = timeouts
+    
+    def close(self):
+        if self.pid is not None and self.pid != os.getpid():
+            # fork 前父进程创建的连接（连接池被回收时会关闭它）：不发送 QUIT，
+            # socket 被回收时只关闭本进程的文件描述符，父进程的连接不受影响
+            return
+        try:
+            super().close()
+        finally:
+            if self.metrics is not None and not self._close_counted:
+                self._close_counted = True
+                self.metrics.incr("connections_closed")
+    
+    def ping(self, reconnect=True):
+        try:
+            return super().ping(reconnect)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.incr("ping_failures")
+            raise
+
+def _make_creator(metrics):
+    """
+    生成 PooledDB 的 creator：创建带统计的连接
+    
+    Args:
+        metrics: 当前进程连接池的 PoolMetrics
+    """
+    def connect(*args, **kwargs):
+        conn = _InstrumentedConnection(*args, **kwargs)
+        conn.metrics = metrics
+        conn.pid = os.getpid()
+        metrics.incr("connections_created")
+        return conn
+    
+    # 让 DBUtils 把 connect 当作 pymysql 使用（异常类型、线程安全级别）
+    connect.dbapi = pymysql
+    connect.threadsafety = pymysql.threadsafety
+    return connect
+
+class UnknownQueryError(KeyError):
+    """db.run() 使用了没有注册的查询名"""
+
+class NamedQuery:
+    """
+    注册过的命名查询：SQL 模板只解析一次，并按查询名统计调用次数和耗时
+
+    pymysql 不支持服务端预处理协议（COM_STMT_PREPARE），参数仍在客户端转义。
+    这里把模板预先按 %s 切开，执行时只需转义参数并拼接，
+    省掉每次调用时 query % args 对整条 SQL 的格式化解析。
+    """
+    
+    KINDS = ('read', 'write')
+    FETCHES = ('all', 'one')
+    
+    def __init__(self, name, sql, kind='read', fetch='all'):
+        """
+        Args:
+            name: 查询名（路由中通过 db.run(name, ...) 调用）
+            sql: SQL 模板（只支持 %s 占位符，%% 表示字面量 %）
+            kind: read（返回查询结果）/ write（返回受影响行数和最后插入的ID）
+            fetch: 读查询返回全部行（all）还是第一行（one，不存在返回 None）
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"不支持的查询类型: {kind}")
+        if fetch not in self.FETCHES:
+            raise ValueError(f"不支持的 fetch: {fetch}")
+        self.name = name
+        self.sql = sql
+        self.kind = kind
+        self.fetch = fetch
+        self.parts = self._parse(sql)
+        self.param_count = len(self.parts) - 1
+        
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.latency = Histogram()  # 每次调用的耗时（秒，包含等待连接的时间）
+    
+    @staticmethod
+    def _parse(sql):
+        """把模板按 %s 切成片段（片段中的 %% 还原成 %）"""
+        parts = []
+        current = []
+        i = 0
+        while i < len(sql):
+            char = sql[i]
+            if char == '%':
+                following = sql[i + 1:i + 2]
+                if following == 's':
+                    parts.append(''.join(current))
+                    current = []
+                elif following == '%':
+                    current.append('%')
+                else:
+                    raise ValueError(f"SQL 模板只支持 %s 占位符: {sql}")
+                i += 2
+                continue
+            current.append(char)
+            i += 1
+        parts.append(''.join(current))
+        return tuple(parts)
+    
+    def render(self, literal, params):
+        """
+        生成最终发送给数据库的 SQL
+        
+        Args:
+            literal: 参数转义函数（pymysql 连接的 literal）
+            params: 参数元组
+        """
+        if len(params) != self.param_count:
+            raise TypeError(f"查询 {self.name} 需要 {self.param_count} 个参数，实际传入 {len(params)} 个")
+        if not params:
+            return self.parts[0]
+        pieces = [self.parts[0]]
+        for value, part in zip(params, self.parts[1:]):
+            pieces.append(literal(value))
+            pieces.append(part)
+        return ''.join(pieces)
+    
+    def observe(self, elapsed, rows=0, failed=False):
+        """记录一次调用"""
+        with self._lock:
+            self.calls += 1
+            self.rows += rows
+            if failed:
+                self.errors += 1
+        self.latency.observe(elapsed)
+    
+    def snapshot(self):
+        with self._lock:
+            data = {
+                "sql": self.sql,
+                "kind": self.kind,
+                "calls": self.calls,
+                "errors": self.errors,
+                "rows": self.rows
+            }
+        data["latency"] = self.latency.snapshot()
+        return data
+
+class QueryRegistry:
+    """命名查询注册表（查询在启动时声明一次，见 utils/queries.py）"""
+    
+    def __init__(self):
+        self._queries = {}
+    
+    def register(self, name, sql, kind='read', fetch='all'):
+        """
+        注册命名查询
+        
+        Raises:
+            ValueError: 查询名重复或模板不合法
+        """
+        if name in self._queries:
+            raise ValueError(f"查询已注册: {name}")
+        query = self._queries[name] = NamedQuery(name, sql, kind, fetch)
+        return query
+    
+    def get(self, name):
+        """
+        Raises:
+            UnknownQueryError: 查询没有注册
+        """
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise UnknownQueryError(name) from None
+    
+    def __contains__(self, name):
+        return name in self._queries
+    
+    def catalog(self):
+        """
+        所有命名查询的统计（按调用次数从多到少排序，方便找出热点查询）
+        
+        Returns:
+            dict: 查询名 -> SQL、类型、调用次数、失败次数、返回/影响行数、耗时分布
+        """
+        items = sorted(self._queries.values(), key=lambda query: query.calls, reverse=True)
+        return {query.name: query.snapshot() for query in items}
+
+class _PoolState:
+    """某个进程内的一个连接池（主库或某个从库）及其统计（fork 之后子进程会重新创建一份）"""
+    
+    def __init__(self, name, pool, slots, metrics):
+        self.name = name  # primary / replica-host:port
+        self.pool = pool
+        self.slots = slots  # 限制同时借出的连接数，实现借出超时
+        self.metrics = metrics
+        self.pid = os.getpid()
+        
+        # 健康状态（只对从库有意义）
+        self.healthy = True
+        self.retry_at = 0.0     # 不健康时，到这个时间（monotonic）后再尝试
+        self.next_check = 0.0   # 下一次主动检查（连通性 / 复制延迟）的时间
+        self.legacy_status = False  # 不支持 SHOW REPLICA STATUS（MySQL 8.0.22 / MariaDB 10.5.1 之前）
+        self.marked_down = 0    # 被标记为不可用的次数
+        self.last_error = None
+        self.check_lock = threading.Lock()  # 同一时间只有一个线程做健康检查
+    
+    def mark_down(self, reason, retry_after):
+        """标记为不可用，retry_after 秒内读请求不会路由到这里"""
+        if self.healthy:
+            self.marked_down += 1
+            logger.warning("从库 %s 不可用，%.0f 秒后重试: %s", self.name, retry_after, reason)
+        self.healthy = False
+        self.last_error = str(reason)
+        self.retry_at = time.monotonic() + retry_after
+    
+    def mark_up(self):
+        if not self.healthy:
+            logger.warning("从库 %s 已恢复", self.name)
+        self.healthy = True
+        self.last_error = None
+
+class _ClusterState:
+    """某个进程内的主库连接池和从库连接池"""
+    
+    def __init__(self, primary, replicas):
+        self.primary = primary
+        self.replicas = replicas
+        self.round_robin = itertools.count()
+        self.pid = os.getpid()
+
+def _default_client_key():
+    """
+    读写一致性固定主库时使用的客户端标识：已登录用户按 user_id，否则按 IP
+    
+    不在请求中（脚本、后台任务）返回 None，不做固定。
+    """
+    if not has_request_context():
+        return None
+    user = g.get('current_user')
+    if user and user.get('user_id') is not None:
+        return f"user:{user['user_id']}"
+    return f"ip:{request.remote_addr}"
 
 class Database:
-    """数据库连接池管理类"""
+    """
+    数据库连接池管理类
     
-    _pool = None  # 类级别的连接池（单例模式）
+    构造时不会连接数据库，连接池在当前进程第一次使用时才创建。
+    检测到进程号变化（gunicorn fork 出 worker）时，子进程丢弃继承来的连接池并重新创建，
+    不同进程之间不会共用 socket。
+    
+    配置了从库（replicas）时读写分离：
+    - query / stream / 读类型的 run 走从库（轮询或最少借出连接），从库不可用时退回主库
+    - execute / execute_many / execute_batches / transaction / 写类型的 run 走主库
+    - 客户端写入后 pin_seconds 秒内的读请求也走主库（读己之写），客户端标识由 client_key_func 决定
+    """
     
     def __init__(self, host, user, password, database, port=3306, 
-                 max_connections=10, min_connections=2):
+                 max_connections=10, min_connections=2, max_cached=5,
+                 max_usage=0, ping=1, checkout_timeout=5, replicas=(),
+                 read_routing='round_robin', health_check_interval=5, max_replica_lag=0,
+                 pin_seconds=5, pin_store=None, client_key_func=None, guard=None):
         """
-        初始化数据库连接池
+        保存连接池配置（不会立即连接数据库）
         
         Args:
             host: 数据库地址
@@ -18,34 +365,132 @@ class Database:
             password: 密码
             database: 数据库名
             port: 端口
-            max_connections: 最大连接数（默认10）
+            max_connections: 最大连接数（默认10，0 表示不限制）
             min_connections: 最小连接数（默认2）
+            max_cached: 最多保留的空闲连接（默认5）
+            max_usage: 单个连接最多复用次数，超过后重建（默认0，不限制）
+            ping: 何时检查连接是否可用（0=不检查，1=借出时，2=创建游标时，4=执行时，7=总是）
+            checkout_timeout: 连接池满时最多等待的秒数（默认5，<= 0 表示一直等待）
+            replicas: 从库地址列表（"host" 或 "host:port"，用户名/密码/库名与主库相同）
+            read_routing: 从库选择策略（round_robin=轮询，least_outstanding=借出连接最少）
+            health_check_interval: 从库不可用后多久重试、多久主动检查一次从库（秒）
+            max_replica_lag: 复制延迟超过该秒数的从库不参与读（默认0，只检查连通性）
+            pin_seconds: 写入后该客户端的读请求固定走主库的秒数（<= 0 表示不固定）
+            pin_store: 记录固定主库的客户端的缓存（默认进程内缓存，多 worker 共享需传入 Redis 缓存）
+            client_key_func: 返回当前客户端标识的无参函数（默认按登录用户或 IP）
+            guard: 过载保护（utils.overload.LoadGuard），包住每次借出连接到归还连接，None 表示不保护
         """
+        if read_routing not in READ_ROUTINGS:
+            raise ValueError(f"不支持的读路由策略: {read_routing}")
         self.host = host
         self.user = user
         self.password = password
         self.database = database
         self.port = port
+        self.max_connections = max_connections
+        self.min_connections = min_connections
+        self.max_cached = max_cached
+        self.max_usage = max_usage
+        self.ping = ping
+        self.checkout_timeout = checkout_timeout if checkout_timeout > 0 else None
+        self.replicas = [self._parse_address(address) for address in replicas]
+        self.read_routing = read_routing
+        self.health_check_interval = health_check_interval
+        self.max_replica_lag = max_replica_lag
+        self.pin_seconds = pin_seconds
+        self.pin_store = pin_store if pin_store is not None else MemoryCache('db_pin', ttl=pin_seconds)
+        self.client_key_func = client_key_func or _default_client_key
+        self.guard = guard
+        
+        self._state = None
+        self._state_lock = threading.Lock()
+        self._pid = os.getpid()
         
-        # ✅ 创建连接池（只创建一次）
-        if Database._pool is None:
-            Database._pool = PooledDB(
-                creator=pymysql,          # 使用 pymysql
-                maxconnections=max_connections,  # 最大连接数
-                mincached=min_connections,       # 初始化时至少创建的空闲连接
-                maxcached=5,              # 最多保留的空闲连接
-                blocking=True,            # 连接池满时是否阻塞等待
-                ping=1,                   # 连接前检查连接是否可用（0=不检查，1=默认检查，2=事务开始前检查）
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                port=port,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=True           # 自动提交
-            )
-            print(f"✅ 数据库连接池已创建 (最小: {min_connections}, 最大: {max_connections})")
+        self.queries = QueryRegistry()  # 命名查询，通过 db.run(name, ...) 执行
+    
+    def init_app(self, app):
+        """
+        注册到 Flask 应用（不会连接数据库）
+        
+        用法:
+            db.init_app(app)
+        """
+        app.extensions['database'] = self
+    
+    def _parse_address(self, address):
+        """解析从库地址 host 或 host:port（端口默认与主库相同）"""
+        host, _, port = address.strip().rpartition(':')
+        if not host or not port.isdigit():
+            return address.strip(), self.port
+        return host, int(port)
+    
+    def _get_state(self):
+        """获取当前进程的连接池（主库 + 从库），不存在时创建"""
+        if self._pid != os.getpid():
+            self.reset_after_fork()
+        
+        state = self._state
+        if state is not None:
+            return state
+        
+        with self._state_lock:
+            if self._state is None:
+                self._state = self._create_state()
+            return self._state
+    
+    def _create_state(self):
+        """✅ 创建主库和从库连接池（每个进程只创建一次）"""
+        primary = self._create_pool('primary', self.host, self.port)
+        replicas = []
+        for host, port in self.replicas:
+            name = f"replica-{host}:{port}"
+            try:
+                replica = self._create_pool(name, host, port)
+            except Exception as e:
+                # 从库连不上不影响启动：先不预建连接，标记为不可用，稍后重试
+                replica = self._create_pool(name, host, port, min_connections=0)
+                replica.mark_down(e, self.health_check_interval)
+            replicas.append(replica)
+        return _ClusterState(primary, replicas)
+    
+    def _create_pool(self, name, host, port, min_connections=None):
+        """创建一个连接池"""
+        metrics = PoolMetrics()
+        if min_connections is None:
+            min_connections = self.min_connections
+        pool = PooledDB(
+            creator=_make_creator(metrics),  # 使用 pymysql（带统计）
+            maxconnections=self.max_connections,  # 最大连接数
+            mincached=min_connections,            # 初始化时至少创建的空闲连接
+            maxcached=self.max_cached,     # 最多保留的空闲连接
+            maxusage=self.max_usage or None,  # 单个连接最多复用次数
+            blocking=True,            # 连接池满时是否阻塞等待（超时由 slots 控制）
+            ping=self.ping,           # 连接可用性检查模式
+            host=host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            port=port,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True           # 自动提交
+        )
+        slots = threading.BoundedSemaphore(self.max_connections) if self.max_connections > 0 else None
+        print(f"✅ 数据库连接池已创建 ({name} {host}:{port}, 进程: {os.getpid()}, 最小: {min_connections}, 最大: {self.max_connections})")
+        return _PoolState(name, pool, slots, metrics)
+    
+    def reset_after_fork(self):
+        """
+        fork 之后在子进程中调用：丢弃从父进程继承的连接池
+        
+        继承来的连接不会向父进程仍在使用的 socket 发送 QUIT（见 _InstrumentedConnection.close），
+        直接丢弃，不需要保留引用；下次使用时在子进程中重新创建。
+        """
+        if self._pid == os.getpid():
+            return
+        self._state = None
+        self._state_lock = threading.Lock()  # 父进程的锁可能在 fork 时处于占用状态
+        self._pid = os.getpid()
     
     def connect(self):
         """
@@ -54,10 +499,14 @@ class Database:
         Returns:
             connection: 数据库连接对象
         """
-        return Database._pool.connection()
+        return self._get_state().primary.pool.connection()
+    
+    def _guarded(self, sample=True):
+        """过载保护上下文（没有配置 guard 时不做任何事）"""
+        return self.guard.call(sample) if self.guard is not None else nullcontext()
     
     @contextmanager
-    def get_connection(self):
+    def get_connection(self, readonly=False, sample=True):
         """
         上下文管理器：自动获取和释放连接
         
@@ -65,31 +514,331 @@ class Database:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(sql)
+        
+        Args:
+            readonly: 只读连接（可能来自从库），默认主库
+            sample: 占用时间是否参与过载保护的并发上限调整
+        
+        Raises:
+            PoolTimeoutError: 等待超过 checkout_timeout 仍没有空闲连接
+            DeadlineExceeded: 请求已超过截止时间
+            OverloadedError: 数据库过载（熔断器打开或并发名额用完）
+        """
+        with self._guarded(sample):
+            if readonly:
+                conn, checkout_at, state = self._checkout_read()
+            else:
+                conn, checkout_at, state = self._checkout(self._get_state().primary)
+            try:
+                yield conn
+            finally:
+                self._checkin(conn, checkout_at, state)
+    
+    def _checkout_read(self):
+        """
+        借出读连接：按路由策略选择从库，从库连接失败时标记为不可用并退回主库
+        """
+        cluster = self._get_state()
+        state = self._route_read(cluster)
+        if state is not cluster.primary:
+            try:
+                result = self._checkout(state)
+            except (PoolTimeoutError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                state.mark_down(e, self.health_check_interval)
+            else:
+                state.mark_up()
+                return result
+        return self._checkout(cluster.primary)
+    
+    def _route_read(self, cluster):
+        """选择处理读请求的连接池"""
+        if not cluster.replicas or self._is_pinned():
+            return cluster.primary
+        
+        # 每 health_check_interval 秒主动检查一次健康的从库，不等读请求失败才发现不可用
+        now = time.monotonic()
+        for replica in cluster.replicas:
+            if replica.healthy and replica.next_check <= now:
+                self._check_replica(replica)
+        
+        # 不可用的从库到了重试时间也参与选择，借出成功即恢复
+        candidates = [replica for replica in cluster.replicas if replica.healthy or replica.retry_at <= now]
+        if not candidates:
+            return cluster.primary
+        if self.read_routing == 'least_outstanding':
+            return min(candidates, key=lambda replica: replica.metrics.in_use)
+        return candidates[next(cluster.round_robin) % len(candidates)]
+    
+    def _check_replica(self, replica):
+        """
+        主动检查从库：连不上的从库暂时不参与读；
+        配置了 max_replica_lag 时同时检查复制延迟，复制停止或延迟超过上限的从库暂时不参与读
+        """
+        if not replica.check_lock.acquire(blocking=False):
+            return  # 其它线程正在检查
+        try:
+            replica.next_check = time.monotonic() + self.health_check_interval
+            if self.max_replica_lag <= 0:
+                self._ping_replica(replica)
+                return
+            lag = self._read_replica_lag(replica)
+            if lag is None:
+                replica.mark_down("复制已停止", self.health_check_interval)
+            elif lag > self.max_replica_lag:
+                replica.mark_down(f"复制延迟 {lag} 秒", self.health_check_interval)
+        except Exception as e:
+            replica.mark_down(e, self.health_check_interval)
+        finally:
+            replica.check_lock.release()
+    
+    def _ping_replica(self, replica):
+        """借出一个从库连接执行 SELECT 1（借出时的 ping 会重建断开的连接），失败时抛出异常"""
+        conn, checkout_at, _ = self._checkout(replica)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        finally:
+            self._checkin(conn, checkout_at, replica)
+    
+    def _read_replica_lag(self, replica):
+        """
+        查询一个从库的复制延迟
+        
+        Returns:
+            int: 延迟秒数，复制已停止返回 None
         """
-        conn = Database._pool.connection()
+        conn, checkout_at, _ = self._checkout(replica)
         try:
-            yield conn
+            cursor = conn.cursor()
+            try:
+                status = self._replica_status(cursor, replica)
+            finally:
+                cursor.close()
         finally:
-            conn.close()  # 归还连接到池（不是真正关闭）
+            self._checkin(conn, checkout_at, replica)
+        # 没有复制状态说明不是从库（如本地测试用的独立实例），视为没有延迟
+        if not status:
+            return 0
+        # SHOW REPLICA STATUS 的列名是 Seconds_Behind_Source（MariaDB 和旧语句仍是 Seconds_Behind_Master）
+        if 'Seconds_Behind_Source' in status:
+            return status['Seconds_Behind_Source']
+        return status.get('Seconds_Behind_Master')
+    
+    def _replica_status(self, cursor, replica):
+        """
+        读取复制状态：优先 SHOW REPLICA STATUS，不支持时（语法错误）改用 SHOW SLAVE STATUS 并记住
+
+        Returns:
+            dict: 复制状态，不是从库时返回 None
+        """
+        if not replica.legacy_status:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                return cursor.fetchone()
+            except pymysql.err.ProgrammingError as e:
+                if e.args[0] != ER.PARSE_ERROR:
+                    raise
+                replica.legacy_status = True
+        cursor.execute("SHOW SLAVE STATUS")
+        return cursor.fetchone()
     
-    def query(self, sql, params=None):
+    def get_replica_lag(self):
+        """
+        查询所有从库中最大的复制延迟（归档等批量写入任务用来限速，不让从库越落越远）
+        
+        Returns:
+            int: 最大延迟秒数（没有从库返回 0），复制已停止或从库连不上返回 None
+        """
+        lags = []
+        for replica in self._get_state().replicas:
+            try:
+                lag = self._read_replica_lag(replica)
+            except Exception:
+                return None
+            if lag is None:
+                return None
+            lags.append(lag)
+        return max(lags, default=0)
+    
+    def _is_pinned(self):
+        """当前客户端最近写入过，读请求需要走主库"""
+        if self.pin_seconds <= 0:
+            return False
+        key = self.client_key_func()
+        return key is not None and self.pin_store.get(key) is not None
+    
+    def _pin_client(self):
+        """写入后把当前客户端固定到主库 pin_seconds 秒"""
+        if self.pin_seconds <= 0 or not self.replicas:
+            return
+        key = self.client_key_func()
+        if key is not None:
+            self.pin_store.set(key, True, ttl=self.pin_seconds)
+    
+    def _checkout(self, state):
+        """
+        从指定连接池借出连接（连接池满时最多等待 checkout_timeout 秒，不超过请求剩余时间）
+        
+        Returns:
+            tuple: (连接, 借出时间, 所属连接池)
+        """
+        start = time.perf_counter()
+        timeout = self.checkout_timeout
+        by_deadline = False
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("请求已超过截止时间")
+            if timeout is None or remaining < timeout:
+                timeout, by_deadline = remaining, True
+        if state.slots is not None and not state.slots.acquire(timeout=timeout):
+            state.metrics.incr("checkout_timeouts")
+            if by_deadline:
+                raise DeadlineExceeded("等待数据库连接超过请求截止时间")
+            raise PoolTimeoutError(f"等待数据库连接超时（{self.checkout_timeout}秒）")
+        try:
+            conn = state.pool.connection()
+        except Exception:
+            if state.slots is not None:
+                state.slots.release()
+            state.metrics.incr("checkout_errors")
+            raise
+        checkout_at = time.perf_counter()
+        state.metrics.checked_out(checkout_at - start)
+        return conn, checkout_at, state
+    
+    def _checkin(self, conn, checkout_at, state):
+        """归还连接到池（不是真正关闭）"""
+        try:
+            conn.close()
+        finally:
+            if state.slots is not None:
+                state.slots.release()
+            state.metrics.checked_in(time.perf_counter() - checkout_at)
+    
+    @contextmanager
+    def _timed(self, sql):
+        """统计一次 SQL 的耗时（包含等待连接的时间），交给 instrumentation 记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record_query(sql, time.perf_counter() - start)
+    
+    def query(self, sql, params=None, primary=False):
         """
         查询数据（SELECT）
         
         Args:
             sql: SQL 语句
             params: 参数（tuple 或 list）
+            primary: 强制从主库读取（需要读到刚写入的数据时使用）
         
         Returns:
             list: 查询结果（字典列表）
         """
-        with self.get_connection() as conn:
+        with self._timed(sql), self.get_connection(readonly=not primary) as conn:
             cursor = conn.cursor()
             cursor.execute(sql, params)
             result = cursor.fetchall()
             cursor.close()
             return result
     
+    def run(self, name, *params, primary=False):
+        """
+        执行注册过的命名查询
+        
+        用法:
+            user = db.run('user_by_id', user_id)
+        
+        Args:
+            name: 查询名（见 utils/queries.py）
+            *params: 按 %s 顺序传入的参数
+            primary: 读查询强制走主库（写查询总是走主库）
+        
+        Returns:
+            read 查询: fetch='all' 返回字典列表，fetch='one' 返回第一行或 None
+            write 查询: {'affected_rows': int, 'last_id': int}
+        
+        Raises:
+            UnknownQueryError: 查询没有注册
+            TypeError: 参数个数与模板不一致
+        """
+        query = self.queries.get(name)
+        start = time.perf_counter()
+        rows = 0
+        failed = True
+        try:
+            readonly = query.kind == 'read' and not primary
+            with self.get_connection(readonly=readonly) as conn:
+                cursor = conn.cursor()
+                try:
+                    # 不传 args，pymysql 不会再对 SQL 做一次 % 格式化
+                    cursor.execute(query.render(cursor.connection.literal, params))
+                    if query.kind == 'read':
+                        result = cursor.fetchall()
+                        rows = len(result)
+                        if query.fetch == 'one':
+                            result = result[0] if result else None
+                    else:
+                        conn.commit()
+                        self._pin_client()
+                        rows = cursor.rowcount
+                        result = {
+                            "affected_rows": rows,
+                            "last_id": cursor.lastrowid
+                        }
+                except Exception:
+                    if query.kind == 'write':
+                        conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            query.observe(elapsed, rows, failed)
+            record_query(query.sql, elapsed)
+    
+    def stream(self, sql, params=None, chunk_size=1000, primary=False):
+        """
+        流式查询（SELECT），使用非缓冲的服务端游标分批读取
+        
+        与 query 不同，结果不会一次性全部读入内存，适合导出大表。
+        生成器被完整消费或关闭前会一直占用一个连接。
+        
+        Args:
+            sql: SQL 语句
+            params: 参数（tuple 或 list）
+            chunk_size: 每次从服务端读取的行数
+            primary: 强制从主库读取
+        
+        Yields:
+            list: 每批查询结果（字典列表）
+        """
+        db_time = 0.0  # 只统计读取数据的时间，不包含调用方处理每批数据的时间
+        # 导出时间很长，不参与并发上限调整（截止时间只限制第一次查询）
+        with self.get_connection(readonly=not primary, sample=False) as conn:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            try:
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    db_time += time.perf_counter() - start
+                    if not rows:
+                        break
+                    yield rows
+                    start = time.perf_counter()
+            finally:
+                cursor.close()  # 读掉剩余结果，连接才能归还到池中
+                record_query(sql, db_time)
+    
     def execute(self, sql, params=None):
         """
         执行 SQL（INSERT, UPDATE, DELETE）
@@ -104,11 +853,12 @@ class Database:
                 'last_id': int         # 最后插入的ID
             }
         """
-        with self.get_connection() as conn:
+        with self._timed(sql), self.get_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute(sql, params)
                 conn.commit()
+                self._pin_client()
                 affected_rows = cursor.rowcount
                 last_id = cursor.lastrowid
                 cursor.close()
@@ -135,11 +885,12 @@ class Database:
                 'success': bool
             }
         """
-        with self.get_connection() as conn:
+        with self._timed(sql), self.get_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.executemany(sql, params_list)
                 conn.commit()
+                self._pin_client()
                 affected_rows = cursor.rowcount
                 cursor.close()
                 return {
@@ -151,6 +902,54 @@ class Database:
                 cursor.close()
                 raise e
     
+    def execute_batches(self, statements, batch_size=500):
+        """
+        在同一个事务中分批执行多组批量 SQL（任意一批失败整体回滚）
+        
+        每组 SQL 用 executemany 执行，参数按 batch_size 切分，
+        INSERT ... VALUES 会被 pymysql 改写成多行 INSERT，一批只需一次往返。
+        
+        多行 INSERT 的 lastrowid 是这一批第一行的自增 id，InnoDB 默认的自增锁模式下
+        同一条语句分配的 id 是连续的（auto_increment_increment = 1），
+        所以每一行的 id 为 lastrowid 起连续的 rowcount 个值。
+        
+        Args:
+            statements: [(sql, params_list), ...]
+            batch_size: 每批参数条数
+        
+        Returns:
+            dict: {
+                'affected_rows': int,  # 受影响的总行数
+                'batches': int,        # 实际执行的批次数
+                'insert_ids': list     # 每组 SQL 插入的行 id（与 params_list 一一对应；
+                                       # 非 INSERT 或有行被忽略时为空列表）
+            }
+        """
+        affected_rows = 0
+        batches = 0
+        insert_ids = []
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            try:
+                for sql, params_list in statements:
+                    statement_ids = []
+                    for start in range(0, len(params_list), batch_size):
+                        batch = params_list[start:start + batch_size]
+                        with self._timed(sql):
+                            cursor.executemany(sql, batch)
+                        affected_rows += cursor.rowcount
+                        batches += 1
+                        if cursor.lastrowid and cursor.rowcount == len(batch):
+                            statement_ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(batch)))
+                    insert_ids.append(statement_ids if len(statement_ids) == len(params_list) else [])
+            finally:
+                cursor.close()
+        return {
+            "affected_rows": affected_rows,
+            "batches": batches,
+            "insert_ids": insert_ids
+        }
+    
     def transaction(self):
         """
         获取事务上下文管理器
@@ -166,42 +965,77 @@ class Database:
     
     @contextmanager
     def _transaction_context(self):
-        """事务上下文管理器实现"""
-        conn = Database._pool.connection()
-        conn.autocommit(False)  # 关闭自动提交
-        try:
-            yield conn
-            conn.commit()  # 提交事务
-        except Exception as e:
-            conn.rollback()  # 回滚事务
-            raise e
-        finally:
-            conn.autocommit(True)  # 恢复自动提交
-            conn.close()
+        """事务上下文管理器实现（总是在主库执行）"""
+        with self._guarded():
+            conn, checkout_at, state = self._checkout(self._get_state().primary)
+            # 显式 BEGIN（DBUtils 的连接不支持 autocommit()，且事务中不会被透明重连），
+            # COMMIT / ROLLBACK 后连接自动回到 autocommit 模式
+            try:
+                conn.begin()
+                yield conn
+                conn.commit()  # 提交事务
+                self._pin_client()
+            except Exception as e:
+                conn.rollback()  # 回滚事务
+                raise e
+            finally:
+                self._checkin(conn, checkout_at, state)
     
     def close(self):
         """
-        关闭连接池（通常不需要调用）
+        关闭当前进程的连接池（通常不需要调用）
         """
-        if Database._pool:
-            Database._pool.close()
-            Database._pool = None
+        if self._state is not None and self._pid == os.getpid():
+            for state in [self._state.primary] + self._state.replicas:
+                state.pool.close()
+            self._state = None
             print("❌ 数据库连接池已关闭")
     
-    @staticmethod
-    def get_pool_status():
+    def get_pool_status(self):
         """
-        获取连接池状态（调试用）
+        获取当前进程的连接池状态
         
         Returns:
-            dict: 连接池统计信息
+            dict: 主库连接池统计信息（借出/空闲连接数、等待时间和占用时间分布、
+                  连接创建/关闭次数、ping 失败次数等），
+                  配置了从库时 replicas 中是每个从库的统计和健康状态
         """
-        if Database._pool:
-            return {
+        cluster = self._state
+        if cluster is not None and cluster.pid == os.getpid():
+            status = {
                 "pool_exists": True,
-                "message": "连接池运行中"
+                "message": "连接池运行中",
+                "pid": cluster.pid
             }
+            status.update(self._pool_snapshot(cluster.primary))
+            if cluster.replicas:
+                status["read_routing"] = self.read_routing
+                status["replicas"] = [self._pool_snapshot(replica) for replica in cluster.replicas]
+            return status
         return {
             "pool_exists": False,
             "message": "连接池未初始化"
-        }
\ No newline at end of file
+        }
+    
+    def _pool_snapshot(self, state):
+        """单个连接池的统计"""
+        snapshot = {
+            "name": state.name,
+            "max_connections": self.max_connections,
+            "max_cached": self.max_cached
+        }
+        if state.name != 'primary':
+            snapshot["healthy"] = state.healthy
+            snapshot["marked_down"] = state.marked_down
+            snapshot["last_error"] = state.last_error
+        snapshot.update(state.metrics.snapshot())
+        return snapshot
+    
+    def get_query_stats(self):
+        """
+        获取命名查询的统计（调用次数、失败次数、行数、耗时分布）
+        
+        Returns:
+            dict: 查询名 -> 统计信息（按调用次数从多到少）
+        """
+        return self.queries.catalog()
@@ -2,6 +2,7 @@ from functools import wraps
 from flask import request,g
 from utils.response import error
 from utils.jwt_utils import verify_token
+from utils.instrumentation import phase
 
 def token_required(f):
     """JWT认证装饰器"""
@@ -18,7 +19,8 @@ def token_required(f):
             token = token[7:]
         
         # 验证token
-        payload = verify_token(token,token_type='access')
+        with phase('jwt'):
+            payload = verify_token(token,token_type='access')
         
         if not payload:
             return error(message="token无效或已过期，请重新登录", code=401)
@@ -1,5 +1,8 @@
 from flask import jsonify
 from marshmallow import ValidationError
+from utils.database import PoolTimeoutError
+from utils.overload import OverloadedError, DeadlineExceeded
+from utils.rate_limit import retry_after_header
 
 def register_error_handlers(app):
     """注册全局错误处理"""
@@ -36,6 +39,32 @@ def register_error_handlers(app):
             'message': error.messages
         }), 400
     
+    @app.errorhandler(PoolTimeoutError)
+    def pool_timeout(error):
+        """数据库连接池繁忙，快速失败"""
+        return jsonify({
+            'status': 'error',
+            'message': '服务繁忙，请稍后重试'
+        }), 503
+    
+    @app.errorhandler(OverloadedError)
+    def overloaded(error):
+        """数据库过载或熔断，快速失败并告诉客户端多久后重试"""
+        response = jsonify({
+            'status': 'error',
+            'message': str(error)
+        })
+        response.headers['Retry-After'] = retry_after_header(error.retry_after)
+        return response, 503
+    
+    @app.errorhandler(DeadlineExceeded)
+    def deadline_exceeded(error):
+        """请求超过截止时间"""
+        return jsonify({
+            'status': 'error',
+            'message': '请求超时，请稍后重试'
+        }), 504
+    
     @app.errorhandler(Exception)
     def handle_exception(error):
         """捕获所有未处理的异常"""
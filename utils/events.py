@@ -0,0 +1,276 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from config import REDIS_URL
+
+try:
+    import redis  # 可选依赖，只有跨 worker 转发事件时才需要
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class SubscriberLimitError(Exception):
+    """订阅数达到上限"""
+
+class Subscription:
+    """
+    一个订阅者（一条 SSE 连接）
+
+    事件放在有界队列中，消费太慢导致队列满时订阅被关闭（overflowed），
+    客户端重连时带上 Last-Event-ID，从 EventHub 的历史记录中补齐，不会无限占用内存。
+    """
+
+    def __init__(self, max_queue):
+        self.max_queue = max_queue
+        self.closed = False
+        self.overflowed = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        """
+        Returns:
+            bool: False 表示队列已满，订阅被关闭
+        """
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                self.closed = self.overflowed = True
+                self._cond.notify_all()
+                return False
+            self._queue.append(event)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout):
+        """
+        等待下一个事件
+
+        Returns:
+            dict: 事件，timeout 秒内没有事件或订阅已关闭返回 None
+        """
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class EventHub:
+    """
+    进程内事件分发（每个 worker 一个）
+
+    publish 给事件分配递增的 id，保存在最近 history 条的环形缓冲区中，并推送给所有订阅者。
+    订阅时传入 last_event_id 可以补发之后的事件；last_event_id 已经不在缓冲区中时
+    补发一个 reset 事件，客户端需要重新拉取完整列表。
+
+    配置 bridge（如 RedisEventBridge）后事件经由 pub/sub 转发，所有 worker 收到同样的事件和 id。
+    不配置时每个 worker 的 id 独立，只能看到本 worker 处理的写请求，适合单 worker 或开发环境；
+    多个 worker 时应设置 resumable=False：带 last_event_id 重连总是收到 reset，不会按其它 worker 的 id 补发错误的事件。
+    """
+
+    def __init__(self, history=1000, max_queue=100, max_subscribers=100, bridge=None, resumable=True):
+        """
+        Args:
+            history: 保存最近多少条事件用于断线续传
+            max_queue: 每个订阅者最多积压的事件数
+            max_subscribers: 最多同时订阅的连接数（每条 SSE 连接占用一个 worker 线程）
+            bridge: 跨 worker 转发（None 表示只在本进程内分发）
+            resumable: 是否支持按 last_event_id 补发（事件 id 在所有 worker 中一致时才能开启）
+        """
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.bridge = bridge
+        self.resumable = resumable
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._stats = {"published": 0, "delivered": 0, "overflowed": 0, "resets": 0}
+
+    def publish(self, event_type, data):
+        """
+        发布事件（不会阻塞：订阅者队列满时直接关闭该订阅）
+
+        Args:
+            event_type: 事件类型（SSE 的 event 字段）
+            data: 可以 JSON 序列化的数据
+        """
+        if self.bridge is not None:
+            try:
+                self.bridge.start(self)
+                self.bridge.publish(event_type, data)
+                return
+            except Exception as e:
+                logger.error("事件转发失败，只在本进程内分发: %s", e)
+        self.deliver({'id': next(self._ids), 'type': event_type, 'data': data})
+
+    def deliver(self, event):
+        """把已分配 id 的事件写入历史记录并推送给本进程的订阅者（bridge 收到事件时调用）"""
+        with self._lock:
+            # 多个 worker 并发发布时 id 可能乱序到达，补发按 id 过滤，不依赖顺序
+            self._last_id = max(self._last_id, event['id'])
+            self._history.append(event)
+            self._stats["published"] += 1
+            subscribers = list(self._subscribers)
+        dropped = [subscription for subscription in subscribers if not subscription.put(event)]
+        with self._lock:
+            self._stats["delivered"] += len(subscribers) - len(dropped)
+            self._stats["overflowed"] += len(dropped)
+            self._subscribers.difference_update(dropped)
+
+    def subscribe(self, last_event_id=None):
+        """
+        订阅
+
+        Args:
+            last_event_id: 客户端收到的最后一个事件 id（断线重连时传入）
+
+        Returns:
+            Subscription: 已经放入需要补发的事件
+
+        Raises:
+            SubscriberLimitError: 订阅数达到 max_subscribers
+        """
+        if self.bridge is not None:
+            self.bridge.start(self)
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitError(f"订阅数已达上限 {self.max_subscribers}")
+            if last_event_id is not None:
+                last = self._last_id
+                oldest = min(event['id'] for event in self._history) if self._history else last + 1
+                backlog = [event for event in self._history if event['id'] > last_event_id]
+                # 不支持续传、断线期间的事件已经不在缓冲区中、补发超过队列长度，
+                # 或 id 比现有的还新（服务重启过），让客户端重新拉取
+                if (not self.resumable or last_event_id < oldest - 1 or last_event_id > last
+                        or len(backlog) > self.max_queue):
+                    self._stats["resets"] += 1
+                    backlog = [{'id': last, 'type': 'reset', 'data': None}]
+                for event in backlog:
+                    subscription.put(event)
+            # 在同一把锁内注册，补发和实时推送之间不会漏掉事件
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["subscribers"] = len(self._subscribers)
+            stats["history"] = len(self._history)
+            stats["last_id"] = self._last_id
+        stats["bridge"] = type(self.bridge).__name__ if self.bridge is not None else None
+        return stats
+
+class RedisEventBridge:
+    """
+    通过 Redis pub/sub 在 worker 之间转发事件
+
+    发布时用 INCR 分配全局递增的 id 再 PUBLISH，每个 worker 的后台线程订阅频道后
+    交给本进程的 EventHub.deliver（包括发布者自己），所有 worker 的事件 id 一致，
+    客户端重连到任意 worker 都可以断线续传。
+    client 可以是 redis.Redis 或任何实现了 incr/publish/pubsub 的对象。
+    """
+
+    def __init__(self, client=None, url=REDIS_URL, channel='events:user', subscribe_timeout=5.0):
+        """
+        Args:
+            subscribe_timeout: start 等待订阅确认的最长秒数（确认之前发布的事件本进程收不到）
+        """
+        if client is None:
+            if redis is None:
+                raise RuntimeError("跨 worker 转发事件需要先安装 redis 包")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self.subscribe_timeout = subscribe_timeout
+        self._thread = None
+        self._pid = None
+        self._subscribed = threading.Event()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        event_id = self.client.incr(f"{self.channel}:seq")
+        self.client.publish(self.channel, json.dumps({'id': event_id, 'type': event_type, 'data': data},
+                                                     ensure_ascii=False, default=str))
+
+    def start(self, hub):
+        """
+        启动当前进程的订阅线程（只启动一次，fork 后在子进程中重新启动）
+
+        等到 Redis 确认订阅后才返回，之后发布的事件（包括紧接着的第一次 publish）本进程都能收到。
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._subscribed = threading.Event()
+            self._thread = threading.Thread(target=self._listen, args=(hub, self._subscribed),
+                                            name='event-bridge', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            if not self._subscribed.wait(self.subscribe_timeout):
+                logger.warning("%.0f 秒内没有收到 Redis 订阅确认，确认之前的事件本进程收不到", self.subscribe_timeout)
+
+    def _listen(self, hub, subscribed):
+        """订阅频道并把收到的事件交给 hub（连接断开后每秒重连一次）"""
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.subscribe(self.channel)
+                # SUBSCRIBE 的确认回复：收到之后服务端才会把 PUBLISH 转发给这个连接
+                confirmation = pubsub.get_message(timeout=self.subscribe_timeout)
+                if confirmation is None or confirmation.get('type') != 'subscribe':
+                    raise ConnectionError(f"没有收到订阅确认: {confirmation}")
+                subscribed.set()
+                for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    try:
+                        hub.deliver(json.loads(message['data']))
+                    except Exception as e:
+                        logger.error("处理转发的事件失败: %s", e)
+            except Exception as e:
+                logger.error("事件订阅连接断开，1 秒后重连: %s", e)
+                time.sleep(1)
+
+def format_sse(event):
+    """
+    事件 -> SSE 文本
+
+    Returns:
+        str: id / event / data 三行 + 空行
+    """
+    data = json.dumps(event['data'], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+def create_event_hub(backend='memory', **kwargs):
+    """
+    按配置创建事件分发
+
+    Args:
+        backend: memory（每个 worker 独立）/ redis（跨 worker 转发）
+        **kwargs: 传给 EventHub 的参数
+    """
+    if backend == 'redis':
+        return EventHub(bridge=RedisEventBridge(), **kwargs)
+    if backend == 'memory':
+        return EventHub(**kwargs)
+    raise ValueError(f"不支持的事件分发类型: {backend}")
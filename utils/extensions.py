@@ -0,0 +1,58 @@
+from config import (DB_CONFIG, LIST_CACHE_TTL, OVERLOAD_PROTECTION, DB_LIMIT_INITIAL, DB_LIMIT_MIN,
+                    DB_LIMIT_MAX, DB_LIMIT_TARGET_LATENCY, DB_LIMIT_MAX_WAIT, DB_BREAKER_FAILURES,
+                    DB_BREAKER_RESET_SECONDS, AUDIT_ENABLED, AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE,
+                    AUDIT_FLUSH_INTERVAL, AUDIT_OVERFLOW, AUDIT_BLOCK_TIMEOUT, AUDIT_FILE_PATH,
+                    EVENTS_BACKEND, EVENTS_HISTORY, EVENTS_SUBSCRIBER_QUEUE, EVENTS_MAX_SUBSCRIBERS,
+                    WORKER_PROCESSES)
+from utils.archive import ArchiveScheduler
+from utils.audit import AuditLog
+from utils.events import create_event_hub
+from utils.cache import create_cache
+from utils.database import Database, DB_FAILURE_TYPES
+from utils.overload import LoadGuard, AdaptiveLimiter, CircuitBreaker
+from utils.queries import register_queries
+
+# 数据库过载保护（每个进程独立：并发上限按本进程观察到的耗时调整）
+db_guard = LoadGuard(
+    limiter=AdaptiveLimiter(DB_LIMIT_INITIAL, DB_LIMIT_MIN, DB_LIMIT_MAX, DB_LIMIT_TARGET_LATENCY),
+    breaker=CircuitBreaker(DB_BREAKER_FAILURES, DB_BREAKER_RESET_SECONDS),
+    max_wait=DB_LIMIT_MAX_WAIT,
+    failure_types=DB_FAILURE_TYPES,
+    enabled=OVERLOAD_PROTECTION
+)
+
+# 全局共享的数据库实例（导入时不连接数据库，连接池在每个进程第一次使用时创建）
+# 写入后固定主库的客户端记录在 db_pin 缓存中（CACHE_BACKEND=redis 时多个 worker 共享）
+db = Database(**DB_CONFIG, pin_store=create_cache('db_pin', ttl=DB_CONFIG['pin_seconds']), guard=db_guard)
+register_queries(db.queries)
+
+# 用户详情缓存（key 为用户 id），用户数据写入后必须删除对应的 key
+user_cache = create_cache('user')
+
+# 用户列表响应缓存（key 包含列表代数，用户数据写入后 bump_generation('users') 使所有页失效）
+list_cache = create_cache('user_list', ttl=LIST_CACHE_TTL)
+
+# 审计日志（请求线程只入队，后台线程用 execute_many 批量写入 audit_log 表）
+audit_log = AuditLog(
+    db,
+    max_queue=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    overflow=AUDIT_OVERFLOW,
+    block_timeout=AUDIT_BLOCK_TIMEOUT,
+    file_path=AUDIT_FILE_PATH,
+    enabled=AUDIT_ENABLED
+)
+
+# 用户变更事件分发（GET /api/user/events 订阅，用户写接口发布）
+# 多个 worker 且不经过 Redis 转发时每个 worker 的事件 id 独立，重连到其它 worker 无法按 id 续传
+change_hub = create_event_hub(
+    EVENTS_BACKEND,
+    history=EVENTS_HISTORY,
+    max_queue=EVENTS_SUBSCRIBER_QUEUE,
+    max_subscribers=EVENTS_MAX_SUBSCRIBERS,
+    resumable=EVENTS_BACKEND != 'memory' or WORKER_PROCESSES <= 1
+)
+
+# 定时归档软删除用户（ARCHIVE_INTERVAL_SECONDS > 0 时在 gunicorn worker 中启动，见 gunicorn.conf.py）
+archive_scheduler = ArchiveScheduler(db, user_cache)
@@ -0,0 +1,140 @@
+import cProfile
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import g, has_request_context, request
+from config import (INSTRUMENTATION_ENABLED, SLOW_REQUEST_MS, SLOW_QUERY_MS,
+                    PROFILE_SAMPLE_RATE, PROFILE_DIR)
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERIES_PER_REQUEST = 50  # 每个请求最多记录的 SQL 条数（慢请求日志用）
+
+_request_counter = itertools.count(1)
+_profiler_lock = threading.Lock()  # 同一时间只对一个请求做 profile
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    SQL 指纹：去掉字面量、合并 IN 列表和空白，同一类 SQL 得到相同的结果
+
+    例如 "SELECT * FROM users WHERE id IN (%s, %s)" -> "SELECT * FROM users WHERE id IN (...)"
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+def _active():
+    """当前是否在开启了计时的请求中"""
+    return INSTRUMENTATION_ENABLED and has_request_context() and 'timings' in g
+
+def _add_timing(name, elapsed):
+    timings = g.timings
+    timings[name] = timings.get(name, 0.0) + elapsed
+
+@contextmanager
+def phase(name):
+    """
+    记录一个阶段的耗时（累加到 g.timings，输出到 Server-Timing 头）
+
+    未开启计时或不在请求中时不做任何事。
+
+    用法:
+        with phase('validate'):
+            data = schema.load(payload)
+    """
+    if not _active():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_timing(name, time.perf_counter() - start)
+
+def record_query(sql, elapsed):
+    """
+    记录一次数据库调用（由 Database 在每次执行 SQL 后调用）
+
+    Args:
+        sql: 执行的 SQL
+        elapsed: 耗时（秒，包含等待连接的时间）
+    """
+    if not INSTRUMENTATION_ENABLED:
+        return
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("慢查询 %.1fms: %s", elapsed * 1000, fingerprint(sql))
+    if not _active():
+        return
+    _add_timing('db', elapsed)
+    g.db_count += 1
+    if len(g.db_queries) < MAX_QUERIES_PER_REQUEST:
+        g.db_queries.append((fingerprint(sql), elapsed))
+
+def init_instrumentation(app):
+    """
+    注册请求计时（INSTRUMENTATION_ENABLED=true 时生效）
+
+    - 每个阶段（jwt / validate / db / serialize）的耗时写入 Server-Timing 响应头
+    - 超过 SLOW_REQUEST_MS 的请求、超过 SLOW_QUERY_MS 的 SQL 写入 warning 日志
+    - PROFILE_SAMPLE_RATE=N 时每 N 个请求用 cProfile 采样一次，结果保存到 PROFILE_DIR
+    """
+    if not INSTRUMENTATION_ENABLED:
+        return
+
+    @app.before_request
+    def start_timing():
+        g.timings = {}
+        g.db_count = 0
+        g.db_queries = []
+        g.profiler = None
+        if PROFILE_SAMPLE_RATE > 0 and next(_request_counter) % PROFILE_SAMPLE_RATE == 0 \
+                and _profiler_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def finish_timing(response):
+        if 'request_start' not in g:
+            return response
+        total = time.perf_counter() - g.request_start
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+            _dump_profile(profiler, total)
+
+        metrics = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in g.timings.items()]
+        if g.db_count:
+            metrics = [m + f';desc="{g.db_count} queries"' if m.startswith('db;') else m for m in metrics]
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(metrics)
+
+        if total * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "慢请求 %.1fms %s %s 阶段=%s SQL=%s",
+                total * 1000, request.method, request.full_path,
+                {name: round(elapsed * 1000, 2) for name, elapsed in g.timings.items()},
+                [(sql, round(elapsed * 1000, 2)) for sql, elapsed in g.db_queries]
+            )
+        return response
+
+def _dump_profile(profiler, total):
+    """保存 profile 结果，文件名包含时间、请求路径和耗时，可用 snakeviz / pstats 查看"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path}-{total * 1000:.0f}ms.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
@@ -0,0 +1,69 @@
+from datetime import date, datetime, time, timedelta
+from flask.json.provider import DefaultJSONProvider
+from config import JSON_DATETIME_FORMAT
+
+try:
+    import orjson  # 可选依赖，安装后 JSON 序列化快很多
+except ImportError:
+    orjson = None
+
+# 默认输出 RFC 1123：让 orjson 把 datetime/date/time 交给 _default，而不是直接输出 ISO 8601
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+if orjson is not None and JSON_DATETIME_FORMAT != 'iso':
+    _ORJSON_OPTIONS |= orjson.OPT_PASSTHROUGH_DATETIME
+
+def _default(obj):
+    """
+    处理 JSON 不支持的类型，输出与 Flask 默认 provider 一致：
+    datetime/date 为 RFC 1123（http_date），Decimal 为字符串（不丢精度）。
+    Flask 不支持的 TIME 字段（timedelta / time）转成字符串。
+    """
+    if isinstance(obj, (datetime, date)) and JSON_DATETIME_FORMAT == 'iso':
+        return obj.isoformat()
+    if isinstance(obj, time):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return str(obj)
+    return DefaultJSONProvider.default(obj)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    高速 JSON 序列化（安装了 orjson 时使用 orjson，否则使用标准库 json）
+
+    两种情况输出格式一致，与 Flask 默认 provider 相同：datetime/date 为 RFC 1123
+    （JSON_DATETIME_FORMAT=iso 时为 ISO 8601），Decimal 为字符串，中文不转义，key 不排序。
+
+    用法:
+        app.json = FastJSONProvider(app)
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+
+    @staticmethod
+    def default(obj):
+        return _default(obj)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+
+    def dumps_bytes(self, obj):
+        """序列化为 UTF-8 bytes（缓存序列化结果时使用，orjson 不需要再 encode 一次）"""
+        if orjson is None:
+            return self.dumps(obj).encode()
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        # 直接使用 orjson 输出的 bytes，省掉一次 decode/encode
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        return self._app.response_class(body, mimetype=self.mimetype)
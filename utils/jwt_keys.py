@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+from jwt.algorithms import RSAAlgorithm, ECAlgorithm, OKPAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+
+logger = logging.getLogger(__name__)
+
+# 私钥文件：<kid>.pem（签名 + 验证），公钥文件：<kid>.pub.pem（只用于验证，如已停用的旧密钥）
+PRIVATE_SUFFIX = '.pem'
+PUBLIC_SUFFIX = '.pub.pem'
+
+class SigningKey:
+    """已解析的密钥（解析一次后缓存，签名/验证时直接使用 cryptography 对象）"""
+
+    def __init__(self, kid, algorithm, public_key, private_key=None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.private_key = private_key
+
+    def to_jwk(self):
+        """公钥的 JWK 表示（JWKS 接口使用）"""
+        if self.algorithm == 'RS256':
+            jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        elif self.algorithm == 'ES256':
+            jwk = ECAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+def _algorithm_for(public_key):
+    """按密钥类型确定算法（每个 kid 只接受一种算法，防止算法混淆攻击）"""
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return 'RS256'
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+        return 'ES256'
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return 'EdDSA'
+    raise ValueError(f"不支持的密钥类型: {type(public_key).__name__}（支持 RSA、EC P-256、Ed25519）")
+
+def load_key_file(path, kid):
+    """
+    读取一个 PEM 密钥文件
+
+    Returns:
+        SigningKey
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith(PUBLIC_SUFFIX):
+        public_key = serialization.load_pem_public_key(data)
+        return SigningKey(kid, _algorithm_for(public_key), public_key)
+    private_key = serialization.load_pem_private_key(data, password=None)
+    public_key = private_key.public_key()
+    return SigningKey(kid, _algorithm_for(public_key), public_key, private_key)
+
+class KeySet:
+    """
+    JWT 密钥集合（从目录加载）
+
+    目录中的所有密钥都可以用于验证，签名使用 active_kid 指定的私钥
+    （未指定时使用 kid 按字典序最大的私钥，kid 建议用日期命名，如 2026-10-01.pem）。
+
+    轮换步骤：
+        1. 放入新私钥（旧私钥保留），新 token 开始使用新 kid 签名，旧 token 仍可验证
+        2. 旧私钥改为只保留公钥（<kid>.pub.pem）或继续保留
+        3. 超过 refresh token 最长有效期后删除旧密钥
+
+    目录每 reload_interval 秒检查一次修改时间，有变化时重新加载，轮换不需要重启服务。
+
+    生成密钥示例:
+        openssl genpkey -algorithm RSA -pkeyopt rsa_keygen_bits:2048 -out 2026-10-01.pem
+        openssl genpkey -algorithm EC -pkeyopt ec_paramgen_curve:P-256 -out 2026-10-01.pem
+        openssl genpkey -algorithm ed25519 -out 2026-10-01.pem
+    """
+
+    def __init__(self, directory, active_kid=None, reload_interval=30):
+        """
+        Args:
+            directory: 密钥目录
+            active_kid: 签名使用的 kid（不指定时自动选择）
+            reload_interval: 检查目录变化的间隔（秒，<= 0 表示不自动重新加载）
+        """
+        self.directory = directory
+        self.active_kid = active_kid
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._signing = None
+        self._mtime = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """
+        重新加载目录中的密钥
+
+        Raises:
+            ValueError: 没有可用于签名的私钥，或 active_kid 不存在
+        """
+        keys = {}
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(PUBLIC_SUFFIX):
+                kid = name[:-len(PUBLIC_SUFFIX)]
+            elif name.endswith(PRIVATE_SUFFIX):
+                kid = name[:-len(PRIVATE_SUFFIX)]
+            else:
+                continue
+            key = load_key_file(os.path.join(self.directory, name), kid)
+            # 同一个 kid 同时有私钥和公钥文件时保留私钥
+            if kid not in keys or key.private_key is not None:
+                keys[kid] = key
+
+        signable = sorted(kid for kid, key in keys.items() if key.private_key is not None)
+        kid = self.active_kid or (signable[-1] if signable else None)
+        if kid is None or kid not in keys or keys[kid].private_key is None:
+            raise ValueError(f"JWT 密钥目录 {self.directory} 中没有可用于签名的私钥: {kid or '(空)'}")
+
+        with self._lock:
+            self._keys = keys
+            self._signing = keys[kid]
+            self._mtime = os.stat(self.directory).st_mtime_ns
+            self._next_check = time.monotonic() + self.reload_interval
+        logger.warning("已加载 JWT 密钥: %s，签名使用 %s (%s)", ', '.join(keys), kid, keys[kid].algorithm)
+
+    def _maybe_reload(self):
+        """每 reload_interval 秒检查一次目录"""
+        if self.reload_interval <= 0 or time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.reload_interval
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """
+        目录有变化时立即重新加载（加载失败时继续使用旧密钥）
+
+        遇到未知 kid 时调用：新密钥可能已经被其它 worker 用来签名，不等 reload_interval。
+        目录没有变化时只需一次 stat。
+        """
+        try:
+            if os.stat(self.directory).st_mtime_ns != self._mtime:
+                self.reload()
+        except (OSError, ValueError) as e:
+            logger.error("重新加载 JWT 密钥失败，继续使用旧密钥: %s", e)
+
+    def signing_key(self):
+        """
+        Returns:
+            SigningKey: 当前用于签名的密钥
+        """
+        self._maybe_reload()
+        return self._signing
+
+    def get(self, kid):
+        """
+        Returns:
+            SigningKey: kid 对应的密钥，不存在返回 None
+        """
+        self._maybe_reload()
+        return self._keys.get(kid)
+
+    def jwks(self):
+        """
+        Returns:
+            dict: {"keys": [...]}，包含所有可用于验证的公钥
+        """
+        self._maybe_reload()
+        return {'keys': [key.to_jwk() for key in self._keys.values()]}
@@ -1,42 +1,174 @@
 import jwt
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
-from config import JWT_SECRET_KEY, JWT_EXPIRATION_HOURS,REFRESH_TOKEN_EXPIRATION_DAYS
+from config import (JWT_SECRET_KEY, JWT_EXPIRATION_HOURS, REFRESH_TOKEN_EXPIRATION_DAYS,
+                    TOKEN_CACHE_SIZE, TOKEN_NEGATIVE_CACHE_TTL, TOKEN_NEGATIVE_CACHE_SIZE, REVOCATION_BACKEND,
+                    JWT_KEY_DIR, JWT_ACTIVE_KID, JWT_KEY_RELOAD_INTERVAL, JWT_ACCEPT_HS256)
+from utils.cache import create_cache
+from utils.revocation import create_revocation_store
 
-def generate_token(user_id, username):
+# 非对称签名：配置了 JWT_KEY_DIR 时使用目录中的 RS256 / ES256 / EdDSA 密钥（需要 cryptography），
+# 其它服务只需公钥（/.well-known/jwks.json）就能验证 token；否则使用 JWT_SECRET_KEY 做 HS256
+if JWT_KEY_DIR:
+    from utils.jwt_keys import KeySet
+    keyset = KeySet(JWT_KEY_DIR, JWT_ACTIVE_KID or None, JWT_KEY_RELOAD_INTERVAL)
+else:
+    keyset = None
+
+# 验证结果缓存：(token类型, token摘要) -> payload
+# 只能用进程内缓存，TOKEN_CACHE_SIZE=0 时关闭
+_token_cache = create_cache('token', backend='memory', max_size=TOKEN_CACHE_SIZE) if TOKEN_CACHE_SIZE > 0 else None
+
+# 无效 token 单独缓存（容量更小）：大量不同的伪造 token 只会互相挤掉，不会挤掉有效 token 的缓存
+_invalid_token_cache = (create_cache('token_invalid', backend='memory', max_size=TOKEN_NEGATIVE_CACHE_SIZE)
+                        if TOKEN_NEGATIVE_CACHE_SIZE > 0 and TOKEN_NEGATIVE_CACHE_TTL > 0 else None)
+
+class UnknownKeyError(jwt.InvalidTokenError):
+    """token 头部的 kid 不在已加载的密钥中（可能是还没加载的新密钥，不做负缓存）"""
+
+# 吊销列表：jti（单个 token）或 sid（一次登录签发的所有 token），校验时不查数据库
+revocations = create_revocation_store(backend=REVOCATION_BACKEND)
+
+def new_session_id():
+    """登录时生成会话 id（同一次登录及其后轮换出的 token 共用）"""
+    return uuid.uuid4().hex
+
+def generate_token(user_id, username, session_id=None):
     """生成 Access Token（短期）"""
     payload = {
         'user_id': user_id,
         'username': username,
         'type': 'access',  # ✅ 确保有这一行
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),  # 过期时间
-        'iat': datetime.utcnow()  # 签发时间
+        'iat': datetime.utcnow(),  # 签发时间
+        'jti': uuid.uuid4().hex,   # token id（用于吊销）
+        'sid': session_id or new_session_id()  # 会话 id（退出登录时整体吊销）
     }
-    token = jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
-    return token
+    return _encode(payload)
 
-def generate_refresh_token(user_id, username):
-    """生成 Refresh Token（长期）"""
+def generate_refresh_token(user_id, username, session_id=None):
+    """生成 Refresh Token（长期，每次刷新后轮换，只能使用一次）"""
     payload = {
         'user_id': user_id,
         'username': username,
         'type': 'refresh',  # 标记为 refresh token
-        'exp': datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRATION_DAYS)
+        'exp': datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRATION_DAYS),
+        'jti': uuid.uuid4().hex,
+        'sid': session_id or new_session_id()
     }
     
-    token = jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
-    return token
+    return _encode(payload)
 
 def verify_token(token, token_type='access'):
-    """验证JWT token"""
+    """
+    验证JWT token（带验证结果缓存）
+    
+    同一个 token 重复请求时直接返回缓存的 payload，不再重复做 HMAC 校验；
+    缓存在 token 的 exp 时刻过期。无效 token 在单独的缓存中保存 TOKEN_NEGATIVE_CACHE_TTL 秒，
+    重复的伪造 token 可以直接拒绝；kid 未知的 token 不缓存（密钥轮换后新 kid 加载前不会被误判 60 秒）。
+    
+    吊销检查在缓存之后、每次都做（token 被吊销后立即失效），
+    内存吊销列表未命中时只读布隆过滤器，不查数据库。
+    
+    Returns:
+        dict: 用户信息（每次返回副本，调用方可以修改），无效或已吊销返回 None
+    """
+    if _token_cache is None:
+        payload, _ = _decode_token(token, token_type)
+    else:
+        key = (token_type, hashlib.blake2b(token.encode(), digest_size=16).digest())
+        payload = _token_cache.get(key)
+        if payload is None:
+            if _invalid_token_cache is not None and _invalid_token_cache.get(key):
+                return None
+            payload, cacheable = _decode_token(token, token_type)
+            if payload is None:
+                if cacheable and _invalid_token_cache is not None:
+                    _invalid_token_cache.set(key, True, ttl=TOKEN_NEGATIVE_CACHE_TTL)
+                return None
+            ttl = payload['exp'] - time.time()
+            if ttl > 0:
+                _token_cache.set(key, payload, ttl=ttl)
+    
+    if payload is None or revocations.is_revoked(payload.get('jti'), payload.get('sid')):
+        return None
+    return dict(payload)
+
+def refresh_token_id(token, payload):
+    """
+    refresh token 的一次性使用标识（交给 revocations.consume）
+
+    轮换前签发的旧 token 没有 jti，用 token 本身的摘要代替，同样只能使用一次。
+    """
+    return payload.get('jti') or 'legacy:' + hashlib.sha256(token.encode()).hexdigest()
+
+def revoke_session(payload):
+    """
+    吊销一次登录签发的所有 token（退出登录、检测到 refresh token 重放时调用）
+    
+    Args:
+        payload: verify_token 返回的 access 或 refresh token 内容
+    """
+    if payload.get('sid'):
+        # 同一会话中最晚过期的是最后一次轮换出的 refresh token
+        expires_at = time.time() + REFRESH_TOKEN_EXPIRATION_DAYS * 86400
+        revocations.revoke(payload['sid'], expires_at)
+    if payload.get('jti'):
+        revocations.revoke(payload['jti'], payload['exp'])
+
+def _encode(payload):
+    """签名（非对称签名时在头部写入 kid，验证方据此选择公钥）"""
+    if keyset is None:
+        return jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
+    key = keyset.signing_key()
+    return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={'kid': key.kid})
+
+def _verify(token):
+    """
+    校验签名并返回 payload
+    
+    非对称签名时按头部的 kid 选择已缓存的公钥，只接受该密钥对应的算法；
+    没有 kid 的 HS256 token 只在 JWT_ACCEPT_HS256=true（从 HS256 迁移期间）时接受。
+    
+    Raises:
+        jwt.InvalidTokenError: 签名无效、过期
+        UnknownKeyError: kid 不存在（已经立即检查过密钥目录）
+    """
+    if keyset is None:
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+    
+    kid = jwt.get_unverified_header(token).get('kid')
+    if kid is None and JWT_ACCEPT_HS256:
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+    key = keyset.get(kid)
+    if key is None:
+        # 可能是刚轮换的新密钥：不等 reload_interval，立即检查目录
+        keyset.reload_if_changed()
+        key = keyset.get(kid)
+    if key is None:
+        raise UnknownKeyError(f"未知的 kid: {kid}")
+    return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+def _decode_token(token, token_type):
+    """
+    解码并校验 JWT token（不经过缓存）
+
+    Returns:
+        tuple: (payload, 无效时结果是否可以缓存)，无效时 payload 为 None
+    """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+        payload = _verify(token)
 
         # ✅ 验证 token 类型
         if payload.get('type') != token_type:
-            return None
+            return None, True
         
-        return payload  # 返回用户信息
+        return payload, True  # 返回用户信息
     except jwt.ExpiredSignatureError:
-        return None  # token过期
+        return None, True  # token过期
+    except UnknownKeyError:
+        return None, False  # kid 未知（可能是还没加载的新密钥）
     except jwt.InvalidTokenError:
-        return None  # token无效
\ No newline at end of file
+        return None, True  # token无效
@@ -0,0 +1,102 @@
+from flask import g, has_request_context
+
+class BatchLoader:
+    """
+    请求级批量加载器（DataLoader 风格）
+
+    - 去重：同一个 key 在一次请求中只加载一次，结果（包括不存在）保存在 memo 中
+    - 合并：want() 登记的 key 会和下一次 load / load_many 一起加载，
+      先查共享缓存（一次 get_many），剩余的交给 batch_fn 一次批量查询
+
+    只在一个请求（一个线程）内使用，不加锁；用 get_loader 获取当前请求的实例。
+    """
+
+    def __init__(self, batch_fn, cache=None):
+        """
+        Args:
+            batch_fn: 批量加载函数，参数为 key 列表，返回 {key: value}（不存在的 key 不返回）
+            cache: 共享缓存（BaseCache），None 表示不使用缓存
+        """
+        self.batch_fn = batch_fn
+        self.cache = cache
+        self._memo = {}
+        self._pending = []
+        self.stats = {"loads": 0, "batches": 0, "fetched": 0}
+
+    def want(self, *keys):
+        """登记稍后需要的 key（不立即查询）"""
+        self._pending.extend(key for key in keys if key not in self._memo)
+
+    def load(self, key):
+        """
+        Returns:
+            key 对应的值，不存在返回 None
+        """
+        return self.load_many([key])[0]
+
+    def load_many(self, keys):
+        """
+        Returns:
+            list: 与 keys 顺序一致的值，不存在的位置为 None
+        """
+        keys = list(keys)
+        self.stats["loads"] += len(keys)
+        missing = [key for key in dict.fromkeys(self._pending + keys) if key not in self._memo]
+        self._pending = []
+        if missing:
+            self._dispatch(missing)
+        return [self._memo[key] for key in keys]
+
+    def prime(self, key, value):
+        """写入 memo（已经从别处拿到数据时避免重复查询）"""
+        self._memo[key] = value
+
+    def clear(self, key):
+        """数据被修改后清除 memo，本次请求内再次读取时重新加载"""
+        self._memo.pop(key, None)
+        if key in self._pending:
+            self._pending.remove(key)
+
+    def _dispatch(self, keys):
+        self.stats["batches"] += 1
+        if self.cache is not None and len(keys) == 1:
+            # 单个 key 走 get_or_load，保留缓存的防击穿
+            key = keys[0]
+            self._memo[key] = self.cache.get_or_load(key, lambda: self._fetch([key]).get(key))
+            return
+
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+        rest = [key for key in keys if key not in found]
+        if rest:
+            # 查询前记下墓碑：查询期间被修改并 delete 的 key 不会把查到的旧数据写回缓存
+            tokens = {key: self.cache.begin_load(key) for key in rest} if self.cache is not None else {}
+            loaded = self._fetch(rest)
+            if self.cache is not None:
+                for key, value in loaded.items():
+                    self.cache.set_loaded(key, value, tokens[key])
+            found.update(loaded)
+        for key in keys:
+            self._memo[key] = found.get(key)
+
+    def _fetch(self, keys):
+        self.stats["fetched"] += len(keys)
+        return self.batch_fn(keys)
+
+def get_loader(name, factory):
+    """
+    获取当前请求的加载器（同一个请求内多次调用返回同一个实例，请求结束后丢弃）
+
+    Args:
+        name: 加载器名称
+        factory: 无参函数，创建 BatchLoader
+
+    Returns:
+        BatchLoader: 不在请求中时（如命令行任务）每次返回新的实例
+    """
+    if not has_request_context():
+        return factory()
+    loaders = g.setdefault('_loaders', {})
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = factory()
+    return loader
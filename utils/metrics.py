@@ -0,0 +1,56 @@
+import bisect
+import threading
+
+# 常用的耗时分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    """
+    分桶直方图（线程安全）
+
+    每个桶记录 <= 上界的次数，snapshot 输出累计值（与 Prometheus 的 le 桶一致）。
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最后一个桶是 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """记录一次观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """
+        获取当前统计
+
+        Returns:
+            dict: {
+                'count': int,      # 观测次数
+                'sum': float,      # 观测值总和
+                'avg': float,      # 平均值
+                'buckets': dict    # 上界 -> 累计次数
+            }
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            value_sum = self._sum
+
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            'count': total,
+            'sum': round(value_sum, 6),
+            'avg': round(value_sum / total, 6) if total else 0.0,
+            'buckets': buckets
+        }
@@ -0,0 +1,341 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from config import REQUEST_DEADLINE_SECONDS, REQUEST_DEADLINE_MIN_SECONDS
+from utils.response import error
+
+logger = logging.getLogger(__name__)
+
+class OverloadedError(Exception):
+    """数据库过载，请求被拒绝（返回 503 + Retry-After）"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpenError(OverloadedError):
+    """熔断器打开，数据库调用直接失败"""
+
+class DeadlineExceeded(Exception):
+    """请求已超过截止时间（不再发起新的数据库调用）"""
+
+def set_deadline(seconds):
+    """设置当前请求的截止时间（从现在起 seconds 秒）"""
+    g.deadline = time.monotonic() + seconds
+
+def remaining_time():
+    """
+    当前请求的剩余时间
+
+    Returns:
+        float: 剩余秒数（可能 <= 0），不在请求中或没有截止时间时返回 None
+    """
+    if not has_request_context():
+        return None
+    deadline = g.get('deadline')
+    return deadline - time.monotonic() if deadline is not None else None
+
+def check_deadline():
+    """
+    Returns:
+        float: 剩余秒数，没有截止时间时返回 None
+
+    Raises:
+        DeadlineExceeded: 已超过截止时间
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("请求已超过截止时间")
+    return remaining
+
+def overload_exempt(view):
+    """
+    装饰器：接口不受过载保护（健康检查等），不设置截止时间，数据库调用不经过限流和熔断
+    """
+    view._overload_exempt = True
+    return view
+
+def is_exempt():
+    """当前请求是否不受过载保护"""
+    return has_request_context() and g.get('overload_exempt', False)
+
+class AdaptiveLimiter:
+    """
+    AIMD 自适应并发限制（按数据库调用耗时调整同时进行的调用数）
+
+    - 调用失败或耗时超过 target_latency：limit * backoff（乘性减）
+    - 调用正常且并发已用到 limit 的一半以上：limit + 1（加性增）
+
+    数据库变慢时并发上限迅速降低，多出来的请求在 acquire 处排队很短时间后被拒绝，
+    不会全部堆积在连接池的等待队列里。
+    """
+
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=100, target_latency=0.2, backoff=0.9):
+        """
+        Args:
+            initial_limit: 初始并发上限
+            min_limit: 并发上限的最小值
+            max_limit: 并发上限的最大值
+            target_latency: 单次调用的目标耗时（秒），超过视为过载信号
+            backoff: 过载时并发上限乘以的系数
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stats = {"acquired": 0, "rejected": 0, "increases": 0, "decreases": 0}
+
+    def acquire(self, timeout):
+        """
+        获取一个并发名额
+
+        Args:
+            timeout: 名额用完时最多等待的秒数
+
+        Returns:
+            bool: 是否获取成功
+        """
+        with self._cond:
+            if self._in_flight >= int(self.limit):
+                if timeout <= 0 or not self._cond.wait_for(lambda: self._in_flight < int(self.limit), timeout):
+                    self._stats["rejected"] += 1
+                    return False
+            self._in_flight += 1
+            self._stats["acquired"] += 1
+            return True
+
+    def release(self, latency, dropped=False):
+        """
+        归还名额并根据本次调用调整并发上限
+
+        Args:
+            latency: 本次调用耗时（秒），None 表示不参与调整（如流式导出）
+            dropped: 本次调用是否失败（超时、连接错误）
+        """
+        with self._cond:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if dropped or (latency is not None and latency > self.target_latency):
+                limit = max(self.min_limit, self.limit * self.backoff)
+                if int(limit) < int(self.limit):
+                    self._stats["decreases"] += 1
+                self.limit = limit
+            elif latency is not None and in_flight * 2 >= self.limit:
+                limit = min(self.max_limit, self.limit + 1)
+                if int(limit) > int(self.limit):
+                    self._stats["increases"] += 1
+                self.limit = limit
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["limit"] = int(self.limit)
+            stats["in_flight"] = self._in_flight
+        stats["min_limit"] = self.min_limit
+        stats["max_limit"] = self.max_limit
+        stats["target_latency"] = self.target_latency
+        return stats
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed：正常调用，连续 failure_threshold 次失败后 open
+    open：直接失败（不占用连接、不等待超时），reset_timeout 秒后 half_open
+    half_open：只放行一个探测调用，成功则 closed，失败重新 open
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=10):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多少秒允许探测（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def before_call(self):
+        """
+        Raises:
+            CircuitOpenError: 熔断器打开（或半开状态下已有探测调用）
+        """
+        if self.state == 'closed':
+            return
+        with self._lock:
+            if self.state == 'open':
+                wait = self._opened_at + self.reset_timeout - time.monotonic()
+                if wait > 0:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError("数据库暂时不可用，请稍后重试", retry_after=math.ceil(wait))
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError("数据库暂时不可用，请稍后重试", retry_after=1)
+                self._probing = True
+
+    def cancel(self):
+        """before_call 之后没有真正发起调用（如被限流拒绝），释放探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok):
+        """记录一次调用结果"""
+        if ok and self.state == 'closed' and self._failures == 0:
+            return
+        with self._lock:
+            self._probing = False
+            if ok:
+                if self.state != 'closed':
+                    logger.warning("数据库熔断器关闭，恢复正常调用")
+                self.state = 'closed'
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self._failures >= self.failure_threshold):
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+                logger.error("数据库连续失败 %d 次，熔断器打开 %s 秒", self._failures, self.reset_timeout)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self._failures
+        stats["failure_threshold"] = self.failure_threshold
+        stats["reset_timeout"] = self.reset_timeout
+        return stats
+
+class LoadGuard:
+    """
+    数据库调用的过载保护：截止时间检查 + 熔断 + 自适应并发限制
+
+    用法:
+        with guard.call():
+            ...  # 一次数据库调用（借出连接到归还连接）
+
+    不受保护的请求（overload_exempt）和不在请求中的调用（命令行任务）不经过限流，
+    但命令行任务仍然受熔断器保护。
+    """
+
+    def __init__(self, limiter=None, breaker=None, max_wait=0.1, failure_types=(), enabled=True):
+        """
+        Args:
+            limiter: AdaptiveLimiter（None 表示不限制并发）
+            breaker: CircuitBreaker（None 表示不熔断）
+            max_wait: 并发名额用完时最多排队的秒数（不超过请求剩余时间）
+            failure_types: 计为数据库故障的异常类型（业务错误如唯一键冲突不计入；
+                DeadlineExceeded 总是不计入，见 call）
+            enabled: 是否开启
+        """
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self.failure_types = failure_types
+        self.enabled = enabled
+
+    @contextmanager
+    def call(self, sample=True):
+        """
+        Args:
+            sample: 本次调用耗时是否参与并发上限调整（流式导出等长时间调用传 False）
+
+        超过请求截止时间（DeadlineExceeded）不算数据库故障：不计入熔断，
+        耗时也只在超过 target_latency 时（数据库确实变慢）参与并发上限调整。
+        截止时间可以被客户端用 X-Request-Timeout 缩短，否则任何人都可以用很短的超时
+        让熔断器打开、并发上限降低，影响所有用户。
+
+        Raises:
+            DeadlineExceeded: 请求已超过截止时间
+            OverloadedError: 熔断器打开或并发名额用完
+        """
+        if not self.enabled or is_exempt():
+            yield
+            return
+
+        remaining = check_deadline()
+        if self.breaker is not None:
+            self.breaker.before_call()
+        limiter = self.limiter if has_request_context() else None
+        if limiter is not None:
+            wait = self.max_wait if remaining is None else min(self.max_wait, remaining)
+            if not limiter.acquire(wait):
+                if self.breaker is not None:
+                    self.breaker.cancel()
+                raise OverloadedError("服务繁忙，请稍后重试", retry_after=1)
+
+        start = time.perf_counter()
+        failed = expired = False
+        try:
+            yield
+        except DeadlineExceeded:
+            expired = True
+            raise
+        except self.failure_types:
+            failed = True
+            raise
+        finally:
+            if limiter is not None:
+                latency = time.perf_counter() - start if sample else None
+                if expired and latency is not None and latency <= limiter.target_latency:
+                    latency = None
+                limiter.release(latency, dropped=failed)
+            if self.breaker is not None:
+                if expired:
+                    self.breaker.cancel()
+                else:
+                    self.breaker.record(not failed)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: 并发限制和熔断器的状态
+        """
+        return {
+            "enabled": self.enabled,
+            "limiter": self.limiter.snapshot() if self.limiter is not None else None,
+            "breaker": self.breaker.snapshot() if self.breaker is not None else None
+        }
+
+def init_overload(app, deadline=REQUEST_DEADLINE_SECONDS, min_deadline=REQUEST_DEADLINE_MIN_SECONDS):
+    """
+    为每个请求设置截止时间
+
+    默认 deadline 秒，客户端可以用 X-Request-Timeout 头（秒）缩短，不能延长，
+    也不能小于 min_deadline（否则返回 400）；带 overload_exempt 的接口不设置截止时间。
+    """
+
+    @app.before_request
+    def start_deadline():
+        view = app.view_functions.get(request.endpoint)
+        if getattr(view, '_overload_exempt', False):
+            g.overload_exempt = True
+            return
+        if deadline <= 0:
+            return
+        seconds = deadline
+        header = request.headers.get('X-Request-Timeout')
+        if header:
+            try:
+                requested = float(header)
+            except ValueError:
+                return error(message="X-Request-Timeout 必须是数字（秒）")
+            if not requested >= min_deadline:
+                return error(message=f"X-Request-Timeout 不能小于 {min_deadline} 秒")
+            seconds = min(seconds, requested)
+        set_deadline(seconds)
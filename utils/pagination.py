@@ -0,0 +1,86 @@
+import base64
+import binascii
+
+def encode_cursor(last_id):
+    """
+    把当前页最后一条记录的 id 编码成不透明游标
+
+    Args:
+        last_id: 当前页最后一条记录的 id
+
+    Returns:
+        str: URL 安全的游标字符串
+    """
+    raw = f"id:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    解析游标
+
+    Args:
+        cursor: encode_cursor 生成的游标，为空表示第一页
+
+    Returns:
+        int: 上一页最后一条记录的 id（第一页返回 0）
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    if not cursor:
+        return 0
+
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("无效的分页游标")
+
+    prefix, _, value = raw.partition(':')
+    if prefix != 'id' or not value.isdigit():
+        raise ValueError("无效的分页游标")
+    return int(value)
+
+def parse_limit(value, default, maximum):
+    """
+    解析每页条数，超过上限时按上限处理
+
+    Raises:
+        ValueError: 不是正整数
+    """
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit 必须是正整数")
+    if limit < 1:
+        raise ValueError("limit 必须是正整数")
+    return min(limit, maximum)
+
+def parse_fields(value, allowed, default):
+    """
+    解析 fields 参数（逗号分隔），只允许白名单内的字段
+
+    Args:
+        value: 请求中的 fields 参数
+        allowed: 允许返回的字段白名单（第一个字段为主键，始终返回）
+        default: 未指定 fields 时返回的字段
+
+    Returns:
+        tuple: 去重后的字段列表（按白名单顺序，主键在最前）
+
+    Raises:
+        ValueError: 包含白名单以外的字段
+    """
+    if not value:
+        requested = set(default)
+    else:
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+
+    requested.add(allowed[0])
+    return tuple(name for name in allowed if name in requested)
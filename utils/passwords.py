@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P,
+                    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+# 存储格式：scrypt$N$r$p$盐$哈希（盐和哈希为 base64），不是这个前缀的视为旧的明文密码
+SCHEME = 'scrypt'
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+class PasswordHasherBusy(Exception):
+    """等待计算的密码哈希任务已达到 PASSWORD_HASH_MAX_PENDING，拒绝新的任务"""
+
+# scrypt 计算在 OpenSSL 中执行并释放 GIL，放到固定大小的线程池中：
+# 同一时间最多占用 PASSWORD_HASH_WORKERS 个 CPU，不会拖慢其它请求
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password')
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING)
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+def hash_password(password):
+    """
+    计算密码哈希（使用当前配置的 scrypt 参数）
+
+    Returns:
+        str: scrypt$N$r$p$盐$哈希
+    """
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return '$'.join((SCHEME, str(PASSWORD_SCRYPT_N), str(PASSWORD_SCRYPT_R), str(PASSWORD_SCRYPT_P),
+                     _b64encode(salt), _b64encode(digest)))
+
+def is_hashed(stored):
+    """数据库中保存的是哈希（而不是旧的明文密码）"""
+    return isinstance(stored, str) and stored.startswith(SCHEME + '$')
+
+def verify_password(password, stored):
+    """
+    校验密码（在调用线程中直接计算，请求中请使用 check_password）
+
+    Args:
+        password: 用户输入的密码
+        stored: 数据库中保存的值（哈希或旧的明文密码）
+
+    Returns:
+        tuple: (是否正确, 需要写回的新哈希)
+               旧的明文密码或 scrypt 参数已调整时返回新哈希，否则为 None
+    """
+    if not stored:
+        return False, None
+
+    if not is_hashed(stored):
+        # 旧数据：明文比对，正确时升级为哈希
+        ok = hmac.compare_digest(password.encode(), stored.encode())
+        return ok, hash_password(password) if ok else None
+
+    try:
+        _, n, r, p, salt, digest = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        expected = _b64decode(digest)
+        actual = _scrypt(password, _b64decode(salt), n, r, p)
+    except ValueError:
+        return False, None  # 格式损坏
+
+    ok = hmac.compare_digest(actual, expected)
+    outdated = (n, r, p) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return ok, hash_password(password) if ok and outdated else None
+
+# 用户不存在时也计算一次哈希，响应时间不会暴露用户名是否存在
+_DUMMY_HASH = None
+
+def _verify_missing_user(password):
+    """用户不存在：对随机哈希做一次同样代价的校验，结果总是失败"""
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(os.urandom(8).hex())
+    verify_password(password, _DUMMY_HASH)
+    return False, None
+
+def submit_check(password, stored):
+    """
+    把密码校验提交到哈希线程池
+
+    Args:
+        password: 用户输入的密码
+        stored: 数据库中保存的值，用户不存在时传 None
+
+    Returns:
+        concurrent.futures.Future: 结果同 verify_password
+                                   （异步接口可以用 asyncio.wrap_future 等待）
+
+    Raises:
+        PasswordHasherBusy: 排队的任务过多
+    """
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy("密码校验任务过多")
+    try:
+        if stored is None:
+            future = _executor.submit(_verify_missing_user, password)
+        else:
+            future = _executor.submit(verify_password, password, stored)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+def check_password(password, stored):
+    """
+    在哈希线程池中校验密码并等待结果（同步接口使用）
+
+    Returns:
+        tuple: (是否正确, 需要写回的新哈希)
+
+    Raises:
+        PasswordHasherBusy: 排队的任务过多
+    """
+    return submit_check(password, stored).result()
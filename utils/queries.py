@@ -0,0 +1,31 @@
+import pymysql
+from pymysql.constants import ER
+
+# 用户详情返回的字段（不含密码）：单个查询和批量查询使用同样的字段，user_cache 中的行一致
+USER_DETAIL_COLUMNS = ('id', 'name', 'email', 'mobile', 'userid', 'status', 'updated_at')
+# migrations/002 执行前 users 表没有 updated_at 列
+USER_DETAIL_COLUMNS_LEGACY = tuple(column for column in USER_DETAIL_COLUMNS if column != 'updated_at')
+
+def is_missing_updated_at(err):
+    """查询失败是否因为 users 表没有 updated_at 列（未执行 migrations/002）"""
+    return (isinstance(err, pymysql.err.OperationalError) and bool(err.args)
+            and err.args[0] == ER.BAD_FIELD_ERROR and 'updated_at' in str(err))
+
+def register_queries(queries):
+    """
+    声明路由中使用的命名查询（启动时执行一次）
+
+    新增查询时在这里注册，路由中通过 db.run(name, ...) 调用，
+    /api/metrics/queries 可以看到每个查询的调用次数和耗时。
+
+    Args:
+        queries: QueryRegistry（db.queries）
+    """
+    # 用户详情（读穿缓存未命中时查询；没有 updated_at 列时使用 user_by_id_legacy）
+    queries.register('user_by_id', f"SELECT {', '.join(USER_DETAIL_COLUMNS)} FROM users WHERE id = %s", fetch='one')
+    queries.register('user_by_id_legacy', f"SELECT {', '.join(USER_DETAIL_COLUMNS_LEGACY)} FROM users WHERE id = %s",
+                     fetch='one')
+    # 登录：按用户名查询 id 和密码
+    queries.register('user_by_name', "SELECT id, name, password FROM users WHERE name = %s", fetch='one')
+    # 登录成功后写回新的密码哈希（旧的明文密码或 scrypt 参数调整后）
+    queries.register('user_set_password', "UPDATE users SET password = %s WHERE id = %s", kind='write')
@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from config import CACHE_BACKEND, REDIS_URL
+
+try:
+    import redis  # 可选依赖，只有使用 redis 后端时才需要
+except ImportError:
+    redis = None
+
+# 所有已创建的限流器（namespace -> limiter），用于统一导出统计信息
+_limiters = {}
+
+class BaseRateLimiter:
+    """
+    令牌桶限流器基类
+
+    每个 key 一个桶，容量为 burst，每秒补充 rate 个令牌，每次请求消耗一个令牌。
+    子类只需实现 _take，统计在这里完成。
+    """
+
+    def __init__(self, namespace, rate, burst):
+        """
+        Args:
+            namespace: 命名空间（不同用途的桶互不影响）
+            rate: 每秒补充的令牌数（<= 0 表示不限流）
+            burst: 桶容量（允许的突发请求数）
+        """
+        self.namespace = namespace
+        self.rate = rate
+        self.burst = burst
+        self.enabled = rate > 0
+        self._stats = {"allowed": 0, "limited": 0}
+        self._stats_lock = threading.Lock()
+
+    def hit(self, key, cost=1):
+        """
+        消耗令牌
+
+        Args:
+            key: 限流维度（如用户名、IP）
+            cost: 本次消耗的令牌数
+
+        Returns:
+            tuple: (是否允许, 需要等待的秒数)，允许时等待秒数为 0
+        """
+        if not self.enabled:
+            return True, 0.0
+        allowed, retry_after = self._take(str(key), cost)
+        with self._stats_lock:
+            self._stats["allowed" if allowed else "limited"] += 1
+        return allowed, retry_after
+
+    def stats(self):
+        """
+        Returns:
+            dict: 放行/拒绝次数和配置
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["rate"] = self.rate
+        stats["burst"] = self.burst
+        stats["enabled"] = self.enabled
+        stats["backend"] = type(self).__name__
+        return stats
+
+    def _take(self, key, cost):
+        raise NotImplementedError
+
+class MemoryRateLimiter(BaseRateLimiter):
+    """进程内令牌桶（每个 worker 独立计数，最多保存 max_keys 个桶，超出时淘汰最久未使用的）"""
+
+    def __init__(self, namespace, rate, burst, max_keys=100000):
+        super().__init__(namespace, rate, burst)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [令牌数, 上次更新时间]
+        self._lock = threading.Lock()
+
+    def _take(self, key, cost):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            return False, (cost - bucket[0]) / self.rate
+
+# 在 Redis 中原子地补充并消耗令牌，时间取 Redis 服务端时间，多个 worker 之间不受时钟偏差影响
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+class RedisRateLimiter(BaseRateLimiter):
+    """
+    Redis 令牌桶（多个 worker / 多台机器共享同一个桶）
+
+    client 可以是 redis.Redis 或任何实现了 eval 的对象。
+    """
+
+    def __init__(self, namespace, rate, burst, client=None, url=REDIS_URL):
+        super().__init__(namespace, rate, burst)
+        if client is None:
+            if redis is None:
+                raise RuntimeError("使用 Redis 限流需要先安装 redis 包")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._prefix = f"ratelimit:{namespace}:"
+
+    def _take(self, key, cost):
+        allowed, retry_after = self.client.eval(
+            _TOKEN_BUCKET_SCRIPT, 1, self._prefix + key, self.rate, self.burst, cost)
+        return bool(int(allowed)), float(retry_after)
+
+def create_rate_limiter(namespace, rate, burst, backend=CACHE_BACKEND, **kwargs):
+    """
+    按配置创建限流器
+
+    Args:
+        namespace: 命名空间
+        rate: 每秒补充的令牌数（<= 0 表示不限流）
+        burst: 桶容量
+        backend: memory / redis（默认与缓存相同）
+        **kwargs: 传给具体限流器的参数（max_keys、client 等）
+
+    Returns:
+        BaseRateLimiter: 限流器实例
+    """
+    if backend == 'redis':
+        limiter = RedisRateLimiter(namespace, rate, burst, **kwargs)
+    elif backend == 'memory':
+        limiter = MemoryRateLimiter(namespace, rate, burst, **kwargs)
+    else:
+        raise ValueError(f"不支持的限流类型: {backend}")
+
+    _limiters[namespace] = limiter
+    return limiter
+
+def retry_after_header(seconds):
+    """Retry-After 头的值（向上取整的秒数，至少 1 秒）"""
+    return str(max(1, math.ceil(seconds)))
+
+def get_rate_limit_stats():
+    """
+    获取所有限流器的统计信息
+
+    Returns:
+        dict: namespace -> 统计信息
+    """
+    return {namespace: limiter.stats() for namespace, limiter in _limiters.items()}
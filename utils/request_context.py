@@ -0,0 +1,22 @@
+from flask import g as _flask_g, has_request_context as _flask_has_request_context, request as _flask_request
+
+try:
+    from quart import g as _quart_g, has_request_context as _quart_has_request_context, request as _quart_request
+except ImportError:  # 只安装了同步部署的依赖（requirements.txt）
+    _quart_has_request_context = None
+
+def current_request():
+    """
+    当前请求的 g 和 request（Flask 和 Quart 通用）
+
+    工具模块在 app.py 和 asgi.py 两种部署中共用，flask.has_request_context 在 Quart 的请求中总是 False，
+    需要读取请求信息（操作人、请求 ID、IP）的地方统一通过这里获取。
+
+    Returns:
+        tuple: (g, request)，不在请求中返回 (None, None)
+    """
+    if _flask_has_request_context():
+        return _flask_g, _flask_request
+    if _quart_has_request_context is not None and _quart_has_request_context():
+        return _quart_g, _quart_request
+    return None, None
@@ -1,27 +1,94 @@
-from flask import jsonify
-from datetime import datetime
-import uuid
+from flask import jsonify, current_app
+import itertools
+import os
+import re
+import time
+from utils.instrumentation import phase
+from utils.request_context import current_request
 
-def success(data=None, message="操作成功", code=200):
-    """成功响应"""
-    response = {
+# 客户端传入的 X-Request-ID 只接受这些字符，避免日志注入
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+_id_pid = None
+_id_prefix = None
+_id_counter = None
+_timestamp_cache = (0, '')  # (秒, 格式化后的时间)
+
+# success_raw 中 data 的占位符（随机生成，不会与真实内容冲突），序列化后替换为已缓存的 JSON
+_RAW_DATA_PLACEHOLDER = f"@@raw-data-{os.urandom(8).hex()}@@"
+
+def next_request_id():
+    """
+    生成请求 ID：进程前缀 + 自增序号（不需要每次调用 os.urandom）
+
+    前缀在每个进程第一次调用时随机生成，fork 出的 worker 会重新生成，不会重复。
+    """
+    global _id_pid, _id_prefix, _id_counter
+    pid = os.getpid()
+    if _id_pid != pid:
+        _id_prefix = os.urandom(6).hex()
+        _id_counter = itertools.count(1)
+        _id_pid = pid
+    return f"{_id_prefix}-{next(_id_counter):x}"
+
+def get_request_id():
+    """
+    当前请求的 ID（同一个请求内不变）
+
+    优先使用客户端或网关传入的 X-Request-ID，方便串联上下游日志。Flask 和 Quart 的请求中都可以调用。
+    """
+    g, request = current_request()
+    if g is None:
+        return next_request_id()
+    request_id = g.get('request_id')
+    if request_id is None:
+        incoming = request.headers.get('X-Request-ID')
+        request_id = incoming if incoming and _REQUEST_ID_RE.match(incoming) else next_request_id()
+        g.request_id = request_id
+    return request_id
+
+def _timestamp():
+    """当前时间字符串（同一秒内复用格式化结果）"""
+    global _timestamp_cache
+    now = int(time.time())
+    cached = _timestamp_cache
+    if cached[0] != now:
+        cached = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+        _timestamp_cache = cached
+    return cached[1]
+
+def build_response(is_success, message, code, data):
+    """生成统一的响应结构（同步和异步接口共用）"""
+    return {
         "code": code,
-        "success": True,
+        "success": is_success,
         "message": message,
         "data": data,
-        "request_id": str(uuid.uuid4()),
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "request_id": get_request_id(),
+        "timestamp": _timestamp()
     }
-    return jsonify(response), code
+
+def success(data=None, message="操作成功", code=200):
+    """成功响应"""
+    with phase('serialize'):
+        response = jsonify(build_response(True, message, code, data))
+    return response, code
 
 def error(message="操作失败", code=400, data=None):
     """错误响应"""
-    response = {
-        "code": code,
-        "success": False,
-        "message": message,
-        "data": data,
-        "request_id": str(uuid.uuid4()),
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    return jsonify(response), code
\ No newline at end of file
+    with phase('serialize'):
+        response = jsonify(build_response(False, message, code, data))
+    return response, code
+
+def success_raw(data_json, message="操作成功", code=200):
+    """
+    成功响应，data 为已经序列化好的 JSON（bytes）
+
+    只序列化外层结构（request_id / timestamp 每次重新生成），再把 data 原样拼接进去，
+    命中响应缓存时不需要重新序列化整页数据。
+    """
+    with phase('serialize'):
+        envelope = current_app.json.dumps_bytes(build_response(True, message, code, _RAW_DATA_PLACEHOLDER))
+        body = envelope.replace(f'"{_RAW_DATA_PLACEHOLDER}"'.encode(), data_json, 1)
+        response = current_app.response_class(body, mimetype='application/json')
+    return response, code
@@ -0,0 +1,252 @@
+import hashlib
+import math
+import threading
+import time
+from config import CACHE_BACKEND, REDIS_URL, REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE
+
+try:
+    import redis  # 可选依赖，只有使用 redis 后端时才需要
+except ImportError:
+    redis = None
+
+class BloomFilter:
+    """
+    布隆过滤器：判断"一定不存在"只需读几个比特位
+
+    不支持删除，过期数据由 MemoryRevocationStore 定期重建过滤器清除。
+    超过 capacity 后误判率上升，只会让更多请求多查一次精确集合，不影响正确性。
+    """
+
+    def __init__(self, capacity, error_rate):
+        """
+        Args:
+            capacity: 预计元素个数
+            error_rate: 预计误判率
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class BaseRevocationStore:
+    """
+    token 吊销列表基类
+
+    吊销的是 jti（单个 token）或 sid（同一次登录签发的所有 token），
+    记录保留到对应 token 的过期时间，之后自动清除。
+    """
+
+    def __init__(self):
+        self._stats = {"checks": 0, "revoked_hits": 0, "revocations": 0}
+        self._stats_lock = threading.Lock()
+
+    def is_revoked(self, *ids):
+        """
+        是否有任意一个 id 已被吊销（None 会被忽略）
+
+        Returns:
+            bool
+        """
+        ids = [item for item in ids if item]
+        if not ids:
+            return False
+        revoked = self._is_revoked(ids)
+        with self._stats_lock:
+            self._stats["checks"] += 1
+            if revoked:
+                self._stats["revoked_hits"] += 1
+        return revoked
+
+    def revoke(self, item, expires_at):
+        """
+        吊销
+
+        Args:
+            item: jti 或 sid
+            expires_at: 记录保留到的时间（unix 时间戳，通常是 token 的 exp）
+        """
+        self._incr_revocations()
+        self._revoke(item, expires_at)
+
+    def consume(self, item, expires_at):
+        """
+        原子地把 id 标记为已使用（用于 refresh token 轮换）
+
+        "已使用"与"已吊销"分开记录：用过的 refresh token 仍能通过 verify_token，
+        调用方才能识别出重放并吊销整个会话。
+
+        Returns:
+            bool: 第一次使用返回 True，已经使用过返回 False（重放）
+        """
+        return self._consume(item, expires_at)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["backend"] = type(self).__name__
+        return stats
+
+    def _incr_revocations(self):
+        with self._stats_lock:
+            self._stats["revocations"] += 1
+
+    def _is_revoked(self, ids):
+        raise NotImplementedError
+
+    def _revoke(self, item, expires_at):
+        raise NotImplementedError
+
+    def _consume(self, item, expires_at):
+        raise NotImplementedError
+
+class MemoryRevocationStore(BaseRevocationStore):
+    """
+    进程内吊销列表：布隆过滤器 + 精确集合
+
+    绝大多数请求携带的 token 没有被吊销，布隆过滤器直接判定"不存在"，不加锁；
+    只有过滤器命中时才查精确集合（jti -> 过期时间）。每个 worker 独立，多 worker 部署请使用 redis。
+    """
+
+    def __init__(self, capacity=REVOCATION_BLOOM_CAPACITY, error_rate=REVOCATION_BLOOM_ERROR_RATE,
+                 purge_interval=60):
+        """
+        Args:
+            capacity: 布隆过滤器预计容量
+            error_rate: 布隆过滤器预计误判率
+            purge_interval: 清理过期记录（并重建过滤器）的最小间隔（秒）
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.purge_interval = purge_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._entries = {}  # 已吊销的 id -> 过期时间
+        self._used = {}     # 已使用的 refresh token jti -> 过期时间
+        self._lock = threading.Lock()
+        self._next_purge = time.time() + purge_interval
+
+    def _is_revoked(self, ids):
+        bloom = self._bloom
+        candidates = [item for item in ids if item in bloom]
+        if not candidates:
+            return False
+        now = time.time()
+        with self._lock:
+            return any(self._entries.get(item, 0) > now for item in candidates)
+
+    def _revoke(self, item, expires_at):
+        with self._lock:
+            self._add(item, expires_at)
+
+    def _consume(self, item, expires_at):
+        now = time.time()
+        with self._lock:
+            if self._used.get(item, 0) > now:
+                return False
+            self._used[item] = expires_at
+            self._maybe_purge(now)
+            return True
+
+    def _add(self, item, expires_at):
+        """调用方已持有锁"""
+        self._entries[item] = max(expires_at, self._entries.get(item, 0))
+        self._bloom.add(item)
+        self._maybe_purge(time.time())
+
+    def _maybe_purge(self, now):
+        if now >= self._next_purge:
+            self._purge(now)
+
+    def _purge(self, now):
+        """删除过期记录，并用剩余记录重建布隆过滤器（调用方已持有锁）"""
+        self._next_purge = now + self.purge_interval
+        self._used = {item: expires_at for item, expires_at in self._used.items() if expires_at > now}
+        self._entries = {item: expires_at for item, expires_at in self._entries.items() if expires_at > now}
+        bloom = BloomFilter(max(self.capacity, len(self._entries)), self.error_rate)
+        for item in self._entries:
+            bloom.add(item)
+        self._bloom = bloom
+
+    def stats(self):
+        stats = super().stats()
+        stats["size"] = len(self._entries)
+        stats["used"] = len(self._used)
+        return stats
+
+class RedisRevocationStore(BaseRevocationStore):
+    """
+    Redis 吊销列表（多个 worker 共享，吊销后所有进程立即生效）
+
+    每个 id 一个 key（revoked:<id>，已使用的 refresh token 为 used:<jti>），
+    过期时间与 token 一致；检查多个 id 只需一次 EXISTS。
+    client 可以是 redis.Redis 或任何实现了 exists/set 的对象。
+    """
+
+    def __init__(self, client=None, url=REDIS_URL):
+        super().__init__()
+        if client is None:
+            if redis is None:
+                raise RuntimeError("使用 Redis 吊销列表需要先安装 redis 包")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._prefix = "revoked:"
+
+    def _ttl(self, expires_at):
+        return max(1, math.ceil(expires_at - time.time()))
+
+    def _is_revoked(self, ids):
+        return self.client.exists(*[self._prefix + item for item in ids]) > 0
+
+    def _revoke(self, item, expires_at):
+        self.client.set(self._prefix + item, 1, ex=self._ttl(expires_at))
+
+    def _consume(self, item, expires_at):
+        # SET NX：只有第一个请求能写入成功，并发重放也只有一个能通过
+        return bool(self.client.set("used:" + item, 1, ex=self._ttl(expires_at), nx=True))
+
+def check_revocation_backend(workers, backend):
+    """
+    启动时检查：多进程部署不能使用进程内吊销列表
+
+    memory 后端每个 worker 独立，退出登录和 refresh token 轮换只在处理请求的 worker 中生效，
+    被吊销的 access token、被重放的 refresh token 在其它 worker 上仍然有效。
+
+    Args:
+        workers: worker 进程数
+        backend: 吊销列表类型
+
+    Raises:
+        RuntimeError: workers > 1 且 backend 为 memory
+    """
+    if workers > 1 and backend == 'memory':
+        raise RuntimeError(
+            f"{workers} 个 worker 不能使用进程内吊销列表（退出登录和 refresh token 轮换只在单个 worker 生效），"
+            "请设置 REVOCATION_BACKEND=redis，或只启动 1 个 worker"
+        )
+
+def create_revocation_store(backend=CACHE_BACKEND, **kwargs):
+    """
+    按配置创建吊销列表
+
+    Args:
+        backend: memory / redis（默认与缓存相同）
+        **kwargs: 传给具体类的参数（capacity、client 等）
+    """
+    if backend == 'redis':
+        return RedisRevocationStore(**kwargs)
+    if backend == 'memory':
+        return MemoryRevocationStore(**kwargs)
+    raise ValueError(f"不支持的吊销列表类型: {backend}")
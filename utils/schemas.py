@@ -16,4 +16,16 @@ class UserUpdateSchema(Schema):
     """用户更新数据验证模式（字段都是可选的）"""
     name = fields.Str(validate=validate.Length(min=1, max=50))
     email = fields.Email(required=True)
-    mobile = fields.Str(validate=validate.Regexp('^[0-9]+$'))
\ No newline at end of file
+    mobile = fields.Str(validate=validate.Regexp('^[0-9]+$'))
+
+# 可复用的 schema 实例：load 不保存请求状态，可以跨请求、跨线程共用，
+# 避免每个请求重新构建字段和校验器
+login_schema = LoginSchema()
+user_schema = UserSchema()
+user_update_schema = UserUpdateSchema()
+users_schema = UserSchema(many=True)
+users_update_schema = UserUpdateSchema(many=True)
+
+# 可写入 users 表的字段（与 schema 声明顺序一致）
+USER_COLUMNS = tuple(user_schema.fields)
+USER_UPDATE_COLUMNS = tuple(user_update_schema.fields)
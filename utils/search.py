@@ -0,0 +1,90 @@
+from functools import lru_cache
+from config import USER_SEARCH_FULLTEXT, USER_SEARCH_STATUSES
+
+# 搜索条件白名单：参数名 -> SQL 片段（只有这里的片段会出现在 SQL 中，值全部参数化）
+# 顺序固定，同一组参数总是生成同一条 SQL，可以按参数组合缓存模板
+SEARCH_FILTERS = {
+    'status': "status = %s",
+    'name': "name LIKE %s ESCAPE '!'",  # 前缀匹配，走 (status, name) 索引范围扫描
+    'q': "MATCH (name) AGAINST (%s IN BOOLEAN MODE)",  # 全文检索（ngram），需要 USER_SEARCH_FULLTEXT=true
+    'email': "email = %s",
+    'mobile': "mobile = %s"
+}
+
+# 不传 status 时只搜索正常用户（与列表接口一致）
+DEFAULT_STATUS = 1
+MAX_TERM_LENGTH = 100
+
+# 每个搜索条件（与 status 组合）应该使用的索引，flask check-search-plans 按它检查执行计划
+SEARCH_INDEXES = {
+    'name': 'idx_users_status_name',
+    'q': 'ft_users_name',
+    'email': 'idx_users_status_email',
+    'mobile': 'idx_users_status_mobile'
+}
+
+def _escape_like(value):
+    """转义 LIKE 通配符（转义字符为 !，MySQL 和 SQLite 都支持）"""
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+def parse_search_filters(args):
+    """
+    解析搜索参数
+
+    Args:
+        args: 请求参数（request.args）
+
+    Returns:
+        dict: 参数名 -> SQL 参数值（按 SEARCH_FILTERS 顺序）
+
+    Raises:
+        ValueError: 参数不合法或没有任何搜索条件
+    """
+    filters = {}
+    for name in SEARCH_FILTERS:
+        raw = args.get(name)
+        if name == 'status':
+            if raw is None or raw == '':
+                filters[name] = DEFAULT_STATUS
+            elif raw.isdigit():
+                filters[name] = int(raw)
+            else:
+                raise ValueError("status 必须是整数")
+            # 已删除等状态的用户不对外开放搜索
+            if filters[name] not in USER_SEARCH_STATUSES:
+                raise ValueError(f"status 只能是 {', '.join(map(str, USER_SEARCH_STATUSES))}")
+            continue
+
+        if raw is None:
+            continue
+        value = raw.strip()
+        if not value:
+            raise ValueError(f"{name} 不能为空")
+        if len(value) > MAX_TERM_LENGTH:
+            raise ValueError(f"{name} 最多 {MAX_TERM_LENGTH} 个字符")
+
+        if name == 'name':
+            value = _escape_like(value) + '%'
+        elif name == 'q':
+            if not USER_SEARCH_FULLTEXT:
+                raise ValueError("未开启全文检索，请使用 name 前缀搜索")
+            # 作为短语检索，去掉用户输入中的布尔模式运算符
+            value = '"' + value.replace('"', ' ') + '"'
+        filters[name] = value
+
+    if len(filters) == 1:
+        raise ValueError("至少需要一个搜索条件（name、q、email、mobile）")
+    return filters
+
+@lru_cache(maxsize=256)
+def search_sql(filter_names, columns):
+    """
+    搜索 SQL 模板（按条件组合和返回字段缓存），参数顺序为条件值 + 上一页最后的 id + 条数
+
+    Args:
+        filter_names: parse_search_filters 返回的参数名元组
+        columns: 返回字段元组（只能是白名单中的字段）
+    """
+    conditions = ' AND '.join(SEARCH_FILTERS[name] for name in filter_names)
+    return (f"SELECT {', '.join(columns)} FROM users "
+            f"WHERE {conditions} AND id > %s ORDER BY id LIMIT %s")
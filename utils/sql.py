@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+def split_fields(data, columns):
+    """
+    按固定的字段顺序取出验证后的数据
+
+    同一组字段总是得到相同的 fields 元组，可以直接作为 SQL 模板的缓存 key。
+
+    Args:
+        data: schema 验证后的数据
+        columns: 允许写入的字段（schema 声明顺序）
+
+    Returns:
+        tuple: (字段元组, 值元组)
+    """
+    fields = tuple(column for column in columns if column in data)
+    return fields, tuple(data[field] for field in fields)
+
+@lru_cache(maxsize=256)
+def insert_sql(table, fields):
+    """
+    INSERT 语句模板（按字段组合缓存）
+
+    Args:
+        table: 表名（只能是代码中的常量）
+        fields: split_fields 返回的字段元组
+    """
+    return f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join(['%s'] * len(fields))})"
+
+@lru_cache(maxsize=256)
+def update_sql(table, fields, key='id'):
+    """
+    UPDATE ... WHERE key=%s 语句模板（按字段组合缓存），参数顺序为字段值 + key 值
+    """
+    return f"UPDATE {table} SET {', '.join(f'{field}=%s' for field in fields)} WHERE {key}=%s"
+
+@lru_cache(maxsize=256)
+def select_in_sql(table, count, columns='*', key='id'):
+    """
+    SELECT ... WHERE key IN (...) 语句模板（按 IN 列表长度缓存）
+
+    调用方按固定大小分批，大多数批次长度相同，模板数量很少。
+    """
+    return f"SELECT {columns} FROM {table} WHERE {key} IN ({', '.join(['%s'] * count)})"